@@ -0,0 +1,331 @@
+# academics/attendance_store.py
+"""
+Where attendance marks are kept, picked by settings.ATTENDANCE_STORAGE.
+
+RowStore keeps one AttendanceRecord per mark. PackedStore keeps one
+AttendanceMonth per student-month, plus an AttendanceRemark row for each
+mark that has a remark. The attendance API goes through get_store(), so it
+works the same on both.
+
+A packed mark has no row of its own, so the API gives it the id
+month.pk * 32 + day (mark_id()); PackedStore.get() turns that back into
+the month and day for detail, update and delete.
+"""
+from collections import defaultdict
+from itertools import groupby, islice
+
+from django.db import connection, transaction
+
+from .models import AttendanceRecord, AttendanceMonth, AttendanceRemark
+from .packing import clear_day, days, is_marked, packed_storage, set_day
+from .summaries import month_of, next_month, refresh_batch_day
+
+CHUNK_SIZE = 2000
+
+
+def mark_id(month_id, day):
+    return month_id * 32 + day
+
+
+def get_store():
+    return PackedStore() if packed_storage() else RowStore()
+
+
+class RowStore:
+    def mark(self, batch_id, day, statuses, remarks):
+        """
+        Marks (or re-marks) students of one batch for one day.
+        statuses: {student_id: status}, remarks: {student_id: text}. Returns the number marked.
+        """
+        records = [
+            AttendanceRecord(student_id=student_id, batch_id=batch_id, date=day,
+                             status=status, remarks=remarks.get(student_id, ''))
+            for student_id, status in statuses.items()
+        ]
+        with transaction.atomic():
+            # One INSERT ... ON CONFLICT (student, batch, date) DO UPDATE
+            AttendanceRecord.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['student', 'batch', 'date'],
+                update_fields=['status', 'remarks'],
+            )
+            # bulk_create skips signals, so recount this month's summaries here
+            refresh_batch_day(batch_id, day, statuses)
+        return len(records)
+
+    def month_view(self, batch_id, month):
+        """{student_id: {day_of_month: status}} for one batch and month."""
+        view = defaultdict(dict)
+        for student_id, day, status in AttendanceRecord.objects.filter(
+            batch_id=batch_id, date__gte=month, date__lt=next_month(month)
+        ).values_list('student_id', 'date', 'status'):
+            view[student_id][day.day] = status
+        return view
+
+
+class PackedStore:
+    def mark(self, batch_id, day, statuses, remarks):
+        month = month_of(day)
+        keys = {'batch_id': batch_id, 'month': month}
+        with transaction.atomic():
+            # Create any missing months first, so the lock below covers every row we rewrite.
+            AttendanceMonth.objects.bulk_create(
+                [AttendanceMonth(student_id=student_id, **keys) for student_id in statuses],
+                ignore_conflicts=True,
+            )
+            current = {
+                student_id: (codes, marked)
+                for student_id, codes, marked in AttendanceMonth.objects.select_for_update()
+                .filter(student_id__in=statuses, **keys).values_list('student_id', 'codes', 'marked')
+            }
+            months = []
+            for student_id, status in statuses.items():
+                codes, marked = set_day(*current[student_id], day.day, status)
+                months.append(AttendanceMonth(student_id=student_id, codes=codes, marked=marked, **keys))
+            AttendanceMonth.objects.bulk_create(
+                months,
+                update_conflicts=True,
+                unique_fields=['student', 'batch', 'month'],
+                update_fields=['codes', 'marked'],
+            )
+            self._save_remarks(batch_id, day, statuses, remarks)
+            refresh_batch_day(batch_id, day, statuses)
+        return len(months)
+
+    def _save_remarks(self, batch_id, day, statuses, remarks):
+        # Same as re-marking a row: a mark sent without a remark clears the old one.
+        texts = {student_id: text for student_id, text in remarks.items() if text and student_id in statuses}
+        if texts:
+            AttendanceRemark.objects.bulk_create(
+                [AttendanceRemark(student_id=student_id, batch_id=batch_id, date=day, remarks=text)
+                 for student_id, text in texts.items()],
+                update_conflicts=True,
+                unique_fields=['student', 'batch', 'date'],
+                update_fields=['remarks'],
+            )
+        AttendanceRemark.objects.filter(
+            batch_id=batch_id, date=day, student_id__in=set(statuses) - set(texts)
+        ).delete()
+
+    def write(self, records):
+        """Stores unsaved AttendanceRecord instances (the plain POST /attendance/ path)."""
+        by_day = defaultdict(lambda: ({}, {}))
+        for record in records:
+            statuses, remarks = by_day[(record.batch_id, record.date)]
+            statuses[record.student_id] = record.status
+            remarks[record.student_id] = record.remarks
+        for (batch_id, day), (statuses, remarks) in by_day.items():
+            self.mark(batch_id, day, statuses, remarks)
+        self._assign_ids(records)
+
+    @staticmethod
+    def _assign_ids(records):
+        """Gives freshly written records their mark_id() (one query)."""
+        month_ids = {
+            (student_id, batch_id, month): pk
+            for pk, student_id, batch_id, month in AttendanceMonth.objects.filter(
+                student_id__in={r.student_id for r in records},
+                batch_id__in={r.batch_id for r in records},
+                month__in={month_of(r.date) for r in records},
+            ).values_list('pk', 'student_id', 'batch_id', 'month')
+        }
+        for record in records:
+            record.pk = mark_id(month_ids[(record.student_id, record.batch_id, month_of(record.date))], record.date.day)
+
+    def get(self, pk):
+        """The mark with API id `pk` as an unsaved AttendanceRecord, or None."""
+        month_id, day_number = divmod(pk, 32)
+        month = self.months().filter(pk=month_id).first()
+        if month is None or not is_marked(month.marked, day_number):
+            return None
+        day = month.month.replace(day=day_number)
+        return self.records([month], day, day)[0]
+
+    def delete(self, record):
+        """Unmarks one day; a month left with no marks is removed."""
+        day = record.date
+        with transaction.atomic():
+            month = AttendanceMonth.objects.select_for_update().filter(
+                student_id=record.student_id, batch_id=record.batch_id, month=month_of(day)
+            ).first()
+            if month:
+                month.codes, month.marked = clear_day(month.codes, month.marked, day.day)
+                if month.marked:
+                    month.save(update_fields=['codes', 'marked'])
+                else:
+                    month.delete()
+            AttendanceRemark.objects.filter(student_id=record.student_id, batch_id=record.batch_id, date=day).delete()
+            refresh_batch_day(record.batch_id, day, [record.student_id])
+
+    def replace(self, old, new):
+        """Stores `new` in place of the mark `old` (PUT/PATCH); `new` gets its id."""
+        with transaction.atomic():
+            if (old.student_id, old.batch_id, old.date) != (new.student_id, new.batch_id, new.date):
+                self.delete(old)
+            self.write([new])
+
+    def month_view(self, batch_id, month):
+        return {
+            student_id: dict(days(codes, marked))
+            for student_id, codes, marked in AttendanceMonth.objects.filter(
+                batch_id=batch_id, month=month_of(month)
+            ).values_list('student_id', 'codes', 'marked')
+        }
+
+    # ------------------------------------------------------------------
+    # READING BACK AS ROWS
+    # ------------------------------------------------------------------
+    @staticmethod
+    def months():
+        return AttendanceMonth.objects.select_related('student__user')
+
+    @staticmethod
+    def _remarks(months):
+        """One query: remarks for a chunk of months, keyed by (student_id, batch_id, date)."""
+        if not months:
+            return {}
+        found = AttendanceRemark.objects.filter(
+            student_id__in={m.student_id for m in months},
+            batch_id__in={m.batch_id for m in months},
+            date__gte=min(m.month for m in months),
+            date__lt=next_month(max(m.month for m in months)),
+        ).values_list('student_id', 'batch_id', 'date', 'remarks')
+        return {(student_id, batch_id, day): text for student_id, batch_id, day, text in found}
+
+    def records(self, months, date_from=None, date_to=None):
+        """
+        Expands months into unsaved AttendanceRecord instances (id: mark_id()),
+        so AttendanceSerializer can render them.
+        """
+        remarks = self._remarks(months)
+        records = []
+        for month in months:
+            for day_number, status in days(month.codes, month.marked):
+                day = month.month.replace(day=day_number)
+                if (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+                records.append(AttendanceRecord(
+                    id=mark_id(month.pk, day_number), date=day, status=status,
+                    remarks=remarks.get((month.student_id, month.batch_id, day), ''),
+                    **self._related(month),
+                ))
+        return records
+
+    @staticmethod
+    def _related(month):
+        # Hand over select_related() objects, ids otherwise (never a lazy load).
+        related = {}
+        for name in ('student', 'batch'):
+            if getattr(AttendanceMonth, name).is_cached(month):
+                related[name] = getattr(month, name)
+            else:
+                related[f'{name}_id'] = getattr(month, f'{name}_id')
+        return related
+
+    def iter_records(self, months, date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+        """records() for a whole queryset, streamed chunk by chunk."""
+        months = months.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(months, chunk_size)):
+            yield from self.records(chunk, date_from, date_to)
+
+
+# ----------------------------------------------------------------------
+# SWITCHING STORAGE (manage.py pack_attendance)
+# ----------------------------------------------------------------------
+def pack_records(records=None, chunk_size=CHUNK_SIZE):
+    """
+    Moves AttendanceRecord rows (default: all of this schema's) into
+    AttendanceMonth / AttendanceRemark and deletes them, `chunk_size`
+    student-months at a time. Returns the number of marks moved.
+    """
+    if records is None:
+        records = AttendanceRecord.objects.all()
+    rows = (
+        records.order_by('student_id', 'batch_id', 'date')
+        .values_list('id', 'student_id', 'batch_id', 'date', 'status', 'remarks')
+        .iterator(chunk_size=chunk_size)
+    )
+    moved = 0
+    months, remarks, ids = [], [], []
+    with transaction.atomic():
+        for (student_id, batch_id, month), marks in groupby(rows, key=lambda row: (row[1], row[2], month_of(row[3]))):
+            codes = marked = 0
+            for pk, _, _, day, status, text in marks:
+                codes, marked = set_day(codes, marked, day.day, status)
+                ids.append(pk)
+                if text:
+                    remarks.append(AttendanceRemark(student_id=student_id, batch_id=batch_id,
+                                                    date=day, remarks=text))
+            months.append(AttendanceMonth(student_id=student_id, batch_id=batch_id, month=month,
+                                          codes=codes, marked=marked))
+            if len(months) >= chunk_size:
+                moved += _write_packed(months, remarks, ids)
+                months, remarks, ids = [], [], []
+        moved += _write_packed(months, remarks, ids)
+    return moved
+
+
+def _write_packed(months, remarks, ids):
+    """Stores one chunk of packed months and deletes exactly the rows they were built from."""
+    if not months:
+        return 0
+    _merge_months(months)
+    AttendanceRemark.objects.bulk_create(
+        remarks, update_conflicts=True,
+        unique_fields=['student', 'batch', 'date'], update_fields=['remarks'],
+    )
+    # A queryset delete would fire post_delete (and a summary recount) per row.
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{AttendanceRecord._meta.db_table}" WHERE id = ANY(%s)', [ids])
+    return len(ids)
+
+
+def _merge_months(months):
+    """Upserts months, keeping days already packed for the same student-month (rows win)."""
+    existing = {
+        (m.student_id, m.batch_id, m.month): m
+        for m in AttendanceMonth.objects.select_for_update().filter(
+            student_id__in={m.student_id for m in months},
+            batch_id__in={m.batch_id for m in months},
+            month__in={m.month for m in months},
+        )
+    }
+    for month in months:
+        old = existing.get((month.student_id, month.batch_id, month.month))
+        if old:
+            for day, status in days(old.codes, old.marked & ~month.marked):
+                month.codes, month.marked = set_day(month.codes, month.marked, day, status)
+    AttendanceMonth.objects.bulk_create(
+        months, update_conflicts=True,
+        unique_fields=['student', 'batch', 'month'], update_fields=['codes', 'marked'],
+    )
+
+
+def unpack_months(chunk_size=CHUNK_SIZE):
+    """
+    The reverse of pack_records(): writes AttendanceRecord rows back out and
+    empties the packed tables. Returns the number of marks moved.
+
+    A row that already exists for the same student, batch and date is
+    overwritten: the packed mark wins.
+    """
+    store = PackedStore()
+    records = store.iter_records(AttendanceMonth.objects.order_by('pk'), chunk_size=chunk_size)
+    moved = 0
+    with transaction.atomic():
+        while chunk := list(islice(records, chunk_size)):
+            for record in chunk:
+                record.pk = None  # a real row gets a real id
+            moved += len(AttendanceRecord.objects.bulk_create(
+                chunk, update_conflicts=True,
+                unique_fields=['student', 'batch', 'date'], update_fields=['status', 'remarks'],
+            ))
+        AttendanceMonth.objects.all().delete()
+        AttendanceRemark.objects.all().delete()
+    return moved
+
+
+def pack_for_schema(unpack, schema_name):
+    """for_each_tenant() entry point for `manage.py pack_attendance`."""
+    return unpack_months() if unpack else pack_records()
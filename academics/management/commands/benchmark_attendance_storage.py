@@ -0,0 +1,136 @@
+# academics/management/commands/benchmark_attendance_storage.py
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django_tenants.utils import schema_context
+
+from academics.attendance_store import RowStore, PackedStore, pack_records
+from academics.models import AttendanceRecord, AttendanceMonth, AttendanceRemark, Batch, StudentProfile
+from academics.summaries import month_of
+from core.models import User
+
+# Roughly what a real register looks like
+WEIGHTS = {
+    AttendanceRecord.Status.PRESENT: 90,
+    AttendanceRecord.Status.ABSENT: 6,
+    AttendanceRecord.Status.LATE: 3,
+    AttendanceRecord.Status.EXCUSED: 1,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares disk size and month-view read time of row-per-mark and packed attendance "
+        "on synthetic data in one schema. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', required=True, help='Tenant schema to run in.')
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=250, help='School days to mark (weekdays).')
+        parser.add_argument('--remark-rate', type=float, default=0.02,
+                            help='Share of marks that carry a remark.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed reads per month.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with schema_context(options['schema']), transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        baseline = self.sizes()
+
+        batch = Batch.objects.create(name="Storage benchmark")
+        students = self.seed_students(options['students'], batch)
+        days = self.school_days(options['days'])
+        marks = self.seed_marks(rng, batch, students, days, options['remark_rate'])
+        self.stdout.write(f"{len(students)} students x {len(days)} days = {marks} marks")
+
+        months = sorted({month_of(day) for day in days})
+        row_size = self.sizes()['rows'] - baseline['rows']
+        row_ms = self.time_reads(RowStore(), batch.id, months, options['repeat'])
+
+        pack_records(AttendanceRecord.objects.filter(batch=batch))
+        packed_size = self.sizes()['packed'] - baseline['packed']
+        packed_ms = self.time_reads(PackedStore(), batch.id, months, options['repeat'])
+
+        self.stdout.write(f"{'storage':<8} {'disk':>12} {'per mark':>10} {'month view (median)':>20}")
+        for name, size, ms in (('rows', row_size, row_ms), ('packed', packed_size, packed_ms)):
+            self.stdout.write(f"{name:<8} {size / 1024 / 1024:>9.1f} MB {size / marks:>8.1f} B {ms:>17.2f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"packed: {row_size / max(packed_size, 1):.1f}x smaller, {row_ms / max(packed_ms, 1e-6):.1f}x faster reads"
+        ))
+
+    # ------------------------------------------------------------------
+    def sizes(self):
+        """Bytes on disk (heap + indexes + TOAST) per storage mode."""
+        tables = {
+            'rows': [AttendanceRecord],
+            'packed': [AttendanceMonth, AttendanceRemark],
+        }
+        with connection.cursor() as cursor:
+            result = {}
+            for mode, models in tables.items():
+                result[mode] = 0
+                for model in models:
+                    cursor.execute('SELECT pg_total_relation_size(%s::regclass)', [model._meta.db_table])
+                    result[mode] += cursor.fetchone()[0]
+        return result
+
+    @staticmethod
+    def seed_students(n, batch):
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create([
+            User(username=f"bench-{tag}-{i}", role=User.Roles.STUDENT) for i in range(n)
+        ])
+        return StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, parent_name="Parent", parent_phone="9999999999",
+                           enrollment_number=f"BENCH-{tag}-{i}", batch=batch)
+            for i, user in enumerate(users)
+        ])
+
+    @staticmethod
+    def school_days(n):
+        days, day = [], date(date.today().year - 1, 1, 1)
+        while len(days) < n:
+            if day.weekday() < 5:
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    @staticmethod
+    def seed_marks(rng, batch, students, days, remark_rate):
+        statuses, weights = list(WEIGHTS), list(WEIGHTS.values())
+        marks = (
+            AttendanceRecord(
+                student=student, batch=batch, date=day,
+                status=rng.choices(statuses, weights)[0],
+                remarks="Left early" if rng.random() < remark_rate else '',
+            )
+            for day in days for student in students
+        )
+        count = 0
+        while chunk := list(islice(marks, 5000)):
+            AttendanceRecord.objects.bulk_create(chunk)
+            count += len(chunk)
+        return count
+
+    @staticmethod
+    def time_reads(store, batch_id, months, repeat):
+        for month in months:  # warm the cache
+            store.month_view(batch_id, month)
+        timings = []
+        for _ in range(repeat):
+            for month in months:
+                started = time.perf_counter()
+                store.month_view(batch_id, month)
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
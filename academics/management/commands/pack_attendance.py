@@ -0,0 +1,40 @@
+# academics/management/commands/pack_attendance.py
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from academics.attendance_store import pack_for_schema
+from tenants.utils import for_each_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves attendance marks into packed storage (or back with --unpack) in every tenant schema. "
+        "Run it right after changing ATTENDANCE_STORAGE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unpack', action='store_true',
+                            help='Move packed months back to one AttendanceRecord per mark.')
+        parser.add_argument('--schema', action='append', dest='schemas',
+                            help='Only convert these schemas (repeatable).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of schemas to convert in parallel.')
+
+    def handle(self, *args, **options):
+        target = 'rows' if options['unpack'] else 'packed'
+        if settings.ATTENDANCE_STORAGE != target:
+            self.stderr.write(self.style.WARNING(
+                f"ATTENDANCE_STORAGE is '{settings.ATTENDANCE_STORAGE}'; set it to '{target}' "
+                "or the API will not see the converted marks."
+            ))
+
+        total = 0
+        for schema_name, moved, seconds in for_each_tenant(
+            partial(pack_for_schema, options['unpack']),
+            schema_names=options['schemas'], workers=options['workers'],
+        ):
+            total += moved
+            self.stdout.write(f"{schema_name}: {moved} mark(s) moved ({seconds:.2f}s)")
+        self.stdout.write(self.style.SUCCESS(f"{total} mark(s) moved to {target} storage."))
@@ -0,0 +1,48 @@
+# academics/management/commands/rebuild_attendance_summary.py
+from datetime import datetime
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from academics.summaries import rebuild_for_schema
+from tenants.utils import for_each_tenant
+
+
+class Command(BaseCommand):
+    help = "Recomputes the monthly attendance summaries from the raw marks in every tenant schema."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First day as YYYY-MM-DD (default: start of this year).')
+        parser.add_argument('--to', dest='date_to', help='Last day as YYYY-MM-DD (default: today).')
+        parser.add_argument('--schema', action='append', dest='schemas',
+                            help='Only rebuild these schemas (repeatable).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of schemas to rebuild in parallel.')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        date_from = self.parse(options['date_from'], '--from') or today.replace(month=1, day=1)
+        date_to = self.parse(options['date_to'], '--to') or today
+        if date_from > date_to:
+            raise CommandError("--from must not be after --to")
+
+        total = 0
+        for schema_name, rows, seconds in for_each_tenant(
+            partial(rebuild_for_schema, date_from, date_to),
+            schema_names=options['schemas'], workers=options['workers'],
+        ):
+            total += rows
+            self.stdout.write(f"{schema_name}: {rows} summary row(s) ({seconds:.2f}s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} summary row(s) rebuilt for {date_from:%b %Y} - {date_to:%b %Y}."
+        ))
+
+    @staticmethod
+    def parse(value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"{option} must look like 2026-01-31")
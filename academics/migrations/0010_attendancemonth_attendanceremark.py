@@ -0,0 +1,42 @@
+# Generated by Django 4.2.12 on 2026-10-18 08:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0009_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRemark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('remarks', models.CharField(max_length=255)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_remarks', to='academics.batch')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_remarks', to='academics.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'batch', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('codes', models.BigIntegerField(default=0)),
+                ('marked', models.IntegerField(default=0)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='academics.batch')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='academics.studentprofile')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('student', 'batch', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.12 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0010_attendancemonth_attendanceremark'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancemonth',
+            index=models.Index(fields=['month', 'id'], name='attendance_month_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ),
+    ]
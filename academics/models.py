@@ -89,11 +89,87 @@ class AttendanceRecord(models.Model):
     class Meta:
         unique_together = ('student', 'batch', 'date')
         ordering = ['-date']
+        indexes = [
+            # Keyset pages and exports walk (date, id)
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.date} - {self.status}"
 
 
+class AttendanceMonth(models.Model):
+    """
+    Packed attendance (ATTENDANCE_STORAGE = 'packed'): one row per student,
+    batch and month instead of one AttendanceRecord per mark.
+    Day d's status is the 2-bit code at bit 2*(d-1) of `codes`; bit d-1 of
+    `marked` says whether the day was marked at all. See academics/packing.py.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_months')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='attendance_months')
+    month = models.DateField(help_text="First day of the month")
+    codes = models.BigIntegerField(default=0)
+    marked = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'batch', 'month')
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month', 'id'], name='attendance_month_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.month:%b %Y}"
+
+
+class AttendanceRemark(models.Model):
+    """Remarks for packed attendance. Only marks that have a remark get a row."""
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_remarks')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='attendance_remarks')
+    date = models.DateField()
+    remarks = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('student', 'batch', 'date')
+
+    def __str__(self):
+        return f"{self.student} - {self.date}: {self.remarks}"
+
+
+class AttendanceSummary(models.Model):
+    """
+    Monthly attendance counts per student and batch.
+    Kept in step with AttendanceRecord (see academics/summaries.py), so
+    percentages can be read without scanning the raw marks.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_summaries')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='attendance_summaries')
+    month = models.DateField(help_text="First day of the month")
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'batch', 'month')
+        ordering = ['-month']
+
+    @property
+    def total(self):
+        return self.present + self.absent + self.late + self.excused
+
+    @property
+    def percentage(self):
+        """Late counts as attended; excused days are left out of the total."""
+        counted = self.total - self.excused
+        if not counted:
+            return None
+        return round((self.present + self.late) * 100 / counted, 1)
+
+    def __str__(self):
+        return f"{self.student} - {self.month:%b %Y}: {self.percentage}%"
+
+
 class Exam(models.Model):
     name = models.CharField(max_length=100)
     batch = models.ForeignKey(Batch, on_delete=models.CASCADE)
@@ -0,0 +1,59 @@
+# academics/packing.py
+"""
+Bit layout of AttendanceMonth.
+
+Each day of the month gets 2 bits in `codes` (day 1 in bits 0-1, day 31 in
+bits 60-61, so a month fits a signed BIGINT). The 2-bit code is the
+status's index in STATUSES. `marked` has bit d-1 set when day d was
+marked, because code 0 (PRESENT) can't tell "present" from "not marked".
+"""
+from collections import Counter
+
+from django.conf import settings
+
+from .models import AttendanceRecord
+
+STATUSES = (
+    AttendanceRecord.Status.PRESENT,
+    AttendanceRecord.Status.ABSENT,
+    AttendanceRecord.Status.LATE,
+    AttendanceRecord.Status.EXCUSED,
+)
+CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+def packed_storage():
+    return settings.ATTENDANCE_STORAGE == 'packed'
+
+
+def set_day(codes, marked, day, status):
+    """Returns (codes, marked) with `day` (1-31) set to `status`."""
+    shift = 2 * (day - 1)
+    codes = (codes & ~(0b11 << shift)) | (CODES[status] << shift)
+    return codes, marked | (1 << (day - 1))
+
+
+def clear_day(codes, marked, day):
+    """Returns (codes, marked) with `day` (1-31) no longer marked."""
+    shift = 2 * (day - 1)
+    return codes & ~(0b11 << shift), marked & ~(1 << (day - 1))
+
+
+def is_marked(marked, day):
+    return 1 <= day <= 31 and bool(marked >> (day - 1) & 1)
+
+
+def days(codes, marked):
+    """Yields (day, status) for every marked day, in order."""
+    day = 1
+    while marked:
+        if marked & 1:
+            yield day, STATUSES[codes & 0b11]
+        marked >>= 1
+        codes >>= 2
+        day += 1
+
+
+def counts(codes, marked):
+    """Counter of status -> number of marked days."""
+    return Counter(status for _, status in days(codes, marked))
@@ -2,7 +2,10 @@
 from rest_framework import serializers
 from django.db import transaction
 from core.models import User
-from .models import StudentProfile, Batch, Subject, AttendanceRecord, Exam, StudentResult, StudyMaterial
+from .models import (
+    StudentProfile, Batch, Subject, AttendanceRecord, AttendanceSummary, Exam, StudentResult, StudyMaterial
+)
+from .attendance_store import get_store
 
 # ------------------------------------------------------------------
 # UTILITY SERIALIZERS
@@ -22,6 +25,61 @@ class AttendanceSerializer(serializers.ModelSerializer):
         model = AttendanceRecord
         fields = ['id', 'student', 'student_name', 'batch', 'date', 'status', 'remarks']
 
+class MarkBatchSerializer(serializers.Serializer):
+    """
+    Marks a whole batch for one day:
+    {"batch": 3, "date": "2026-01-05", "statuses": {"12": "P", "13": "A"}, "remarks": {"13": "Sick"}}
+    Status codes: P/A/L/E or the full PRESENT/ABSENT/LATE/EXCUSED.
+    """
+    CODES = {status[0]: status for status in AttendanceRecord.Status.values}
+
+    batch = serializers.PrimaryKeyRelatedField(queryset=Batch.objects.all())
+    date = serializers.DateField()
+    statuses = serializers.DictField(child=serializers.CharField(), allow_empty=False)
+    remarks = serializers.DictField(child=serializers.CharField(max_length=255, allow_blank=True), required=False)
+
+    def _student_ids(self, mapping, field):
+        try:
+            return {int(key): value for key, value in mapping.items()}
+        except ValueError:
+            raise serializers.ValidationError({field: "Keys must be student ids."})
+
+    def validate_statuses(self, value):
+        statuses = {}
+        for student_id, code in self._student_ids(value, 'statuses').items():
+            status = self.CODES.get(code.upper(), code.upper())
+            if status not in AttendanceRecord.Status.values:
+                raise serializers.ValidationError(f"Unknown status '{code}' for student {student_id}.")
+            statuses[student_id] = status
+        return statuses
+
+    def validate(self, attrs):
+        attrs['remarks'] = self._student_ids(attrs.get('remarks', {}), 'remarks')
+        # One query: which of these students really are in the batch?
+        members = set(
+            StudentProfile.objects.filter(batch=attrs['batch'], pk__in=attrs['statuses'])
+            .values_list('pk', flat=True)
+        )
+        outsiders = sorted(set(attrs['statuses']) - members)
+        if outsiders:
+            raise serializers.ValidationError({'statuses': f"Not in this batch: {outsiders}"})
+        return attrs
+
+    def save(self):
+        """Returns the number of students marked."""
+        data = self.validated_data
+        return get_store().mark(data['batch'].id, data['date'], data['statuses'], data['remarks'])
+
+class AttendanceSummarySerializer(serializers.ModelSerializer):
+    student_name = serializers.CharField(source='student.user.get_full_name', read_only=True)
+    batch_name = serializers.CharField(source='batch.name', read_only=True)
+    percentage = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = AttendanceSummary
+        fields = ['id', 'student', 'student_name', 'batch', 'batch_name', 'month',
+                  'present', 'absent', 'late', 'excused', 'percentage']
+
 # ------------------------------------------------------------------
 # STUDENT PROFILE
 # ------------------------------------------------------------------
@@ -30,6 +88,19 @@ class StudentProfileSerializer(serializers.ModelSerializer):
         model = StudentProfile
         fields = ['date_of_birth', 'address', 'parent_name', 'parent_phone', 'enrollment_number', 'batch']
 
+class StudentUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+
+class StudentProfileReadSerializer(serializers.ModelSerializer):
+    """Read side of the student directory (the dashboard shows user.username)."""
+    user = StudentUserSerializer(read_only=True)
+
+    class Meta:
+        model = StudentProfile
+        fields = ['id', 'user', 'date_of_birth', 'address', 'parent_name', 'parent_phone', 'enrollment_number', 'batch']
+
 # ------------------------------------------------------------------
 # STUDENT REGISTRATION (ATOMIC)
 # ------------------------------------------------------------------
@@ -0,0 +1,39 @@
+# academics/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core import dashboard
+from core.utils import on_commit_in_schema
+from tenants import rollups
+from .models import StudentProfile, Batch, AttendanceRecord
+from .summaries import refresh_summaries
+
+
+@receiver(post_save, sender=StudentProfile)
+def student_added(sender, instance, created, **kwargs):
+    if created:
+        dashboard.bump(dashboard.STUDENTS, 1)
+        on_commit_in_schema(lambda: rollups.record_students(1))
+
+
+@receiver(post_delete, sender=StudentProfile)
+def student_removed(sender, instance, **kwargs):
+    dashboard.bump(dashboard.STUDENTS, -1)
+    on_commit_in_schema(lambda: rollups.record_students(-1))
+
+
+@receiver(post_save, sender=Batch)
+def batch_added(sender, instance, created, **kwargs):
+    if created:
+        dashboard.bump(dashboard.BATCHES, 1)
+
+
+@receiver(post_delete, sender=Batch)
+def batch_removed(sender, instance, **kwargs):
+    dashboard.bump(dashboard.BATCHES, -1)
+
+
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def attendance_changed(sender, instance, **kwargs):
+    refresh_summaries([(instance.student_id, instance.batch_id, instance.date)])
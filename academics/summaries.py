@@ -0,0 +1,128 @@
+# academics/summaries.py
+"""
+Keeps AttendanceSummary in step with the stored marks (AttendanceRecord
+rows, or AttendanceMonth in packed storage).
+
+Writes only recount the (student, batch, month) keys they touched, with one
+grouped query over at most a month of marks per key. rebuild_summaries()
+regenerates whole months.
+"""
+from collections import defaultdict
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+from .models import AttendanceRecord, AttendanceMonth, AttendanceSummary
+from .packing import counts, packed_storage
+
+STATUS_FIELDS = {
+    AttendanceRecord.Status.PRESENT: 'present',
+    AttendanceRecord.Status.ABSENT: 'absent',
+    AttendanceRecord.Status.LATE: 'late',
+    AttendanceRecord.Status.EXCUSED: 'excused',
+}
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _counts(records):
+    """One grouped query: counts per (student, batch, month)."""
+    return (
+        records.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('student_id', 'batch_id', 'month')
+        .annotate(**{
+            field: Count('id', filter=Q(status=status))
+            for status, field in STATUS_FIELDS.items()
+        })
+    )
+
+
+def _packed_counts(months):
+    """Same rows as _counts(), decoded from AttendanceMonth bits in Python."""
+    rows = []
+    for student_id, batch_id, month, codes, marked in months.filter(marked__gt=0).values_list(
+        'student_id', 'batch_id', 'month', 'codes', 'marked'
+    ):
+        tally = counts(codes, marked)
+        rows.append({
+            'student_id': student_id, 'batch_id': batch_id, 'month': month,
+            **{field: tally[status] for status, field in STATUS_FIELDS.items()},
+        })
+    return rows
+
+
+def _upsert(rows):
+    AttendanceSummary.objects.bulk_create(
+        [AttendanceSummary(**row) for row in rows],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['student', 'batch', 'month'],
+        update_fields=list(STATUS_FIELDS.values()),
+    )
+
+
+def refresh_summaries(keys):
+    """Recounts the given (student_id, batch_id, month) keys."""
+    keys = {(student_id, batch_id, month_of(month)) for student_id, batch_id, month in keys}
+    if not keys:
+        return
+
+    # Group the keys so the WHERE clause stays one range per (batch, month)
+    students = defaultdict(set)
+    for student_id, batch_id, month in keys:
+        students[(batch_id, month)].add(student_id)
+    with transaction.atomic():
+        if packed_storage():
+            rows = _packed_counts(AttendanceMonth.objects.filter(reduce(or_, (
+                Q(batch_id=batch_id, month=month, student_id__in=ids)
+                for (batch_id, month), ids in students.items()
+            ))))
+        else:
+            rows = list(_counts(AttendanceRecord.objects.filter(reduce(or_, (
+                Q(batch_id=batch_id, date__gte=month, date__lt=next_month(month), student_id__in=ids)
+                for (batch_id, month), ids in students.items()
+            )))))
+        _upsert(rows)
+        # Keys whose last mark was deleted
+        emptied = keys - {(r['student_id'], r['batch_id'], r['month']) for r in rows}
+        if emptied:
+            AttendanceSummary.objects.filter(reduce(or_, (
+                Q(student_id=student_id, batch_id=batch_id, month=month)
+                for student_id, batch_id, month in emptied
+            ))).delete()
+
+
+def refresh_batch_day(batch_id, day, student_ids):
+    refresh_summaries((student_id, batch_id, day) for student_id in student_ids)
+
+
+def rebuild_summaries(date_from, date_to):
+    """
+    Regenerates every summary for the months between date_from and date_to.
+    Returns the number of summary rows written.
+    """
+    first, last = month_of(date_from), next_month(month_of(date_to))
+    with transaction.atomic():
+        AttendanceSummary.objects.filter(month__gte=first, month__lt=last).delete()
+        if packed_storage():
+            rows = _packed_counts(AttendanceMonth.objects.filter(month__gte=first, month__lt=last))
+        else:
+            rows = list(_counts(AttendanceRecord.objects.filter(date__gte=first, date__lt=last)))
+        _upsert(rows)
+    return len(rows)
+
+
+def rebuild_for_schema(date_from, date_to, schema_name):
+    """for_each_tenant() entry point for `manage.py rebuild_attendance_summary`."""
+    return rebuild_summaries(date_from, date_to)
@@ -1,8 +1,24 @@
 # academics/tests.py
+import json
+from datetime import date
+from itertools import count
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
 from core.models import User, Institute
+from core.testing import QueryCountMixin
+from .models import (
+    StudentProfile, Subject, Batch, AttendanceRecord, AttendanceMonth, AttendanceRemark, AttendanceSummary,
+    Exam, StudentResult, StudyMaterial
+)
+from .attendance_store import pack_records, unpack_months
+from .packing import counts, days, set_day
+from .summaries import rebuild_summaries
 
 class StudentOnboardingTests(APITestCase):
     def setUp(self):
@@ -62,4 +78,362 @@ class StudentOnboardingTests(APITestCase):
         self.client.logout() # Remove authentication
         url = reverse('students-list')
         response = self.client.post(url, {}, format='json')
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+# ------------------------------------------------------------------
+# N+1 GUARDS (Query count must not depend on the number of rows)
+# ------------------------------------------------------------------
+_serial = count(1)
+
+
+def seed_students(n, batch=None):
+    """Bulk-creates n students (user + profile) for query-count tests."""
+    numbers = [next(_serial) for _ in range(n)]
+    users = User.objects.bulk_create([
+        User(username=f"seed_student_{i}", first_name="Seed", last_name=str(i), role=User.Roles.STUDENT)
+        for i in numbers
+    ])
+    return StudentProfile.objects.bulk_create([
+        StudentProfile(user=user, parent_name="Parent", parent_phone="9999999999",
+                       enrollment_number=f"SEED-{i}", batch=batch)
+        for user, i in zip(users, numbers)
+    ])
+
+
+def seed_batches(n, subjects=(), teachers=()):
+    batches = Batch.objects.bulk_create([Batch(name=f"Batch {next(_serial)}") for _ in range(n)])
+    Batch.subjects.through.objects.bulk_create([
+        Batch.subjects.through(batch=batch, subject=subject) for batch in batches for subject in subjects
+    ])
+    Batch.teachers.through.objects.bulk_create([
+        Batch.teachers.through(batch=batch, user=teacher) for batch in batches for teacher in teachers
+    ])
+    return batches
+
+
+class AcademicsListQueryTests(QueryCountMixin, TenantTestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="academics_admin", password="password123",
+                                              role=User.Roles.INSTITUTE_ADMIN)
+        self.api = self.api_client_for(self.admin)
+        self.batch = Batch.objects.create(name="Class 10")
+        self.subject = Subject.objects.create(name="Mathematics", code="MATH101")
+
+    def test_students(self):
+        self.assertConstantListQueries(self.api, 'students-list', seed_students)
+
+    def test_subjects(self):
+        self.assertConstantListQueries(self.api, 'subjects-list', lambda n: Subject.objects.bulk_create(
+            [Subject(name=f"Subject {next(_serial)}", code="SUB") for _ in range(n)]
+        ))
+
+    def test_batches(self):
+        teacher = User.objects.create_user(username="batch_teacher", role=User.Roles.TEACHER)
+        self.assertConstantListQueries(self.api, 'batches-list', lambda n: seed_batches(
+            n, subjects=[self.subject], teachers=[teacher]
+        ))
+
+    def test_attendance(self):
+        self.assertConstantListQueries(self.api, 'attendance-list', lambda n: AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(student=student, batch=self.batch, date=date(2026, 1, 5))
+            for student in seed_students(n, self.batch)
+        ]))
+
+    def test_exams(self):
+        self.assertConstantListQueries(self.api, 'exams-list', lambda n: Exam.objects.bulk_create([
+            Exam(name="Unit Test", batch=batch, date=date(2026, 1, 5)) for batch in seed_batches(n)
+        ]))
+
+    def test_results(self):
+        exam = Exam.objects.create(name="Unit Test", batch=self.batch, date=date(2026, 1, 5))
+        self.assertConstantListQueries(self.api, 'results-list', lambda n: StudentResult.objects.bulk_create([
+            StudentResult(student=student, exam=exam, subject=self.subject, marks_obtained=80)
+            for student in seed_students(n, self.batch)
+        ]))
+
+    def test_materials(self):
+        self.assertConstantListQueries(self.api, 'materials-list', lambda n: StudyMaterial.objects.bulk_create([
+            StudyMaterial(title="Notes", file="study_materials/notes.pdf", batch=batch)
+            for batch in seed_batches(n)
+        ]))
+
+
+class AttendanceApiTestCase(QueryCountMixin, TenantTestCase):
+    """Three students marked on three days (nine rows)."""
+
+    def setUp(self):
+        admin = User.objects.create_user(username="paging_admin", role=User.Roles.INSTITUTE_ADMIN)
+        self.api = self.api_client_for(admin)
+        batch = Batch.objects.create(name="Class 10")
+        students = seed_students(3, batch)
+        # Several marks share a date, so the cursor has to break ties on id
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(student=student, batch=batch, date=date(2026, 1, day))
+            for student in students for day in (5, 6, 7)
+        ])
+
+
+class AttendancePaginationTests(AttendanceApiTestCase):
+    def test_pages_walk_every_row_once_in_order(self):
+        seen, url = [], reverse('attendance-list') + '?page_size=4'
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 4)
+            seen += [(row['date'], row['id']) for row in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.api.get(reverse('attendance-list') + '?page_size=4').data
+        second = self.api.get(first['next']).data
+        back = self.api.get(second['previous']).data
+        self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+
+
+class AttendanceExportTests(AttendanceApiTestCase):
+    def export(self, query):
+        response = self.api.get(reverse('attendance-export') + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_filtered_by_date(self):
+        lines = self.export('?date_from=2026-01-06&date_to=2026-01-06').splitlines()
+        self.assertEqual(lines[0], 'id,date,batch,enrollment_number,username,status,remarks')
+        self.assertEqual(len(lines), 1 + 3)
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('?output=ndjson').splitlines()]
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[0]['date'], '2026-01-05')
+
+    def test_bad_date_is_rejected(self):
+        response = self.api.get(reverse('attendance-export') + '?date_from=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class MarkBatchTests(QueryCountMixin, TenantTestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(username="mark_teacher", role=User.Roles.TEACHER)
+        self.api = self.api_client_for(teacher)
+        self.batch = Batch.objects.create(name="Class 10")
+        self.students = seed_students(60, self.batch)
+
+    def mark(self, statuses, **extra):
+        return self.api.post(reverse('attendance-mark-batch'), {
+            "batch": self.batch.id, "date": "2026-01-05", "statuses": statuses, **extra
+        }, format='json')
+
+    def test_whole_batch_in_a_few_queries(self):
+        statuses = {str(s.id): "P" for s in self.students}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.mark(statuses)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["marked"], 60)
+        statements = [q['sql'].split()[0] for q in ctx.captured_queries]
+        self.assertLessEqual(statements.count('SELECT'), 4)  # batch, members, summary counts (+ tenant lookup)
+        self.assertEqual(statements.count('INSERT'), 2)  # marks upsert + summary upsert
+
+    def test_resubmitting_the_day_updates_instead_of_failing(self):
+        first = self.students[0]
+        self.mark({str(first.id): "P"})
+        response = self.mark({str(first.id): "a"}, remarks={str(first.id): "Sick"})
+
+        self.assertEqual(response.status_code, 200)
+        record = AttendanceRecord.objects.get(student=first, date=date(2026, 1, 5))
+        self.assertEqual(record.status, AttendanceRecord.Status.ABSENT)
+        self.assertEqual(record.remarks, "Sick")
+
+    def test_students_from_other_batches_are_rejected(self):
+        outsider = seed_students(1)[0]
+        response = self.mark({str(outsider.id): "P"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+
+class AttendanceSummaryTests(QueryCountMixin, TenantTestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(username="summary_teacher", role=User.Roles.TEACHER)
+        self.api = self.api_client_for(teacher)
+        self.batch = Batch.objects.create(name="Class 10")
+        self.student, self.other = seed_students(2, self.batch)
+
+    def mark(self, day, status_code):
+        return self.api.post(reverse('attendance-mark-batch'), {
+            "batch": self.batch.id, "date": day, "statuses": {str(self.student.id): status_code}
+        }, format='json')
+
+    def summary(self):
+        return AttendanceSummary.objects.get(student=self.student, month=date(2026, 1, 1))
+
+    def test_mark_batch_keeps_the_month_current(self):
+        for day, code in (("2026-01-05", "P"), ("2026-01-06", "A"), ("2026-01-07", "L"), ("2026-01-08", "E")):
+            self.mark(day, code)
+        self.mark("2026-01-06", "P")  # corrected
+
+        summary = self.summary()
+        self.assertEqual((summary.present, summary.absent, summary.late, summary.excused), (2, 0, 1, 1))
+        self.assertEqual(summary.percentage, 100.0)
+
+    def test_single_record_edits_and_deletes(self):
+        record = AttendanceRecord.objects.create(student=self.student, batch=self.batch, date=date(2026, 1, 5))
+        AttendanceRecord.objects.create(student=self.student, batch=self.batch, date=date(2026, 1, 6),
+                                        status=AttendanceRecord.Status.ABSENT)
+        self.assertEqual(self.summary().percentage, 50.0)
+
+        record.delete()
+        self.assertEqual(self.summary().percentage, 0.0)
+        AttendanceRecord.objects.filter(student=self.student).delete()  # queryset delete still signals
+        self.assertFalse(AttendanceSummary.objects.exists())
+
+    def test_rebuild_matches_raw_marks(self):
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(student=student, batch=self.batch, date=date(2026, month, 5))
+            for student in (self.student, self.other) for month in (1, 2)
+        ])
+        self.assertFalse(AttendanceSummary.objects.exists())  # bulk_create bypasses signals
+
+        self.assertEqual(rebuild_summaries(date(2026, 1, 1), date(2026, 2, 28)), 4)
+        self.assertEqual(self.summary().present, 1)
+
+    def test_endpoint_filters_by_month_and_hides_other_students(self):
+        self.mark("2026-01-05", "P")
+        self.mark("2026-02-05", "A")
+        response = self.api.get(reverse('attendance-summary-list') + '?month=2026-01')
+        self.assertEqual([row['percentage'] for row in response.data['results']], [100.0])
+
+        own = self.api_client_for(self.other.user).get(reverse('attendance-summary-list'))
+        self.assertEqual(own.data['results'], [])
+
+    def test_list_queries_are_constant(self):
+        self.assertConstantListQueries(self.api, 'attendance-summary-list', lambda n: AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(student=student, batch=self.batch, month=date(2026, 1, 1), present=1)
+            for student in seed_students(n, self.batch)
+        ]))
+
+
+class PackingTests(SimpleTestCase):
+    def test_round_trip_every_day_and_status(self):
+        codes = marked = 0
+        expected = {}
+        for day in range(1, 32):
+            status = AttendanceRecord.Status.values[day % 4]
+            codes, marked = set_day(codes, marked, day, status)
+            expected[day] = status
+        self.assertLess(codes, 2 ** 63)  # fits a signed BIGINT
+        self.assertLess(marked, 2 ** 31)
+        self.assertEqual(dict(days(codes, marked)), expected)
+
+    def test_re_marking_a_day_replaces_its_code(self):
+        codes, marked = set_day(0, 0, 3, AttendanceRecord.Status.ABSENT)
+        codes, marked = set_day(codes, marked, 3, AttendanceRecord.Status.PRESENT)
+        self.assertEqual(list(days(codes, marked)), [(3, AttendanceRecord.Status.PRESENT)])
+        self.assertEqual(counts(codes, marked)[AttendanceRecord.Status.PRESENT], 1)
+
+
+@override_settings(ATTENDANCE_STORAGE='packed')
+class PackedAttendanceTests(QueryCountMixin, TenantTestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(username="packed_teacher", role=User.Roles.TEACHER)
+        self.api = self.api_client_for(teacher)
+        self.batch = Batch.objects.create(name="Class 10")
+        self.students = seed_students(3, self.batch)
+
+    def mark(self, day, code, remarks=None):
+        return self.api.post(reverse('attendance-mark-batch'), {
+            "batch": self.batch.id, "date": day,
+            "statuses": {str(s.id): code for s in self.students}, "remarks": remarks or {},
+        }, format='json')
+
+    def test_mark_batch_writes_one_row_per_student_month(self):
+        first = self.students[0]
+        self.mark("2026-01-05", "P")
+        self.mark("2026-01-06", "A", remarks={str(first.id): "Sick"})
+        self.mark("2026-01-06", "L")  # re-mark clears the remark
+
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertEqual(AttendanceMonth.objects.count(), 3)
+        self.assertFalse(AttendanceRemark.objects.exists())
+        summary = AttendanceSummary.objects.get(student=first)
+        self.assertEqual((summary.present, summary.late), (1, 1))
+
+    def test_list_and_create_keep_the_row_contract(self):
+        self.mark("2026-01-05", "P")
+        created = self.api.post(reverse('attendance-list'), {
+            "student": self.students[0].id, "batch": self.batch.id, "date": "2026-01-07",
+            "status": "EXCUSED", "remarks": "Exam leave",
+        }, format='json')
+        self.assertEqual(created.status_code, 201)
+
+        results = self.api.get(reverse('attendance-list')).data['results']
+        self.assertEqual(len(results), 4)
+        row = next(r for r in results if r['date'] == '2026-01-07')
+        self.assertEqual((row['id'], row['status'], row['remarks']), (created.data['id'], 'EXCUSED', 'Exam leave'))
+        self.assertTrue(row['student_name'])
+
+    def test_detail_update_and_delete_by_packed_id(self):
+        self.mark("2026-01-05", "P")
+        self.mark("2026-01-06", "A")
+        first = self.students[0]
+        row = next(r for r in self.api.get(reverse('attendance-list')).data['results']
+                   if r['student'] == first.id and r['date'] == '2026-01-06')
+        url = reverse('attendance-detail', args=[row['id']])
+        self.assertEqual(self.api.get(url).data['status'], 'ABSENT')
+
+        patched = self.api.patch(url, {"status": "LATE", "remarks": "Bus"}, format='json')
+        self.assertEqual(patched.status_code, 200)
+        self.assertEqual((patched.data['id'], patched.data['status']), (row['id'], 'LATE'))
+        self.assertEqual(AttendanceRemark.objects.get(student=first).remarks, "Bus")
+
+        self.assertEqual(self.api.delete(url).status_code, 204)
+        self.assertEqual(self.api.get(url).status_code, 404)
+        self.assertFalse(AttendanceRemark.objects.exists())
+        summary = AttendanceSummary.objects.get(student=first)
+        self.assertEqual((summary.present, summary.absent, summary.late), (1, 0, 0))
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    def test_export_respects_mid_month_dates(self):
+        self.mark("2026-01-05", "P")
+        self.mark("2026-01-20", "A")
+        response = self.api.get(reverse('attendance-export') + '?date_from=2026-01-10')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1 + 3)
+        self.assertIn('ABSENT', lines[1])
+
+    def test_list_queries_are_constant(self):
+        self.assertConstantListQueries(self.api, 'attendance-list', lambda n: AttendanceMonth.objects.bulk_create([
+            AttendanceMonth(student=student, batch=self.batch, month=date(2026, 1, 1), codes=0, marked=0b111)
+            for student in seed_students(n, self.batch)
+        ]), sizes=(10, 200))
+
+    def test_pack_and_unpack_round_trip(self):
+        with self.settings(ATTENDANCE_STORAGE='rows'):
+            AttendanceRecord.objects.bulk_create([
+                AttendanceRecord(student=student, batch=self.batch, date=date(2026, 1, day),
+                                 status=AttendanceRecord.Status.LATE if day == 6 else AttendanceRecord.Status.PRESENT,
+                                 remarks="Bus" if day == 6 else '')
+                for student in self.students for day in (5, 6, 7)
+            ])
+            # Two student-months per chunk, so the last chunk is a partial one
+            self.assertEqual(pack_records(chunk_size=2), 9)
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertEqual(AttendanceMonth.objects.filter(marked=0b1110000).count(), 3)
+        self.assertEqual(AttendanceRemark.objects.count(), 3)
+
+        self.assertEqual(unpack_months(), 9)
+        late = AttendanceRecord.objects.get(student=self.students[0], date=date(2026, 1, 6))
+        self.assertEqual((late.status, late.remarks), (AttendanceRecord.Status.LATE, "Bus"))
+        self.assertFalse(AttendanceMonth.objects.exists())
+
+    def test_unpack_overwrites_existing_rows(self):
+        self.mark("2026-01-05", "P")
+        AttendanceRecord.objects.create(student=self.students[0], batch=self.batch, date=date(2026, 1, 5),
+                                        status=AttendanceRecord.Status.ABSENT, remarks="Stale")
+
+        self.assertEqual(unpack_months(), 3)
+        self.assertEqual(AttendanceRecord.objects.count(), 3)
+        record = AttendanceRecord.objects.get(student=self.students[0], date=date(2026, 1, 5))
+        self.assertEqual((record.status, record.remarks), (AttendanceRecord.Status.PRESENT, ''))
@@ -11,12 +11,14 @@ from .views import (
     SubjectViewSet,
     BatchViewSet,
     AttendanceViewSet,
+    AttendanceSummaryViewSet,
 )
 
 router = DefaultRouter()
 router.register(r'students', StudentViewSet, basename='students')
 router.register(r'subjects', SubjectViewSet, basename='subjects')
 router.register(r'batches', BatchViewSet, basename='batches')
+router.register(r'attendance-summary', AttendanceSummaryViewSet, basename='attendance-summary')
 router.register(r'attendance', AttendanceViewSet, basename='attendance')
 router.register(r'exams', ExamViewSet, basename='exams')
 router.register(r'results', StudentResultViewSet, basename='results')
@@ -4,17 +4,24 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import ValidationError
+from datetime import datetime
+from django.http import Http404
 
+from core.exports import export_dates, export_response, filter_export, stream_response
 from core.models import User
 from .models import (
-    StudentProfile, Subject, Batch, AttendanceRecord,
+    StudentProfile, Subject, Batch, AttendanceRecord, AttendanceMonth, AttendanceSummary,
     Exam, StudentResult, StudyMaterial
 )
 from .serializers import (
-    StudentRegisterSerializer, SubjectSerializer, BatchSerializer,
+    StudentRegisterSerializer, StudentProfileReadSerializer, SubjectSerializer, BatchSerializer,
     AttendanceSerializer, ExamSerializer, StudentResultSerializer,
-    StudyMaterialSerializer
+    StudyMaterialSerializer, MarkBatchSerializer, AttendanceSummarySerializer
 )
+from .attendance_store import get_store
+from .packing import packed_storage
+from .summaries import month_of
 
 class BaseAcademicsViewSet(viewsets.ModelViewSet):
     """
@@ -26,45 +33,178 @@ class BaseAcademicsViewSet(viewsets.ModelViewSet):
     # Batch.objects.all() IS ALREADY filtered by the schema middleware.
 
 class StudentViewSet(BaseAcademicsViewSet):
-    queryset = StudentProfile.objects.all()
+    queryset = StudentProfile.objects.select_related('user')
     
     def get_serializer_class(self):
         if self.action == "create":
             return StudentRegisterSerializer
-        return StudentRegisterSerializer # Use a read serializer in production
+        return StudentProfileReadSerializer
 
 class SubjectViewSet(BaseAcademicsViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
 class BatchViewSet(BaseAcademicsViewSet):
-    queryset = Batch.objects.all()
+    queryset = Batch.objects.prefetch_related('subjects', 'teachers')
     serializer_class = BatchSerializer
 
 class AttendanceViewSet(BaseAcademicsViewSet):
-    queryset = AttendanceRecord.objects.all()
+    """
+    With ATTENDANCE_STORAGE = 'packed' every route reads and writes
+    AttendanceMonth instead. Marks then carry the packed id (see
+    attendance_store.mark_id), and a list page holds `page_size` student-months.
+    """
+    queryset = AttendanceRecord.objects.select_related('student__user')
     serializer_class = AttendanceSerializer
 
+    @property
+    def cursor_ordering(self):
+        return ('-month', '-id') if packed_storage() else ('-date', '-id')
+
+    def list(self, request, *args, **kwargs):
+        if not packed_storage():
+            return super().list(request, *args, **kwargs)
+        store = get_store()
+        months = self.paginate_queryset(store.months())
+        return self.get_paginated_response(self.get_serializer(store.records(months), many=True).data)
+
     def create(self, request, *args, **kwargs):
         """Allow Bulk Creation of Attendance"""
         many = isinstance(request.data, list)
         serializer = self.get_serializer(data=request.data, many=many)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if packed_storage():
+            items = serializer.validated_data if many else [serializer.validated_data]
+            records = [AttendanceRecord(**item) for item in items]
+            get_store().write(records)
+            serializer = self.get_serializer(records if many else records[0], many=many)
+        else:
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def get_object(self):
+        if not packed_storage():
+            return super().get_object()
+        try:
+            record = get_store().get(int(self.kwargs[self.lookup_field]))
+        except ValueError:
+            record = None
+        if record is None:
+            raise Http404
+        self.check_object_permissions(self.request, record)
+        return record
+
+    def perform_update(self, serializer):
+        if not packed_storage():
+            return super().perform_update(serializer)
+        old = serializer.instance
+        new = AttendanceRecord(student_id=old.student_id, batch_id=old.batch_id, date=old.date,
+                               status=old.status, remarks=old.remarks)
+        for attr, value in serializer.validated_data.items():
+            setattr(new, attr, value)
+        get_store().replace(old, new)
+        serializer.instance = new
+
+    def perform_destroy(self, instance):
+        if packed_storage():
+            get_store().delete(instance)
+        else:
+            instance.delete()
+
+    @action(detail=False, methods=['post'], url_path='mark-batch')
+    def mark_batch(self, request):
+        """
+        Marks (or re-marks) a whole batch for one date in a single upsert.
+        Body: {"batch": id, "date": "YYYY-MM-DD", "statuses": {student_id: "P"|"A"|"L"|"E"}, "remarks": {...}}
+        """
+        if request.user.role not in (User.Roles.INSTITUTE_ADMIN, User.Roles.TEACHER):
+            return Response({"error": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = MarkBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = serializer.save()
+        return Response({
+            "batch": serializer.validated_data['batch'].id,
+            "date": serializer.validated_data['date'],
+            "marked": marked,
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Streams every mark as CSV/NDJSON. Filters: date_from, date_to, batch, output."""
+        if packed_storage():
+            return self.export_packed(request)
+        queryset = filter_export(request, self.get_queryset(), 'date', 'batch').order_by('date', 'id')
+        return export_response(request, queryset, [
+            ('id', 'id'),
+            ('date', 'date'),
+            ('batch', 'batch__name'),
+            ('enrollment_number', 'student__enrollment_number'),
+            ('username', 'student__user__username'),
+            ('status', 'status'),
+            ('remarks', 'remarks'),
+        ], filename='attendance')
+
+    def export_packed(self, request):
+        # Same columns as the row export, in (month, student) order
+        date_from, date_to = export_dates(request)
+        months = filter_export(request, AttendanceMonth.objects.select_related('student__user', 'batch'), None, 'batch')
+        if date_from:
+            months = months.filter(month__gte=month_of(date_from))
+        if date_to:
+            months = months.filter(month__lte=date_to)
+        rows = (
+            (r.id, r.date, r.batch.name, r.student.enrollment_number, r.student.user.username, r.status, r.remarks)
+            for r in get_store().iter_records(months.order_by('month', 'student_id', 'id'), date_from, date_to)
+        )
+        headers = ['id', 'date', 'batch', 'enrollment_number', 'username', 'status', 'remarks']
+        return stream_response(request, headers, rows, filename='attendance')
+
+class AttendanceSummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Monthly attendance totals and percentage per student and batch, read
+    from the precomputed AttendanceSummary table.
+    Filters: ?student=<id>, ?batch=<id>, ?month=YYYY-MM
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = AttendanceSummarySerializer
+    cursor_ordering = ('-month', 'id')
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = AttendanceSummary.objects.select_related('student__user', 'batch')
+        if user.role == User.Roles.STUDENT:
+            queryset = queryset.filter(student__user=user)
+        elif user.role == User.Roles.PARENT:
+            queryset = queryset.filter(student__parents=user)
+
+        params = self.request.query_params
+        for param in ('student', 'batch'):
+            if params.get(param):
+                if not params[param].isdigit():
+                    raise ValidationError({param: f"Must be a {param} id."})
+                queryset = queryset.filter(**{param: params[param]})
+        if params.get('month'):
+            try:
+                month = datetime.strptime(params['month'], '%Y-%m').date()
+            except ValueError:
+                raise ValidationError({'month': "Use the YYYY-MM format."})
+            queryset = queryset.filter(month=month)
+        return queryset
+
 class ExamViewSet(BaseAcademicsViewSet):
-    queryset = Exam.objects.all()
+    queryset = Exam.objects.select_related('batch')
     serializer_class = ExamSerializer
 
 class StudentResultViewSet(BaseAcademicsViewSet):
     serializer_class = StudentResultSerializer
 
     def get_queryset(self):
+        queryset = StudentResult.objects.select_related('exam', 'subject')
         # Additional logic: Students only see THEIR OWN results
         if self.request.user.role == User.Roles.STUDENT:
-            return StudentResult.objects.filter(student__user=self.request.user)
-        return StudentResult.objects.all()
+            return queryset.filter(student__user=self.request.user)
+        return queryset
 
 class StudyMaterialViewSet(BaseAcademicsViewSet):
     serializer_class = StudyMaterialSerializer
@@ -72,9 +212,10 @@ class StudyMaterialViewSet(BaseAcademicsViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = StudyMaterial.objects.select_related('batch')
         if user.role == User.Roles.STUDENT:
             # Only show materials for the student's batch
             if hasattr(user, 'student_profile') and user.student_profile.batch:
-                return StudyMaterial.objects.filter(batch=user.student_profile.batch)
-            return StudyMaterial.objects.none()
-        return StudyMaterial.objects.all()
\ No newline at end of file
+                return queryset.filter(batch=user.student_profile.batch)
+            return queryset.none()
+        return queryset
\ No newline at end of file
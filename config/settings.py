@@ -65,7 +65,7 @@ AUTH_USER_MODEL = 'core.User'
 # MIDDLEWARE
 # ------------------------------------------------------------------------------
 MIDDLEWARE = [
-    'django_tenants.middleware.main.TenantMainMiddleware',  # <--- MUST BE FIRST
+    'tenants.middleware.CachedTenantMiddleware',  # <--- MUST BE FIRST (TenantMainMiddleware + hostname cache)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -118,6 +118,29 @@ DATABASE_ROUTERS = (
 TENANT_MODEL = "tenants.Client" 
 TENANT_DOMAIN_MODEL = "tenants.Domain"
 
+# Hostname -> tenant cache in tenants/middleware.py (per process)
+TENANT_CACHE_SIZE = env.int('TENANT_CACHE_SIZE', default=1000)
+# Seconds before a cached tenant is looked up again (bounds staleness in other processes)
+TENANT_CACHE_TTL = env.float('TENANT_CACHE_TTL', default=300)
+# Seconds an unknown hostname is remembered
+TENANT_CACHE_NEGATIVE_TTL = env.float('TENANT_CACHE_NEGATIVE_TTL', default=5)
+# Pre-migrated schemas kept ready for signups (tenants/spares.py)
+TENANT_SPARE_POOL_SIZE = env.int('TENANT_SPARE_POOL_SIZE', default=3)
+# Threads per web process that build new tenants after signup (tenants/provisioning.py)
+TENANT_PROVISIONING_THREADS = env.int('TENANT_PROVISIONING_THREADS', default=1)
+
+# ------------------------------------------------------------------------------
+# CACHE (Keys are prefixed with the schema name, so each tenant gets its own space)
+# ------------------------------------------------------------------------------
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+CACHES['default']['KEY_FUNCTION'] = 'django_tenants.cache.make_key'
+CACHES['default']['REVERSE_KEY_FUNCTION'] = 'django_tenants.cache.reverse_key'
+
+# How long dashboard widgets may be served from cache before a full recount
+DASHBOARD_STATS_TTL = env.int('DASHBOARD_STATS_TTL', default=300)
+
 # ------------------------------------------------------------------------------
 # PASSWORD VALIDATION
 # ------------------------------------------------------------------------------
@@ -169,6 +192,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Keyset (cursor) pages; views pick an indexed ordering via `cursor_ordering`
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': env.int('API_PAGE_SIZE', default=50),
 }
 
 SIMPLE_JWT = {
@@ -181,9 +207,41 @@ SIMPLE_JWT = {
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# ------------------------------------------------------------------------------
+# ATTENDANCE
+# ------------------------------------------------------------------------------
+# 'rows': one AttendanceRecord per mark.
+# 'packed': one AttendanceMonth per student-month, 2 bits per day (see academics/packing.py).
+# Run `manage.py pack_attendance` (or `--unpack`) when switching.
+ATTENDANCE_STORAGE = env('ATTENDANCE_STORAGE', default='rows')
+
+# ------------------------------------------------------------------------------
+# FEES
+# ------------------------------------------------------------------------------
+# Day of the month on which generated fee installments fall due
+FEE_DUE_DAY = env.int('FEE_DUE_DAY', default=10)
+
+# Rendered receipt PDFs, one file per payment: <dir>/<schema>/<payment id>.pdf
+RECEIPT_CACHE_DIR = env('RECEIPT_CACHE_DIR', default=os.path.join(MEDIA_ROOT, 'receipts'))
+# Threads that pre-render receipts after an online payment is verified
+RECEIPT_RENDER_THREADS = env.int('RECEIPT_RENDER_THREADS', default=2)
+# Processes that render pages for batch receipt downloads
+RECEIPT_RENDER_PROCESSES = env.int('RECEIPT_RENDER_PROCESSES', default=os.cpu_count() or 1)
+
 # ------------------------------------------------------------------------------
 # RAZORPAY SETTINGS (Phase 9)
 # ------------------------------------------------------------------------------
 # Get these from https://dashboard.razorpay.com/app/keys
 RAZORPAY_KEY_ID = env('RAZORPAY_KEY_ID', default='rzp_test_YOUR_KEY_HERE')
-RAZORPAY_KEY_SECRET = env('RAZORPAY_KEY_SECRET', default='YOUR_SECRET_HERE')
\ No newline at end of file
+RAZORPAY_KEY_SECRET = env('RAZORPAY_KEY_SECRET', default='YOUR_SECRET_HERE')
+# Set in Dashboard > Webhooks; signs the X-Razorpay-Signature header
+RAZORPAY_WEBHOOK_SECRET = env('RAZORPAY_WEBHOOK_SECRET', default='')
+RAZORPAY_BASE_URL = env('RAZORPAY_BASE_URL', default='https://api.razorpay.com')
+# Seconds to open a connection / to wait for a response. A slow gateway must not hold a worker.
+RAZORPAY_CONNECT_TIMEOUT = env.float('RAZORPAY_CONNECT_TIMEOUT', default=3.05)
+RAZORPAY_READ_TIMEOUT = env.float('RAZORPAY_READ_TIMEOUT', default=10)
+# Keep-alive connections kept per process
+RAZORPAY_POOL_SIZE = env.int('RAZORPAY_POOL_SIZE', default=10)
+# Fail fast for RAZORPAY_BREAKER_RESET seconds after this many gateway failures in a row
+RAZORPAY_BREAKER_FAILURES = env.int('RAZORPAY_BREAKER_FAILURES', default=5)
+RAZORPAY_BREAKER_RESET = env.float('RAZORPAY_BREAKER_RESET', default=30)
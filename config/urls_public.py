@@ -1,7 +1,7 @@
 # config/urls_public.py
 from django.contrib import admin
 from django.urls import path
-from tenants.views import TenantSignupView, TenantListView
+from tenants.views import TenantSignupView, TenantListView, TenantCacheStatsView, ProvisioningStatusView
 from django.http import HttpResponse
 
 def home_view(request):
@@ -26,12 +26,13 @@ def home_view(request):
             <button type="button" onclick="register()">Register Now</button>
         </form>
         <div id="msg" style="margin-top:20px;"></div>
+        <ul id="steps" style="display:inline-block; text-align:left; list-style:none; padding:0;"></ul>
 
         <script>
             async function register() {
                 const btn = document.querySelector('button');
                 btn.disabled = true;
-                btn.innerText = "Creating Database... (Wait 10s)";
+                btn.innerText = "Setting up...";
                 
                 const data = {
                     company_name: document.getElementById('c_name').value,
@@ -48,11 +49,9 @@ def home_view(request):
                     });
                     const json = await res.json();
                     
-                    if(res.ok) {
-                        document.getElementById('msg').innerHTML = 
-                            `<a href="${json.login_url}" style="color:green; font-weight:bold; font-size:1.2rem;">
-                                ✅ Success! Click here to enter ${data.company_name}
-                            </a>`;
+                    if(res.status === 202) {
+                        // The center is built in the background; poll until it is ready
+                        await waitForJob(json.status_url, data.company_name);
                     } else {
                         document.getElementById('msg').innerText = "Error: " + JSON.stringify(json);
                     }
@@ -62,20 +61,39 @@ def home_view(request):
                 btn.disabled = false;
                 btn.innerText = "Register Now";
             }
+
+            async function waitForJob(statusUrl, companyName) {
+                while (true) {
+                    const res = await fetch(statusUrl);
+                    const job = await res.json();
+                    showSteps(job.steps);
+
+                    if (job.status === 'DONE') {
+                        document.getElementById('msg').innerHTML = 
+                            `<a href="${job.login_url}" style="color:green; font-weight:bold; font-size:1.2rem;">
+                                ✅ Success! Click here to enter ${companyName}
+                            </a>`;
+                        return;
+                    }
+                    if (job.status === 'FAILED') {
+                        document.getElementById('msg').innerText = "Error: " + job.error;
+                        return;
+                    }
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                }
+            }
+
+            function showSteps(steps) {
+                document.getElementById('steps').innerHTML = steps.map(s =>
+                    `<li>${s.done ? '✅' : '⏳'} ${s.label}</li>`
+                ).join('');
+            }
         </script>
     </body>
     </html>
     """
     return HttpResponse(html)
 
-# config/urls_public.py
-from django.contrib import admin
-from django.urls import path
-from tenants.views import TenantSignupView, TenantListView # <--- Import this
-from django.http import HttpResponse
-
-# ... keep home_view ...
-
 def super_admin_dashboard(request):
     # We will inject the HTML for the dashboard here
     return HttpResponse("""
@@ -110,7 +128,10 @@ def super_admin_dashboard(request):
             <div class="card">
                 <div style="display:flex; justify-content:space-between; align-items:center;">
                     <h3>Registered Tuition Centers</h3>
-                    <button onclick="loadTenants()" class="btn" style="background:#0f172a;"><i class="fa-solid fa-sync"></i> Refresh</button>
+                    <div>
+                        <input type="search" id="search" placeholder="Search name or subdomain" onkeyup="searchTenants()" style="padding:8px;">
+                        <button onclick="loadTenants()" class="btn" style="background:#0f172a;"><i class="fa-solid fa-sync"></i> Refresh</button>
+                    </div>
                 </div>
                 <div id="loading">Loading data...</div>
                 <table id="tenant-table" style="display:none;">
@@ -119,21 +140,32 @@ def super_admin_dashboard(request):
                             <th>ID</th>
                             <th>Institute Name</th>
                             <th>Subdomain</th>
+                            <th>Students</th>
+                            <th>Revenue</th>
                             <th>Status</th>
                             <th>Action</th>
                         </tr>
                     </thead>
                     <tbody id="rows"></tbody>
                 </table>
+                <button id="more" onclick="loadTenants(nextUrl)" class="btn" style="display:none; margin-top:15px;">Load more</button>
             </div>
         </div>
 
         <script>
-            // 1. Fetch the data
-            async function loadTenants() {
+            let nextUrl = null;
+            let searchTimer = null;
+
+            // 1. Fetch one page (the API pages with a cursor; "Load more" follows `next`)
+            async function loadTenants(url) {
                 try {
+                    const append = Boolean(url);
+                    if (!append) {
+                        const q = document.getElementById('search').value.trim();
+                        url = '/api/tenants/' + (q ? '?search=' + encodeURIComponent(q) : '');
+                    }
                     // We rely on session auth for the superuser (since you are logged into /admin)
-                    const res = await fetch('/api/tenants/');
+                    const res = await fetch(url);
                     
                     if (res.status === 403) {
                         document.getElementById('loading').innerHTML = `<p style="color:red">Access Denied. Please <a href="/admin/login/?next=/super-admin/">Log In as Superuser</a> first.</p>`;
@@ -141,31 +173,38 @@ def super_admin_dashboard(request):
                     }
                     
                     const data = await res.json();
-                    renderTable(data);
+                    nextUrl = data.next;
+                    renderTable(data.results, append);
                 } catch (e) {
                     console.error(e);
                     document.getElementById('loading').innerText = "Error loading data.";
                 }
             }
 
-            // 2. Render the table
-            function renderTable(data) {
+            function searchTenants() {
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(() => loadTenants(), 300);
+            }
+
+            // 2. Render the table (public schema and spare schemas are already left out by the API)
+            function renderTable(data, append) {
                 document.getElementById('loading').style.display = 'none';
                 document.getElementById('tenant-table').style.display = 'table';
+                document.getElementById('more').style.display = nextUrl ? 'inline-block' : 'none';
                 const tbody = document.getElementById('rows');
-                tbody.innerHTML = '';
+                if (!append) tbody.innerHTML = '';
 
+                let html = '';
                 data.forEach(t => {
-                    // Exclude the 'public' tenant from the list to avoid confusion
-                    if (t.schema_name === 'public') return;
-
                     const dashboardUrl = `http://${t.domain_url}:8000/dashboard.html`;
                     
-                    tbody.innerHTML += `
+                    html += `
                         <tr>
                             <td>#${t.id}</td>
                             <td><span style="font-weight:bold; color:#0f172a;">${t.name}</span></td>
                             <td>${t.schema_name}</td>
+                            <td>${t.student_count}</td>
+                            <td>₹${Number(t.total_revenue).toLocaleString('en-IN')}</td>
                             <td><span class="status">ACTIVE</span></td>
                             <td>
                                 <a href="${dashboardUrl}" target="_blank" class="btn">
@@ -175,6 +214,7 @@ def super_admin_dashboard(request):
                         </tr>
                     `;
                 });
+                tbody.insertAdjacentHTML('beforeend', html);
             }
 
             // Load on startup
@@ -187,15 +227,11 @@ def super_admin_dashboard(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home_view, name='home'),
-    path('super-admin/', super_admin_dashboard, name='super-admin'), # <--- New Dashboard
-    
+    path('super-admin/', super_admin_dashboard, name='super-admin'),
+
     # APIs
     path('api/register/', TenantSignupView.as_view(), name='tenant-register'),
-    path('api/tenants/', TenantListView.as_view(), name='tenant-list'), # <--- New API
+    path('api/register/<uuid:job_id>/', ProvisioningStatusView.as_view(), name='tenant-register-status'),
+    path('api/tenants/', TenantListView.as_view(), name='tenant-list'),
+    path('api/tenant-cache/', TenantCacheStatsView.as_view(), name='tenant-cache-stats'),
 ]
-
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('', home_view, name='home'),
-    path('api/register/', TenantSignupView.as_view(), name='tenant-register'),
-]
\ No newline at end of file
@@ -0,0 +1,101 @@
+# core/dashboard.py
+"""
+Cached widget numbers for the Institute Admin dashboard.
+
+Every widget lives under its own cache key. The cache KEY_FUNCTION prefixes
+keys with the schema name, so each tuition center has its own counters.
+Model signals push deltas into these keys (or drop them) and the dashboard
+reads all of them with a single get_many(). A missing key is recounted from
+the database on the next read.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .utils import on_commit_in_schema
+
+STUDENTS = 'dashboard:students'
+BATCHES = 'dashboard:batches'
+FEE_DEFAULTERS = 'dashboard:fee_defaulters'
+
+
+def collection_key(day):
+    """Today's collection is stored in paise so it can be bumped with incr()."""
+    return f'dashboard:collection:{day.isoformat()}'
+
+
+def to_paise(amount):
+    return int(Decimal(amount) * 100)
+
+
+# ------------------------------------------------------------------
+# RECOUNT (Only runs for keys that are missing from the cache)
+# ------------------------------------------------------------------
+def _count_students():
+    from academics.models import StudentProfile
+    return StudentProfile.objects.count()
+
+
+def _count_batches():
+    from academics.models import Batch
+    return Batch.objects.count()
+
+
+def _count_fee_defaulters():
+    from finance.models import FeeInstallment
+    return FeeInstallment.objects.filter(status__in=FeeInstallment.DEFAULTER_STATUSES).count()
+
+
+def _sum_collection(day):
+    from finance.models import FeePayment
+    total = FeePayment.objects.filter(payment_date=day).aggregate(Sum('amount'))['amount__sum'] or 0
+    return to_paise(total)
+
+
+def get_institute_stats(refresh=False):
+    """
+    Returns the four Institute Admin numbers.
+    Warm path is one cache read; refresh=True recounts everything.
+    """
+    today = timezone.localdate()
+    counters = {
+        STUDENTS: _count_students,
+        BATCHES: _count_batches,
+        FEE_DEFAULTERS: _count_fee_defaulters,
+        collection_key(today): lambda: _sum_collection(today),
+    }
+
+    values = {} if refresh else cache.get_many(list(counters))
+    missing = {key: counters[key]() for key in counters if key not in values}
+    if missing:
+        cache.set_many(missing, timeout=settings.DASHBOARD_STATS_TTL)
+        values.update(missing)
+
+    return {
+        "student_count": values[STUDENTS],
+        "batch_count": values[BATCHES],
+        "today_collection": (Decimal(values[collection_key(today)]) / 100).quantize(Decimal("0.01")),
+        "fee_defaulters": values[FEE_DEFAULTERS],
+    }
+
+
+# ------------------------------------------------------------------
+# WRITE HOOKS (Called from model signals)
+# ------------------------------------------------------------------
+def bump(key, delta):
+    """Applies a delta to a cached counter. Cold keys are left for the next recount."""
+    def apply():
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+    on_commit_in_schema(apply)
+
+
+def invalidate(*keys):
+    """Drops counters whose new value cannot be derived from a delta."""
+    on_commit_in_schema(lambda: cache.delete_many(list(keys)))
@@ -0,0 +1,37 @@
+# core/explain.py
+"""
+The hot dashboard and list queries, paired with the index each one should
+use. Shared by the EXPLAIN tests and `manage.py explain_hot_queries`.
+"""
+from django.utils import timezone
+
+from academics.models import AttendanceRecord
+from finance.models import FeeInstallment, FeePayment
+
+PAGE = 51  # one keyset page (default PAGE_SIZE) plus the look-ahead row
+
+
+def hot_queries(today=None):
+    """[(label, queryset, index name)]"""
+    today = today or timezone.localdate()
+    Status = FeeInstallment.Status
+    return [
+        ("dashboard: fee defaulters",
+         FeeInstallment.objects.filter(status__in=FeeInstallment.DEFAULTER_STATUSES).values('id'),
+         'installment_defaulter_idx'),
+        ("overdue sweep",
+         FeeInstallment.objects.filter(status__in=[Status.PENDING, Status.PARTIAL], due_date__lt=today),
+         'installment_open_due_idx'),
+        ("installment list page",
+         FeeInstallment.objects.order_by('due_date', 'id')[:PAGE],
+         'installment_due_id_idx'),
+        ("dashboard: today's collection",
+         FeePayment.objects.filter(payment_date=today).values('amount'),
+         'payment_date_id_idx'),
+        ("payment list page",
+         FeePayment.objects.order_by('-payment_date', '-id')[:PAGE],
+         'payment_date_id_idx'),
+        ("attendance list page",
+         AttendanceRecord.objects.order_by('-date', '-id')[:PAGE],
+         'attendance_date_id_idx'),
+    ]
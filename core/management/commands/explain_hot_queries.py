@@ -0,0 +1,110 @@
+# core/management/commands/explain_hot_queries.py
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.utils import schema_context
+
+from academics.models import AttendanceRecord, Batch, StudentProfile
+from core.explain import hot_queries
+from core.models import User
+from finance.models import FeeInstallment, FeePayment, FeeStructure, StudentFeeAllocation
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds ~N rows each of installments, payments and attendance in one schema, runs EXPLAIN on "
+        "the dashboard and list queries and reports which index each one used. Everything is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', required=True, help='Tenant schema to run in.')
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Rows per table.')
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE (runs the queries).')
+
+    def handle(self, *args, **options):
+        with schema_context(options['schema']), transaction.atomic():
+            self.seed(options['rows'], options['students'])
+            missed = self.explain(options['analyze'])
+            transaction.set_rollback(True)
+        if missed:
+            self.stderr.write(self.style.ERROR(f"{missed} query(ies) did not use their index."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Every hot query used its index."))
+
+    def explain(self, analyze):
+        missed = 0
+        for label, queryset, index in hot_queries():
+            plan = queryset.explain(analyze=analyze)
+            used = index in plan
+            missed += not used
+            timing = [line.strip() for line in plan.splitlines() if line.startswith('Execution Time')]
+            self.stdout.write(f"{'OK ' if used else 'MISS'} {label} ({index}) {' '.join(timing)}")
+            self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        return missed
+
+    # ------------------------------------------------------------------
+    def seed(self, rows, students):
+        tag = uuid.uuid4().hex[:8]
+        batch = Batch.objects.create(name="Index benchmark")
+        users = User.objects.bulk_create([
+            User(username=f"explain-{tag}-{i}", role=User.Roles.STUDENT) for i in range(students)
+        ])
+        profiles = StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, parent_name="Parent", parent_phone="9999999999",
+                           enrollment_number=f"EXPLAIN-{tag}-{i}", batch=batch)
+            for i, user in enumerate(users)
+        ])
+        structure = FeeStructure.objects.create(name="Index benchmark", amount=1000)
+        allocations = StudentFeeAllocation.objects.bulk_create([
+            StudentFeeAllocation(student=profile, fee_structure=structure) for profile in profiles
+        ])
+
+        today = timezone.localdate()
+        start = today - timedelta(days=3 * 365)
+        allocation_ids = [a.id for a in allocations]
+        student_ids = [p.id for p in profiles]
+        days = -(-rows // students)  # ceil
+
+        with connection.cursor() as cursor:
+            self.stdout.write(f"Seeding {rows} installments ...")
+            # Bills come in due_date order and only the newest ~10% are still unpaid,
+            # which is how a real ledger ages.
+            cursor.execute(f'''
+                INSERT INTO "{FeeInstallment._meta.db_table}"
+                    (allocation_id, due_date, amount_due, amount_paid, status, period_start)
+                SELECT (%(allocations)s::int[])[1 + g %% %(n_allocations)s],
+                       %(start)s::date + (g::bigint * (%(today)s::date - %(start)s::date + 30) / %(rows)s)::int,
+                       1000,
+                       CASE WHEN g < %(rows)s * 0.9 THEN 1000 WHEN g %% 3 = 0 THEN 400 ELSE 0 END,
+                       CASE WHEN g < %(rows)s * 0.9 THEN 'PAID'
+                            WHEN g %% 3 = 0 THEN 'PARTIAL'
+                            WHEN g %% 3 = 1 THEN 'PENDING'
+                            ELSE 'OVERDUE' END,
+                       NULL
+                FROM generate_series(0, %(rows)s - 1) g
+            ''', {'allocations': allocation_ids, 'n_allocations': len(allocation_ids),
+                  'start': start, 'today': today, 'rows': rows})
+
+            self.stdout.write(f"Seeding {rows} payments ...")
+            cursor.execute(f'''
+                INSERT INTO "{FeePayment._meta.db_table}" (installment_id, amount, payment_date, mode, transaction_id)
+                SELECT id, amount_due, LEAST(due_date - 3, %(today)s::date), 'CASH', ''
+                FROM "{FeeInstallment._meta.db_table}"
+                WHERE allocation_id = ANY(%(allocations)s::int[])
+                ORDER BY id
+                LIMIT %(rows)s
+            ''', {'allocations': allocation_ids, 'today': today, 'rows': rows})
+
+            self.stdout.write(f"Seeding {students * days} attendance marks ...")
+            cursor.execute(f'''
+                INSERT INTO "{AttendanceRecord._meta.db_table}" (student_id, batch_id, date, status, remarks)
+                SELECT s, %(batch)s, %(today)s::date - d, CASE WHEN (s + d) %% 10 = 0 THEN 'ABSENT' ELSE 'PRESENT' END, ''
+                FROM unnest(%(students)s::int[]) s CROSS JOIN generate_series(0, %(days)s - 1) d
+            ''', {'students': student_ids, 'batch': batch.id, 'today': today, 'days': days})
+
+            for model in (FeeInstallment, FeePayment, AttendanceRecord):
+                cursor.execute(f'ANALYZE "{model._meta.db_table}"')
@@ -0,0 +1,137 @@
+# core/pagination.py
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Default paginator for every list endpoint.
+
+    Pages are cut with WHERE (date, id) < (last_date, last_id) on an indexed
+    ordering instead of OFFSET, so page 500 costs the same as page 1.
+    A view picks its ordering with `cursor_ordering`; the last field must be
+    unique (normally 'id').
+
+    Response: {"next": url, "previous": url, "results": [...]}
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.fields = tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+        reverse, position = self.decode_cursor(request)
+        ordering = self.fields
+        if reverse:
+            ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going backwards always leaves the page we came from "next".
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.first_key = self.key_of(rows[0]) if rows else None
+        self.last_key = self.key_of(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # KEYSET HELPERS
+    # ------------------------------------------------------------------
+    @staticmethod
+    def after(ordering, position):
+        """
+        Row-value comparison spelled out for the ORM:
+        (a > x) OR (a = x AND b > y) OR ...   (< for descending fields)
+        """
+        clauses = []
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {f.lstrip('-'): value for f, value in zip(ordering[:i], position[:i])}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[i]}))
+        return reduce(or_, clauses)
+
+    def key_of(self, row):
+        return [getattr(row, field.lstrip('-')) for field in self.fields]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return api_settings.PAGE_SIZE or 50
+
+    # ------------------------------------------------------------------
+    # CURSOR ENCODING (opaque base64 of {"r": reverse, "p": position})
+    # ------------------------------------------------------------------
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            reverse, position = bool(cursor['r']), list(cursor['p'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps({'r': int(reverse), 'p': position}, cls=DjangoJSONEncoder)
+        encoded = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_key is None:
+            return None
+        return self.encode_cursor(False, self.last_key)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_key is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.first_key)
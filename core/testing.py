@@ -0,0 +1,42 @@
+# core/testing.py
+"""
+Test helpers shared by the app test suites.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class QueryCountMixin:
+    """
+    N+1 guard for list endpoints, used with TenantTestCase.
+
+    assertConstantListQueries() grows the table to each size in `sizes` with a
+    seed function, hits the list endpoint, and fails if the number of queries
+    changes with the number of rows.
+    """
+    sizes = (10, 1000)
+
+    def api_client_for(self, user):
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=user)
+        return client
+
+    def count_list_queries(self, client, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200, f"{url_name}: {response.status_code}")
+        return len(ctx.captured_queries)
+
+    def assertConstantListQueries(self, client, url_name, seed, sizes=None):
+        """seed(n) must add n more rows to whatever the endpoint lists."""
+        counts, seeded = {}, 0
+        for size in sizes or self.sizes:
+            seed(size - seeded)
+            seeded = size
+            counts[size] = self.count_list_queries(client, url_name)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"{url_name} query count grows with rows (rows: queries): {counts}",
+        )
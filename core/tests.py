@@ -1,5 +1,17 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.db.utils import IntegrityError
+from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+from academics.models import Batch
+from core.testing import QueryCountMixin
+from tenants.models import TenantSummary
+from .dashboard import get_institute_stats
+from .explain import hot_queries
 from .models import Institute, User
 
 class FoundationModelTests(TestCase):
@@ -44,4 +56,71 @@ class FoundationModelTests(TestCase):
             role=User.Roles.SUPER_ADMIN,
             institute=None  # Should be allowed
         )
-        self.assertIsNone(admin.institute)
\ No newline at end of file
+        self.assertIsNone(admin.institute)
+
+class DashboardStatsCacheTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_read_hits_no_tables(self):
+        """Once the counters are cached, the dashboard needs zero queries."""
+        get_institute_stats()
+        with self.assertNumQueries(0):
+            stats = get_institute_stats()
+        self.assertEqual(stats["batch_count"], 0)
+
+    def test_new_batch_bumps_cached_count(self):
+        """Creating a Batch updates the cached counter instead of dropping it."""
+        get_institute_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Batch.objects.create(name="Class 10 - Morning")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_institute_stats()["batch_count"], 1)
+
+class CoreListQueryTests(QueryCountMixin, TenantTestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="saas_owner", password="password123",
+                                              role=User.Roles.SUPER_ADMIN)
+        self.api = self.api_client_for(self.owner)
+
+    def test_users(self):
+        def seed(n):
+            institute = Institute.objects.create(name="Seed Academy", code=f"SEED{User.objects.count()}")
+            User.objects.bulk_create([
+                User(username=f"seed_user_{institute.code}_{i}", institute=institute) for i in range(n)
+            ])
+        self.assertConstantListQueries(self.api, 'users-list', seed)
+
+    def test_institutes(self):
+        self.assertConstantListQueries(self.api, 'institutes-list', lambda n: Institute.objects.bulk_create(
+            [Institute(name="Seed Academy", code=f"INST{Institute.objects.count()}_{i}") for i in range(n)]
+        ))
+
+class HotQueryIndexTests(TenantTestCase):
+    """
+    Each dashboard/list query can be served by its index. Seq scans are
+    switched off because the planner would rightly pick them on tiny test
+    tables; `manage.py explain_hot_queries` checks the plans at 1M rows.
+    """
+    def test_hot_queries_use_their_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for label, queryset, index in hot_queries():
+            with self.subTest(label):
+                self.assertIn(index, queryset.explain())
+
+class SuperAdminDashboardTests(TenantTestCase):
+    def test_totals_come_from_the_tenant_rollups(self):
+        TenantSummary.objects.filter(tenant=self.tenant).update(student_count=42, total_revenue=Decimal("1500.00"))
+        owner = User.objects.create_user(username="saas_owner", role=User.Roles.SUPER_ADMIN)
+        api = APIClient(HTTP_HOST=self.domain.domain)
+        api.force_authenticate(user=owner)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api.get(reverse('dashboard_stats'))
+        widgets = {w["label"]: w["value"] for w in response.data["widgets"]}
+        self.assertEqual(widgets["Total Institutes"], 1)  # the test tenant
+        self.assertEqual(widgets["Total Students"], 42)
+        self.assertEqual(widgets["Total Revenue (Global)"], "₹ 1500.00")
+        # Nothing inside a tenant schema is scanned
+        self.assertFalse([q for q in ctx.captured_queries if 'academics_' in q['sql'] or 'finance_' in q['sql']])
@@ -0,0 +1,17 @@
+# core/utils.py
+from django.db import connection, transaction
+from django_tenants.utils import schema_context
+
+
+def on_commit_in_schema(func):
+    """
+    Like transaction.on_commit(), but func runs in the schema that was active
+    when it was registered (the outer block may commit after a schema switch).
+    """
+    schema_name = connection.schema_name
+
+    def run():
+        with schema_context(schema_name):
+            func()
+
+    transaction.on_commit(run)
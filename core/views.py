@@ -1,15 +1,16 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum
-from django.utils import timezone
+from django.db.models import Count, Sum
 
 from rest_framework import viewsets
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from .models import User, Institute
-from academics.models import StudentProfile, Batch, AttendanceRecord
-from finance.models import FeePayment, FeeInstallment
+from .dashboard import get_institute_stats
+from academics.models import StudentProfile, Batch
+from finance.models import FeePayment
+from tenants.models import TenantSummary
 from .serializers import (
     CustomTokenObtainPairSerializer,
     InstituteSerializer,
@@ -37,13 +38,21 @@ class DashboardStatsView(APIView):
         # 1. SUPER ADMIN (Business Owner View)
         # ------------------------------------------------
         if role == User.Roles.SUPER_ADMIN:
-            total_institutes = Institute.objects.count()
-            total_users = User.objects.count()
-            global_revenue = FeePayment.objects.aggregate(Sum('amount'))['amount__sum'] or 0
+            # One row per tuition center (public schema rollup), not one per payment.
+            totals = TenantSummary.objects.aggregate(
+                institutes=Count('id'),
+                students=Sum('student_count'),
+                revenue=Sum('total_revenue'),
+            )
+            total_institutes = totals['institutes']
+            total_users = User.objects.count()  # Users are a shared table already
+            total_students = totals['students'] or 0
+            global_revenue = totals['revenue'] or 0
 
             data["widgets"] = [
                 {"label": "Total Institutes", "value": total_institutes, "color": "blue"},
                 {"label": "Total Users", "value": total_users, "color": "green"},
+                {"label": "Total Students", "value": total_students, "color": "teal"},
                 {"label": "Total Revenue (Global)", "value": f"₹ {global_revenue}", "color": "purple"},
             ]
             # ... table logic remains same ...
@@ -54,24 +63,18 @@ class DashboardStatsView(APIView):
         elif role == User.Roles.INSTITUTE_ADMIN:
             # FIX: Removed 'institute=inst' filter. 
             # The schema middleware automatically filters data for the current tenant.
-            
-            student_count = StudentProfile.objects.count()
-            batch_count = Batch.objects.count()
-
-            today = timezone.now().date()
-            today_collection = FeePayment.objects.filter(
-                payment_date=today
-            ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-            pending_installments = FeeInstallment.objects.filter(
-                status='PENDING'
-            ).count()
+            # Numbers come from the per-schema cache; ?refresh=1 forces a recount.
+            stats = get_institute_stats(refresh=request.query_params.get('refresh') == '1')
+            student_count = stats["student_count"]
+            batch_count = stats["batch_count"]
+            today_collection = stats["today_collection"]
+            fee_defaulters = stats["fee_defaulters"]
 
             data["widgets"] = [
                 {"label": "Active Students", "value": student_count, "color": "blue"},
                 {"label": "Active Batches", "value": batch_count, "color": "orange"},
                 {"label": "Today's Collection", "value": f"₹ {today_collection}", "color": "green"},
-                {"label": "Fee Defaulters", "value": pending_installments, "color": "red"},
+                {"label": "Fee Defaulters", "value": fee_defaulters, "color": "red"},
             ]
 
             data["table_title"] = "Recent Fee Payments"
@@ -146,8 +149,9 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        queryset = User.objects.select_related('institute')
         # Super Admin sees all users
         if self.request.user.role == User.Roles.SUPER_ADMIN:
-            return User.objects.all()
+            return queryset
         # Institute Admin sees only their institute users
-        return User.objects.filter(institute=self.request.user.institute)
+        return queryset.filter(institute=self.request.user.institute)
@@ -0,0 +1,136 @@
+# finance/billing.py
+"""
+Monthly bill run: creates the next period's FeeInstallment for every
+active StudentFeeAllocation in the current schema.
+
+Safe to run again for the same period. Already-billed allocations are
+skipped, and the (allocation, period_start) constraint catches races:
+one-time fees are keyed on FeeInstallment.ONE_TIME_PERIOD instead of NULL.
+"""
+import calendar
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from core import dashboard
+from .models import FeeStructure, StudentFeeAllocation, FeeInstallment
+
+CHUNK_SIZE = 5000
+
+
+def next_month(today=None):
+    today = today or timezone.localdate()
+    if today.month == 12:
+        return date(today.year + 1, 1, 1)
+    return date(today.year, today.month + 1, 1)
+
+
+def period_starts(month):
+    """First day of the billing period for each interval, for a bill run in `month`."""
+    return {
+        FeeStructure.Interval.MONTHLY: month.replace(day=1),
+        FeeStructure.Interval.YEARLY: date(month.year, 1, 1),
+        # One-time fees are billed once, whatever the month.
+        FeeStructure.Interval.ONE_TIME: FeeInstallment.ONE_TIME_PERIOD,
+    }
+
+
+def due_date_in(month):
+    """FEE_DUE_DAY of `month`, or its last day when the month is shorter."""
+    return month.replace(day=min(settings.FEE_DUE_DAY, calendar.monthrange(month.year, month.month)[1]))
+
+
+class InsertedRows:
+    """execute_wrapper that adds up rowcount of INSERTs (ON CONFLICT DO NOTHING skips don't count)."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if sql.lstrip().upper().startswith('INSERT'):
+            self.count += max(context['cursor'].rowcount, 0)
+        return result
+
+
+def generate_installments(month=None, chunk_size=CHUNK_SIZE):
+    """
+    Bills every active allocation for the period that contains `month`
+    (default: next month). Returns {"created": n, "skipped": n}.
+    """
+    month = (month or next_month()).replace(day=1)
+    starts = period_starts(month)
+    due_date = due_date_in(month)
+
+    # Two queries tell us who is already billed for this run.
+    periodic = [d for interval, d in starts.items() if interval != FeeStructure.Interval.ONE_TIME]
+    billed_periods = set(
+        FeeInstallment.objects.filter(period_start__in=periodic)
+        .values_list('allocation_id', 'period_start')
+    )
+    billed_once = set(
+        FeeInstallment.objects.filter(allocation__fee_structure__interval=FeeStructure.Interval.ONE_TIME)
+        .values_list('allocation_id', flat=True)
+    )
+
+    allocations = (
+        StudentFeeAllocation.objects.filter(is_active=True)
+        .order_by('pk')
+        .values_list('pk', 'fee_structure__amount', 'fee_structure__interval')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    skipped = 0
+
+    def new_bills():
+        nonlocal skipped
+        for allocation_id, amount, interval in allocations:
+            start = starts.get(interval)
+            if interval == FeeStructure.Interval.ONE_TIME:
+                already_billed = allocation_id in billed_once
+            else:
+                already_billed = (allocation_id, start) in billed_periods
+            if already_billed:
+                skipped += 1
+                continue
+            yield FeeInstallment(
+                allocation_id=allocation_id,
+                amount_due=amount,
+                due_date=due_date,
+                period_start=start,
+            )
+
+    # Rows another run inserted first are dropped by ON CONFLICT, so count what went in.
+    inserted = InsertedRows()
+    attempted = 0
+    bills = new_bills()
+    with connection.execute_wrapper(inserted):
+        while chunk := list(islice(bills, chunk_size)):
+            FeeInstallment.objects.bulk_create(chunk, ignore_conflicts=True)
+            attempted += len(chunk)
+    created = inserted.count
+    skipped += attempted - created
+
+    if created:
+        # bulk_create skips post_save, so the cached defaulter count is stale.
+        dashboard.invalidate(dashboard.FEE_DEFAULTERS)
+
+    return {"created": created, "skipped": skipped}
+
+
+def generate_for_schema(month, schema_name):
+    """for_each_tenant() entry point (module level so it can cross a process pool)."""
+    return generate_installments(month)
+
+
+def sweep_overdue(schema_name=None):
+    """
+    Marks this schema's past-due unpaid bills as OVERDUE (one UPDATE).
+    Also the for_each_tenant() entry point for `manage.py mark_overdue`.
+    """
+    changed = FeeInstallment.objects.mark_overdue()
+    if changed:
+        dashboard.invalidate(dashboard.FEE_DEFAULTERS)
+    return changed
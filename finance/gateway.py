@@ -0,0 +1,148 @@
+# finance/gateway.py
+"""
+One shared Razorpay client per process.
+
+The client keeps a pooled keep-alive HTTP session, puts a connect/read
+timeout on every call, and sits behind a circuit breaker. After
+RAZORPAY_BREAKER_FAILURES failed calls in a row it fails fast with
+GatewayUnavailable for RAZORPAY_BREAKER_RESET seconds, then lets one trial
+call through. So a degraded gateway can't pin every worker.
+"""
+import threading
+import time
+from functools import lru_cache
+
+import razorpay
+import requests
+from django.conf import settings
+from razorpay.errors import GatewayError, ServerError
+from requests.adapters import HTTPAdapter
+
+# Failures that say "the gateway is unwell" (not "this request was bad")
+GATEWAY_FAILURES = (requests.ConnectionError, requests.Timeout, GatewayError, ServerError)
+
+
+class GatewayUnavailable(Exception):
+    """The circuit is open: the gateway failed recently and is not being called."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise GatewayUnavailable("Payment gateway is unavailable, try again shortly.")
+                self.state = self.HALF_OPEN  # this caller is the trial
+            elif self.state == self.HALF_OPEN:
+                raise GatewayUnavailable("Payment gateway is recovering, try again shortly.")
+        try:
+            result = func(*args, **kwargs)
+        except GATEWAY_FAILURES:
+            self._failed()
+            raise
+        except Exception:
+            # A bad request still proves the gateway answers.
+            self._succeeded()
+            raise
+        self._succeeded()
+        return result
+
+    def _failed(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def _succeeded(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+
+class TimeoutSession(requests.Session):
+    """requests has no session-wide timeout; this adds one to every call."""
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(*args, **kwargs)
+
+
+class PooledClient(razorpay.Client):
+    def _get_version(self):
+        # The SDK asks pkg_resources for its version on every request.
+        return _sdk_version(super()._get_version)
+
+
+@lru_cache(maxsize=1)
+def _sdk_version(lookup):
+    return lookup()
+
+
+_client = None
+_breaker = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                session = TimeoutSession((settings.RAZORPAY_CONNECT_TIMEOUT, settings.RAZORPAY_READ_TIMEOUT))
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.RAZORPAY_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _client = PooledClient(
+                    session=session,
+                    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+                    base_url=settings.RAZORPAY_BASE_URL,
+                )
+    return _client
+
+
+def get_breaker():
+    global _breaker
+    if _breaker is None:
+        with _lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(settings.RAZORPAY_BREAKER_FAILURES, settings.RAZORPAY_BREAKER_RESET)
+    return _breaker
+
+
+def reset():
+    """Drops the shared client and breaker (settings changed, or between tests)."""
+    global _client, _breaker
+    with _lock:
+        if _client is not None:
+            _client.session.close()
+        _client = _breaker = None
+
+
+def create_order(amount, receipt, currency='INR', notes=None):
+    """amount in paise. Raises GatewayUnavailable while the circuit is open."""
+    return get_breaker().call(get_client().order.create, data={
+        "amount": amount,
+        "currency": currency,
+        "receipt": receipt,
+        "notes": notes or {},
+    })
+
+
+def fetch_order(order_id):
+    """The order as the gateway has it (amount in paise, notes). Raises GatewayUnavailable while open."""
+    return get_breaker().call(get_client().order.fetch, order_id)
@@ -0,0 +1,115 @@
+# finance/management/commands/benchmark_receipts.py
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from finance.utils import DEFAULT_INSTITUTE, draw_receipt, render_receipt
+
+
+def draw_receipt_legacy(p, fields):
+    """The renderer before ReceiptTemplate: every call redraws the whole page. Baseline only."""
+    width, height = A4
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(50, height - 50, "FEE RECEIPT")
+    p.setFont("Helvetica", 12)
+    p.drawString(50, height - 80, DEFAULT_INSTITUTE)
+    p.drawString(50, height - 95, "Official Payment Record")
+    p.line(50, height - 110, width - 50, height - 110)
+
+    y = height - 150
+    for label, key in (("Receipt No:", "receipt_no"), ("Student Name:", "student_name"),
+                       ("Enrollment ID:", "enrollment"), ("Fee Type:", "fee_type"),
+                       ("Payment Date:", "date"), ("Payment Mode:", "mode"),
+                       ("Transaction Ref:", "txn_id")):
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(50, y, label)
+        p.setFont("Helvetica", 12)
+        p.drawString(200, y, str(fields[key]))
+        y -= 30
+
+    p.setStrokeColor(colors.black)
+    p.rect(50, y - 20, 400, 40, fill=0)
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(60, y - 5, f"Amount Paid:  {fields['amount']}")
+    p.setFont("Helvetica-Oblique", 10)
+    p.drawString(50, 50, "This is a computer-generated receipt and does not require a signature.")
+
+
+def sample_fields(i):
+    return {
+        "receipt_no": f"RCPT-{i}",
+        "student_name": f"Student {i}",
+        "enrollment": f"ENR-{i:06d}",
+        "fee_type": "Tuition Fee",
+        "amount": f"Rs. {1000 + i % 500}.00",
+        "date": "2026-01-10",
+        "mode": "CASH",
+        "txn_id": "N/A",
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Receipts per second on one core: the old full-redraw renderer against the "
+        "ReceiptTemplate (Form XObject) renderer, as separate PDFs and as one multi-page PDF."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipts', type=int, default=500)
+
+    def handle(self, *args, **options):
+        fields = [sample_fields(i) for i in range(options['receipts'])]
+
+        self.stdout.write(f"{'renderer':<10} {'output':<12} {'receipts/s':>11} {'bytes/receipt':>14}")
+        for output, legacy, template in (
+            ('one each', self.legacy_separate, self.template_separate),
+            ('multi-page', self.legacy_combined, self.template_combined),
+        ):
+            rates = {}
+            for name, run in (('legacy', legacy), ('template', template)):
+                started = time.perf_counter()
+                size = run(fields)
+                rates[name] = len(fields) / (time.perf_counter() - started)
+                self.stdout.write(f"{name:<10} {output:<12} {rates[name]:>11.0f} {size / len(fields):>14.0f}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{output}: template renders {rates['template'] / rates['legacy']:.2f}x as many receipts/s"
+            ))
+
+    # Each runner returns the bytes it produced.
+    @staticmethod
+    def legacy_separate(fields):
+        size = 0
+        for row in fields:
+            buffer = io.BytesIO()
+            p = canvas.Canvas(buffer, pagesize=A4)
+            draw_receipt_legacy(p, row)
+            p.showPage()
+            p.save()
+            size += buffer.tell()
+        return size
+
+    @staticmethod
+    def template_separate(fields):
+        return sum(len(render_receipt(row)) for row in fields)
+
+    @staticmethod
+    def legacy_combined(fields):
+        return Command.combined(draw_receipt_legacy, fields)
+
+    @staticmethod
+    def template_combined(fields):
+        return Command.combined(draw_receipt, fields)
+
+    @staticmethod
+    def combined(draw, fields):
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer, pagesize=A4)
+        for row in fields:
+            draw(p, row)
+            p.showPage()
+        p.save()
+        return buffer.tell()
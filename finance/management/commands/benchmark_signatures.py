@@ -0,0 +1,89 @@
+# finance/management/commands/benchmark_signatures.py
+import json
+import time
+
+import razorpay
+from razorpay.errors import SignatureVerificationError
+from django.core.management.base import BaseCommand
+
+from finance.signatures import sign, verify_payment, verify_webhooks
+
+SECRET = "benchmark_secret"
+
+
+def sample_callbacks(n):
+    return [(f"order_{i:014d}", f"pay_{i:014d}") for i in range(n)]
+
+
+def sample_webhooks(n):
+    bodies = [
+        json.dumps({"event": "payment.captured", "payload": {"payment": {"entity": {
+            "id": f"pay_{i:014d}", "order_id": f"order_{i:014d}", "amount": 100000 + i, "currency": "INR",
+        }}}}).encode()
+        for i in range(n)
+    ]
+    return [(body, sign(body, SECRET)) for body in bodies]
+
+
+class Command(BaseCommand):
+    help = (
+        "Signatures verified per second: a razorpay.Client per call (the old view) against "
+        "finance.signatures, for checkout callbacks and for a batch of webhook bodies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        callbacks = [(order, payment, sign(f"{order}|{payment}", SECRET))
+                     for order, payment in sample_callbacks(options['count'])]
+        webhooks = sample_webhooks(options['count'])
+
+        self.stdout.write(f"{'method':<28} {'verified/s':>12}")
+        rates = {}
+        for name, run, items in (
+            ('client per callback', self.client_per_call, callbacks),
+            ('verify_payment', self.local, callbacks),
+            ('client per webhook', self.client_webhooks, webhooks),
+            ('verify_webhooks (batch)', self.local_webhooks, webhooks),
+        ):
+            started = time.perf_counter()
+            if not run(items):
+                raise AssertionError(f"{name} rejected a valid signature")
+            rates[name] = len(items) / (time.perf_counter() - started)
+            self.stdout.write(f"{name:<28} {rates[name]:>12.0f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"callbacks: {rates['verify_payment'] / rates['client per callback']:.1f}x, "
+            f"webhooks: {rates['verify_webhooks (batch)'] / rates['client per webhook']:.1f}x"
+        ))
+
+    # Each runner returns True when every signature verified.
+    @staticmethod
+    def client_per_call(callbacks):
+        for order, payment, signature in callbacks:
+            client = razorpay.Client(auth=("rzp_test_benchmark", SECRET))
+            try:
+                client.utility.verify_payment_signature({
+                    'razorpay_order_id': order, 'razorpay_payment_id': payment, 'razorpay_signature': signature,
+                })
+            except SignatureVerificationError:
+                return False
+        return True
+
+    @staticmethod
+    def local(callbacks):
+        return all(verify_payment(order, payment, signature, SECRET) for order, payment, signature in callbacks)
+
+    @staticmethod
+    def client_webhooks(webhooks):
+        for body, signature in webhooks:
+            client = razorpay.Client(auth=("rzp_test_benchmark", SECRET))
+            try:
+                client.utility.verify_webhook_signature(body.decode(), signature, SECRET)
+            except SignatureVerificationError:
+                return False
+        return True
+
+    @staticmethod
+    def local_webhooks(webhooks):
+        return all(verify_webhooks(webhooks, SECRET))
@@ -0,0 +1,48 @@
+# finance/management/commands/drain_payment_events.py
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from finance.webhooks import BATCH_SIZE, drain_for_schema
+from tenants.utils import for_each_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Posts queued gateway payments (PaymentWebhookEvent) in batches in every tenant "
+        "schema and reports queue lag. With --interval it keeps running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', action='append', dest='schemas',
+                            help='Only drain these schemas (repeatable).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of schemas to drain in parallel.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Events posted per transaction.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Seconds to sleep between passes; 0 drains once and exits.')
+
+    def handle(self, *args, **options):
+        while True:
+            self.drain_once(options)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def drain_once(self, options):
+        handled = posted = 0
+        for schema_name, (events, payments, stats), seconds in for_each_tenant(
+            partial(drain_for_schema, options['batch_size']),
+            schema_names=options['schemas'], workers=options['workers'],
+        ):
+            handled += events
+            posted += payments
+            if events or stats['queued']:
+                self.stdout.write(
+                    f"{schema_name}: {events} event(s), {payments} posted ({seconds * 1000:.0f} ms); "
+                    f"{stats['queued']} queued, oldest {stats['oldest_queued_seconds']:.0f}s, "
+                    f"avg lag {stats['avg_lag_seconds']:.1f}s over the last hour"
+                )
+        self.stdout.write(self.style.SUCCESS(f"{handled} event(s) handled, {posted} payment(s) posted."))
@@ -0,0 +1,38 @@
+# finance/management/commands/generate_installments.py
+from datetime import datetime
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.billing import generate_for_schema, next_month
+from tenants.utils import for_each_tenant
+
+
+class Command(BaseCommand):
+    help = "Creates the next period's fee installments in every tenant schema."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to bill as YYYY-MM (default: next month).')
+        parser.add_argument('--schema', action='append', dest='schemas',
+                            help='Only bill these schemas (repeatable).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of schemas to bill in parallel.')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--month must look like 2026-11")
+        else:
+            month = next_month()
+
+        total = 0
+        for schema_name, result, seconds in for_each_tenant(
+            partial(generate_for_schema, month), schema_names=options['schemas'], workers=options['workers']
+        ):
+            total += result['created']
+            self.stdout.write(
+                f"{schema_name}: {result['created']} created, {result['skipped']} already billed ({seconds:.2f}s)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{total} installment(s) created for {month:%B %Y}."))
@@ -0,0 +1,25 @@
+# finance/management/commands/mark_overdue.py
+from django.core.management.base import BaseCommand
+
+from finance.billing import sweep_overdue
+from tenants.utils import for_each_tenant
+
+
+class Command(BaseCommand):
+    help = "Moves past-due unpaid installments to OVERDUE in every tenant schema."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', action='append', dest='schemas',
+                            help='Only sweep these schemas (repeatable).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of schemas to sweep in parallel.')
+
+    def handle(self, *args, **options):
+        total = schemas = 0
+        for schema_name, changed, seconds in for_each_tenant(
+            sweep_overdue, schema_names=options['schemas'], workers=options['workers']
+        ):
+            total += changed
+            schemas += 1
+            self.stdout.write(f"{schema_name}: {changed} marked overdue ({seconds * 1000:.0f} ms)")
+        self.stdout.write(self.style.SUCCESS(f"{total} installment(s) marked overdue across {schemas} schema(s)."))
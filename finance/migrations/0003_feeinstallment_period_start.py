@@ -0,0 +1,22 @@
+# Generated by Django 4.2.12 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_remove_feeinstallment_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feeinstallment',
+            name='period_start',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='feeinstallment',
+            constraint=models.UniqueConstraint(fields=('allocation', 'period_start'), name='unique_installment_per_period'),
+        ),
+    ]
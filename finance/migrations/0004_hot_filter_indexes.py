@@ -0,0 +1,29 @@
+# Generated by Django 4.2.12 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_feeinstallment_period_start'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feeinstallment',
+            index=models.Index(fields=['due_date', 'id'], name='installment_due_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feeinstallment',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'OVERDUE'])), fields=['status'], name='installment_defaulter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feeinstallment',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'PARTIAL'])), fields=['due_date'], name='installment_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['payment_date', 'id'], name='payment_date_id_idx'),
+        ),
+    ]
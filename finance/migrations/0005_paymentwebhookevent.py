@@ -0,0 +1,31 @@
+# Generated by Django 4.2.12 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_id', models.CharField(max_length=100, unique=True)),
+                ('event', models.CharField(max_length=50)),
+                ('installment_id', models.IntegerField(null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('state', models.CharField(choices=[('QUEUED', 'Queued'), ('APPLIED', 'Applied'), ('DUPLICATE', 'Already posted'), ('FAILED', 'Failed')], default='QUEUED', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('state', 'QUEUED')), fields=['id'], name='webhook_queued_idx'), models.Index(fields=['processed_at'], name='webhook_processed_idx')],
+            },
+        ),
+    ]
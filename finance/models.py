@@ -1,5 +1,14 @@
 # finance/models.py
-from django.db import models
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+from django.dispatch import Signal
+from django.utils import timezone
 from academics.models import StudentProfile, Batch
 # REMOVED: from core.models import TenantAwareModel
 
@@ -38,10 +47,92 @@ class StudentFeeAllocation(models.Model): # <--- Changed to models.Model
     def __str__(self):
         return f"{self.student} -> {self.fee_structure}"
 
+# Sent after new payments have been applied to their installments.
+# kwargs: payments (list of FeePayment), defaulter_delta (change in the number of unpaid bills)
+payments_posted = Signal()
+
+# Sent after an existing payment was edited and its installment(s) recounted.
+# kwargs: payment (the saved FeePayment), old_amount, old_date
+payment_changed = Signal()
+
+
+def _money(amount):
+    # Floats (e.g. gateway amount / 100) go through str() to avoid binary noise.
+    return amount if isinstance(amount, Decimal) else Decimal(str(amount))
+
+
+class FeeInstallmentQuerySet(models.QuerySet):
+    @staticmethod
+    def status_for(paid, today=None):
+        """SQL version of FeeInstallment.status_from() for a paid-amount expression."""
+        Status = FeeInstallment.Status
+        return Case(
+            When(GreaterThanOrEqual(paid, F('amount_due')), then=Value(Status.PAID)),
+            When(due_date__lt=today or timezone.localdate(), then=Value(Status.OVERDUE)),
+            When(GreaterThan(paid, 0), then=Value(Status.PARTIAL)),
+            default=Value(Status.PENDING),
+        )
+
+    def apply_payments(self, amounts):
+        """
+        Adds {installment_id: amount} to amount_paid with a single UPDATE.
+        The rows are locked first (in id order) so concurrent posts queue up
+        instead of overwriting each other.
+        Returns the change in the number of defaulter bills (PENDING/OVERDUE).
+        """
+        amounts = {pk: _money(amount) for pk, amount in amounts.items()}
+        if not amounts:
+            return 0
+
+        today = timezone.localdate()
+        with transaction.atomic():
+            locked = list(
+                self.select_for_update().filter(pk__in=amounts).order_by('pk')
+                .values_list('pk', 'status', 'amount_paid', 'amount_due', 'due_date')
+            )
+
+            delta = Case(
+                *[When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()],
+                default=Value(Decimal(0)),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+            paid = F('amount_paid') + delta
+            self.filter(pk__in=amounts).update(amount_paid=paid, status=self.status_for(paid, today))
+
+        defaulter_delta = 0
+        for pk, old_status, amount_paid, amount_due, due_date in locked:
+            new_status = FeeInstallment.status_from(amount_paid + amounts[pk], amount_due, due_date, today)
+            was = old_status in FeeInstallment.DEFAULTER_STATUSES
+            now = new_status in FeeInstallment.DEFAULTER_STATUSES
+            defaulter_delta += int(now) - int(was)
+        return defaulter_delta
+
+    def mark_overdue(self, today=None):
+        """Moves past-due unpaid bills to OVERDUE with one set-based UPDATE."""
+        Status = FeeInstallment.Status
+        return self.filter(
+            status__in=[Status.PENDING, Status.PARTIAL],
+            due_date__lt=today or timezone.localdate(),
+        ).update(status=Status.OVERDUE)
+
+    def recalculate(self):
+        """Recomputes amount_paid and status from the payment rows, in one UPDATE."""
+        total = (
+            FeePayment.objects.filter(installment=OuterRef('pk'))
+            .order_by().values('installment')
+            .annotate(total=Sum('amount')).values('total')
+        )
+        paid = Coalesce(
+            Subquery(total), Value(Decimal(0)),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+        return self.update(amount_paid=paid, status=self.status_for(paid))
+
+
 class FeeInstallment(models.Model): # <--- Changed to models.Model
     """
     The Actual Bill (Invoice).
-    Generated monthly (via a script/task) or manually.
+    Generated monthly (`manage.py generate_installments`, see finance/billing.py) or manually.
     """
     class Status(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
@@ -49,25 +140,76 @@ class FeeInstallment(models.Model): # <--- Changed to models.Model
         PAID = 'PAID', 'Fully Paid'
         OVERDUE = 'OVERDUE', 'Overdue'
 
+    # Bills counted as "Fee Defaulters" on the dashboard
+    DEFAULTER_STATUSES = (Status.PENDING, Status.OVERDUE)
+
+    # period_start of a generated one-time bill (NULL would never conflict)
+    ONE_TIME_PERIOD = date.min
+
     allocation = models.ForeignKey(StudentFeeAllocation, on_delete=models.CASCADE, related_name='installments')
     due_date = models.DateField()
     amount_due = models.DecimalField(max_digits=10, decimal_places=2)
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
 
+    # First day of the billed month/year. Set by the generator, empty for manual bills.
+    # Generated one-time bills get ONE_TIME_PERIOD, so the unique constraint covers them too.
+    period_start = models.DateField(null=True, blank=True)
+
+    objects = FeeInstallmentQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['allocation', 'period_start'], name='unique_installment_per_period'),
+        ]
+        indexes = [
+            # Keyset pages of the installment list
+            models.Index(fields=['due_date', 'id'], name='installment_due_id_idx'),
+            # Dashboard "Fee Defaulters" count; only unpaid bills are indexed
+            models.Index(fields=['status'], name='installment_defaulter_idx',
+                         condition=models.Q(status__in=['PENDING', 'OVERDUE'])),
+            # Nightly overdue sweep
+            models.Index(fields=['due_date'], name='installment_open_due_idx',
+                         condition=models.Q(status__in=['PENDING', 'PARTIAL'])),
+        ]
+
     def __str__(self):
         return f"{self.allocation.student} - {self.due_date} ({self.status})"
         
+    @classmethod
+    def status_from(cls, amount_paid, amount_due, due_date, today=None):
+        """Status a bill should have for a paid amount (fully paid wins over overdue)."""
+        if amount_paid >= amount_due:
+            return cls.Status.PAID
+        if due_date < (today or timezone.localdate()):
+            return cls.Status.OVERDUE
+        if amount_paid > 0:
+            return cls.Status.PARTIAL
+        return cls.Status.PENDING
+
     def update_status(self):
         """Helper to auto-update status based on payment"""
-        if self.amount_paid >= self.amount_due:
-            self.status = self.Status.PAID
-        elif self.amount_paid > 0:
-            self.status = self.Status.PARTIAL
-        else:
-            self.status = self.Status.PENDING
+        self.status = self.status_from(self.amount_paid, self.amount_due, self.due_date)
         self.save()
 
+class FeePaymentManager(models.Manager):
+    def post(self, payments):
+        """
+        Bulk path: saves N new payments and applies them to their installments
+        in one transaction (one lock query, one UPDATE, one INSERT per batch).
+        """
+        payments = list(payments)
+        totals = defaultdict(Decimal)
+        for payment in payments:
+            payment.amount = _money(payment.amount)
+            totals[payment.installment_id] += payment.amount
+
+        with transaction.atomic():
+            defaulter_delta = FeeInstallment.objects.apply_payments(totals)
+            created = self.bulk_create(payments, batch_size=500)
+            payments_posted.send(sender=FeePayment, payments=created, defaulter_delta=defaulter_delta)
+        return created
+
 class FeePayment(models.Model): # <--- Changed to models.Model
     """
     The Receipt.
@@ -83,18 +225,67 @@ class FeePayment(models.Model): # <--- Changed to models.Model
     payment_date = models.DateField(auto_now_add=True)
     mode = models.CharField(max_length=20, choices=Mode.choices, default=Mode.CASH)
     transaction_id = models.CharField(max_length=100, blank=True, help_text="UPI Ref / Cheque No")
+
+    objects = FeePaymentManager()
+
+    class Meta:
+        indexes = [
+            # Today's collection (payment_date = ?) and newest-first keyset pages
+            models.Index(fields=['payment_date', 'id'], name='payment_date_id_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        # 1. Save the payment
-        super().save(*args, **kwargs)
-        
-        # 2. Update the Installment's "Paid Amount" and "Status" automatically
-        installment = self.installment
-        
-        # Recalculate total paid for this installment
-        total_paid = installment.payments.aggregate(models.Sum('amount'))['amount__sum'] or 0
-        installment.amount_paid = total_paid
-        installment.update_status()
+        if not self._state.adding:
+            # Edited receipt: lock the stored row so the difference is applied once.
+            self.amount = _money(self.amount)
+            with transaction.atomic():
+                old_installment_id, old_amount, old_date = FeePayment.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('installment_id', 'amount', 'payment_date').get()
+                super().save(*args, **kwargs)
+                FeeInstallment.objects.filter(pk__in={self.installment_id, old_installment_id}).recalculate()
+                payment_changed.send(sender=FeePayment, payment=self, old_amount=old_amount, old_date=old_date)
+            return
+
+        # New receipt: lock the bill, add the amount in SQL, then insert.
+        self.amount = _money(self.amount)
+        with transaction.atomic():
+            defaulter_delta = FeeInstallment.objects.apply_payments({self.installment_id: self.amount})
+            super().save(*args, **kwargs)
+            payments_posted.send(sender=FeePayment, payments=[self], defaulter_delta=defaulter_delta)
+
+    def __str__(self):
+        return f"Receipt #{self.id} - {self.amount}"
+
+
+class PaymentWebhookEvent(models.Model):
+    """
+    Durable queue of gateway payment callbacks (webhooks and checkout verifies).
+    One row per gateway payment id, so a retried callback can't post twice.
+    Drained in batches by finance/webhooks.py.
+    """
+    class State(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        APPLIED = 'APPLIED', 'Applied'
+        DUPLICATE = 'DUPLICATE', 'Already posted'
+        FAILED = 'FAILED', 'Failed'
+
+    payment_id = models.CharField(max_length=100, unique=True)
+    event = models.CharField(max_length=50)
+    installment_id = models.IntegerField(null=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payload = models.JSONField(default=dict, blank=True)
+    state = models.CharField(max_length=20, choices=State.choices, default=State.QUEUED)
+    error = models.CharField(max_length=255, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The drain loop and the queue-lag metric only look at unprocessed rows
+            models.Index(fields=['id'], name='webhook_queued_idx', condition=models.Q(state='QUEUED')),
+            models.Index(fields=['processed_at'], name='webhook_processed_idx'),
+        ]
 
     def __str__(self):
-        return f"Receipt #{self.id} - {self.amount}"
\ No newline at end of file
+        return f"{self.payment_id} ({self.state})"
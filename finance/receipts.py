@@ -0,0 +1,186 @@
+# finance/receipts.py
+"""
+On-disk receipt cache.
+
+A receipt does not change once its payment is recorded, so each PDF is
+rendered once and kept at RECEIPT_CACHE_DIR/<schema>/<payment id>.pdf.
+Downloads are served from that file with ETag / Last-Modified, and editing
+or deleting a payment drops the file (see finance/signals.py).
+
+Month-end batches come out as a ZIP: pages rendered in a process pool and
+streamed, so memory stays bounded whatever the batch size.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django_tenants.utils import schema_context
+
+
+from .models import FeePayment
+from .utils import generate_receipt_pdf, receipt_fields, render_receipt
+
+logger = logging.getLogger(__name__)
+
+# Everything a receipt prints, for select_related()
+RECEIPT_RELATED = ('installment__allocation__student__user', 'installment__allocation__fee_structure')
+
+_renderer = None
+
+
+def receipt_payments():
+    """Payments with everything a receipt prints joined in, so one query loads a receipt."""
+    return FeePayment.objects.select_related(*RECEIPT_RELATED)
+
+
+def receipt_path(payment_id, schema_name=None):
+    return os.path.join(settings.RECEIPT_CACHE_DIR, schema_name or connection.schema_name, f'{payment_id}.pdf')
+
+
+def get_receipt(payment):
+    """Path of the payment's PDF, rendering it first if it isn't cached yet."""
+    path = receipt_path(payment.pk)
+    if not os.path.exists(path):
+        _write(path, generate_receipt_pdf(payment).getvalue())
+    return path
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename, so a concurrent download never sees half a file.
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    with os.fdopen(fd, 'wb') as temp:
+        temp.write(data)
+    os.replace(temp_path, path)
+
+
+def discard_receipt(payment_id):
+    try:
+        os.remove(receipt_path(payment_id))
+    except FileNotFoundError:
+        pass
+
+
+def receipt_response(request, payment, filename):
+    """Serves the cached PDF, or 304 when the client's copy is still current."""
+    path = get_receipt(payment)
+    modified = int(os.stat(path).st_mtime)
+    etag = quote_etag(f'{connection.schema_name}-{payment.pk}-{modified}')
+
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ----------------------------------------------------------------------
+# BACKGROUND RENDERING
+# ----------------------------------------------------------------------
+def render_in_background(payment_id):
+    """Queues the receipt for rendering on a worker thread; the caller doesn't wait."""
+    global _renderer
+    if _renderer is None:
+        _renderer = ThreadPoolExecutor(max_workers=settings.RECEIPT_RENDER_THREADS,
+                                       thread_name_prefix='receipts')
+    _renderer.submit(_render, connection.schema_name, payment_id)
+
+
+def _render(schema_name, payment_id):
+    try:
+        with schema_context(schema_name):
+            payment = receipt_payments().filter(pk=payment_id).first()
+            if payment:
+                get_receipt(payment)
+    except Exception:
+        logger.exception("Could not pre-render receipt %s in %s", payment_id, schema_name)
+    finally:
+        # Each worker thread has its own connection; don't leave it open.
+        connection.close()
+
+
+# ----------------------------------------------------------------------
+# BATCH DOWNLOADS
+# ----------------------------------------------------------------------
+class _ZipSink(io.RawIOBase):
+    """Write-only target for ZipFile that hands back what was written since the last drain()."""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def rendered_receipts(payments, processes=None):
+    """
+    Yields (payment, pdf bytes) in order. Cached files are read from disk; the
+    rest are rendered in a process pool and cached. At most a few renders per
+    process are in flight, so memory doesn't grow with the number of receipts.
+    """
+    processes = processes or settings.RECEIPT_RENDER_PROCESSES
+    if processes <= 1:
+        for payment in payments:
+            with open(get_receipt(payment), 'rb') as pdf:
+                yield payment, pdf.read()
+        return
+
+    # Workers only draw PDFs; they never touch the parent's DB connection.
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('fork'))
+    in_flight = deque()
+    try:
+        for payment in payments:
+            path = receipt_path(payment.pk)
+            if os.path.exists(path):
+                in_flight.append((payment, path))
+            else:
+                in_flight.append((payment, pool.submit(render_receipt, receipt_fields(payment))))
+            if len(in_flight) >= processes * 4:
+                yield _collect(*in_flight.popleft())
+        while in_flight:
+            yield _collect(*in_flight.popleft())
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _collect(payment, pending):
+    if isinstance(pending, Future):
+        data = pending.result()
+        _write(receipt_path(payment.pk), data)
+        return payment, data
+    with open(pending, 'rb') as pdf:
+        return payment, pdf.read()
+
+
+def stream_receipts_zip(payments, processes=None):
+    """Yields a ZIP archive (one receipt_<id>.pdf per payment) chunk by chunk."""
+    sink = _ZipSink()
+    # PDFs are already compressed; storing them keeps the ZIP cheap to build.
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for payment, data in rendered_receipts(payments, processes):
+            info = zipfile.ZipInfo(f'receipt_{payment.pk}.pdf', payment.payment_date.timetuple()[:6])
+            archive.writestr(info, data)
+            yield sink.drain()
+    yield sink.drain()
+
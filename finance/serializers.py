@@ -1,4 +1,5 @@
 # finance/serializers.py
+from decimal import Decimal
 from rest_framework import serializers
 from .models import FeeStructure, StudentFeeAllocation, FeeInstallment, FeePayment
 
@@ -25,6 +26,9 @@ class FeeInstallmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'allocation', 'student_name', 'fee_name', 'due_date', 'amount_due', 'amount_paid', 'status', 'receipt_id']
 
     def get_receipt_id(self, obj):
+        # The list view annotates this; fall back to a query for single objects
+        if hasattr(obj, 'last_payment_id'):
+            return obj.last_payment_id
         # Get the latest payment for this bill
         last_payment = obj.payments.last()
         return last_payment.id if last_payment else None
@@ -32,4 +36,14 @@ class FeeInstallmentSerializer(serializers.ModelSerializer):
 class FeePaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = FeePayment
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class BulkPaymentRowSerializer(serializers.Serializer):
+    """
+    One line of an offline (cash/cheque) payment import.
+    Only checks the shape of the row; the bill itself is checked against a preloaded map.
+    """
+    installment = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    mode = serializers.ChoiceField(choices=FeePayment.Mode.choices, default=FeePayment.Mode.CASH)
+    transaction_id = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
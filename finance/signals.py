@@ -0,0 +1,88 @@
+# finance/signals.py
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import dashboard
+from core.utils import on_commit_in_schema
+from tenants import rollups
+from .models import FeeInstallment, FeePayment, payment_changed, payments_posted
+from .receipts import discard_receipt
+
+
+@receiver(payments_posted)
+def payments_received(sender, payments, defaulter_delta, **kwargs):
+    by_day = defaultdict(lambda: [Decimal(0), 0])
+    for payment in payments:
+        by_day[payment.payment_date][0] += payment.amount
+        by_day[payment.payment_date][1] += 1
+
+    today = timezone.localdate()
+    if today in by_day:
+        dashboard.bump(dashboard.collection_key(today), dashboard.to_paise(by_day[today][0]))
+    if defaulter_delta:
+        dashboard.bump(dashboard.FEE_DEFAULTERS, defaulter_delta)
+
+    def record():
+        for day, (amount, count) in by_day.items():
+            rollups.record_payment(amount, day, count=count)
+
+    on_commit_in_schema(record)
+
+
+@receiver(post_delete, sender=FeePayment)
+def payment_removed(sender, instance, **kwargs):
+    FeeInstallment.objects.filter(pk=instance.installment_id).recalculate()
+    dashboard.bump(dashboard.collection_key(instance.payment_date), -dashboard.to_paise(instance.amount))
+    dashboard.invalidate(dashboard.FEE_DEFAULTERS)
+    on_commit_in_schema(lambda: rollups.record_payment(-instance.amount, instance.payment_date, count=-1))
+    discard_receipt(instance.pk)
+
+
+@receiver(payment_changed)
+def payment_edited(sender, payment, old_amount, old_date, **kwargs):
+    day = payment.payment_date
+    delta = payment.amount - old_amount
+    if day == old_date:
+        if delta:
+            dashboard.bump(dashboard.collection_key(day), dashboard.to_paise(delta))
+    else:
+        dashboard.bump(dashboard.collection_key(old_date), -dashboard.to_paise(old_amount))
+        dashboard.bump(dashboard.collection_key(day), dashboard.to_paise(payment.amount))
+    # The bill's status may have changed either way
+    dashboard.invalidate(dashboard.FEE_DEFAULTERS)
+
+    def record():
+        if day == old_date:
+            if delta:
+                rollups.record_payment(delta, day, count=0)
+        else:
+            rollups.record_payment(-old_amount, old_date, count=-1)
+            rollups.record_payment(payment.amount, day)
+
+    on_commit_in_schema(record)
+
+
+@receiver(post_save, sender=FeePayment)
+def payment_saved(sender, instance, created, **kwargs):
+    if not created:
+        # The cached PDF shows the old details
+        discard_receipt(instance.pk)
+
+
+@receiver(post_save, sender=FeeInstallment)
+def installment_saved(sender, instance, created, **kwargs):
+    if created:
+        if instance.status in FeeInstallment.DEFAULTER_STATUSES:
+            dashboard.bump(dashboard.FEE_DEFAULTERS, 1)
+    else:
+        # We don't know the old status here, so let the next read recount it.
+        dashboard.invalidate(dashboard.FEE_DEFAULTERS)
+
+
+@receiver(post_delete, sender=FeeInstallment)
+def installment_removed(sender, instance, **kwargs):
+    dashboard.invalidate(dashboard.FEE_DEFAULTERS)
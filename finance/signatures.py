@@ -0,0 +1,54 @@
+# finance/signatures.py
+"""
+Razorpay signature checks, done in-process.
+
+A checkout callback is signed with HMAC-SHA256("order_id|payment_id",
+key secret). A webhook is signed with HMAC-SHA256(raw body, webhook
+secret). Neither needs a razorpay.Client. The keyed HMAC state is built
+once per secret and copied for each message, and signatures are compared
+in constant time.
+"""
+import hashlib
+import hmac
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=8)
+def _keyed(secret):
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+
+def sign(message, secret):
+    """Hex HMAC-SHA256 of `message` (bytes or str)."""
+    mac = _keyed(secret).copy()
+    mac.update(message.encode() if isinstance(message, str) else message)
+    return mac.hexdigest()
+
+
+def _matches(message, signature, secret):
+    if not signature or not secret:
+        return False
+    return hmac.compare_digest(sign(message, secret), str(signature))
+
+
+def verify_payment(order_id, payment_id, signature, secret=None):
+    """True if `signature` is Razorpay's signature for this checkout callback."""
+    secret = settings.RAZORPAY_KEY_SECRET if secret is None else secret
+    return _matches(f"{order_id}|{payment_id}", signature, secret)
+
+
+def verify_webhook(body, signature, secret=None):
+    """True if `signature` (the X-Razorpay-Signature header) matches the raw body."""
+    secret = settings.RAZORPAY_WEBHOOK_SECRET if secret is None else secret
+    return _matches(body, signature, secret)
+
+
+def verify_webhooks(payloads, secret=None):
+    """
+    Checks many (body, signature) pairs against one secret.
+    Returns a list of booleans in the same order.
+    """
+    secret = settings.RAZORPAY_WEBHOOK_SECRET if secret is None else secret
+    return [_matches(body, signature, secret) for body, signature in payloads]
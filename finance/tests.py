@@ -1,3 +1,647 @@
-from django.test import TestCase
+# finance/tests.py
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from core.dashboard import get_institute_stats
+from core.models import User
+from academics.models import StudentProfile
+from core.testing import QueryCountMixin
+from tenants.models import DailyRevenue, TenantSummary
+from . import gateway, receipts, signatures, webhooks
+from .billing import generate_installments
+from .models import FeeStructure, StudentFeeAllocation, FeeInstallment, FeePayment, PaymentWebhookEvent
+
+
+class FinanceTestCase(TenantTestCase):
+    """Creates one student with one 1000 Rs. allocation inside the test tenant."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="fee_student", password="password123", role=User.Roles.STUDENT)
+        self.student = StudentProfile.objects.create(
+            user=user, parent_name="Mr. Parent", parent_phone="9999999999", enrollment_number="FIN-001"
+        )
+        self.structure = FeeStructure.objects.create(name="Tuition Fee", amount=Decimal("1000.00"))
+        self.allocation = StudentFeeAllocation.objects.create(student=self.student, fee_structure=self.structure)
+
+        self.admin = User.objects.create_user(username="fee_admin", password="password123", role=User.Roles.INSTITUTE_ADMIN)
+        self.api = APIClient(HTTP_HOST=self.domain.domain)
+        self.api.force_authenticate(user=self.admin)
+
+    def make_installment(self, amount_due="1000.00", **kwargs):
+        kwargs.setdefault('due_date', timezone.localdate() + timedelta(days=30))
+        return FeeInstallment.objects.create(allocation=self.allocation, amount_due=Decimal(amount_due), **kwargs)
+
+
+class PaymentPostingTests(FinanceTestCase):
+    def test_partial_then_full_payment(self):
+        """Each payment adds to amount_paid in SQL and moves the status along."""
+        bill = self.make_installment()
+
+        FeePayment.objects.create(installment=bill, amount=Decimal("400.00"))
+        bill.refresh_from_db()
+        self.assertEqual(bill.amount_paid, Decimal("400.00"))
+        self.assertEqual(bill.status, FeeInstallment.Status.PARTIAL)
+
+        FeePayment.objects.create(installment=bill, amount=Decimal("600.00"))
+        bill.refresh_from_db()
+        self.assertEqual(bill.amount_paid, Decimal("1000.00"))
+        self.assertEqual(bill.status, FeeInstallment.Status.PAID)
+
+    def test_partial_payment_keeps_overdue_bill_overdue(self):
+        bill = self.make_installment(due_date=timezone.localdate() - timedelta(days=1))
+        FeePayment.objects.create(installment=bill, amount=Decimal("100.00"))
+        bill.refresh_from_db()
+        self.assertEqual(bill.status, FeeInstallment.Status.OVERDUE)
+
+    def test_float_amount_is_not_rounded_away(self):
+        """The gateway path passes paise / 100 as a float."""
+        bill = self.make_installment()
+        FeePayment.objects.create(installment=bill, amount=99999 / 100)
+        bill.refresh_from_db()
+        self.assertEqual(bill.amount_paid, Decimal("999.99"))
+
+    def test_bulk_post_groups_payments_per_installment(self):
+        """N payments across bills cost one UPDATE and one INSERT."""
+        first, second = self.make_installment(), self.make_installment()
+        payments = [FeePayment(installment=first, amount=Decimal("250.00")) for _ in range(4)]
+        payments.append(FeePayment(installment=second, amount=Decimal("100.00")))
+
+        with CaptureQueriesContext(connection) as ctx:
+            created = FeePayment.objects.post(payments)
+        statements = [q['sql'].split()[0] for q in ctx.captured_queries]
+        self.assertEqual(statements.count('UPDATE'), 1)
+        self.assertEqual(statements.count('INSERT'), 1)
+
+        self.assertEqual(len(created), 5)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, FeeInstallment.Status.PAID)
+        self.assertEqual(second.amount_paid, Decimal("100.00"))
+        self.assertEqual(second.status, FeeInstallment.Status.PARTIAL)
+
+    def test_deleting_payment_recounts_the_bill(self):
+        bill = self.make_installment()
+        payment = FeePayment.objects.create(installment=bill, amount=Decimal("1000.00"))
+        payment.delete()
+        bill.refresh_from_db()
+        self.assertEqual(bill.amount_paid, Decimal("0.00"))
+        self.assertEqual(bill.status, FeeInstallment.Status.PENDING)
+
+    def test_editing_a_payment_applies_the_difference(self):
+        """PATCHing a receipt moves the dashboard counters and the public rollups by the delta."""
+        cache.clear()
+        today = timezone.localdate()
+        bill = self.make_installment(due_date=today - timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = FeePayment.objects.create(installment=bill, amount=Decimal("1000.00"))
+        self.assertEqual(get_institute_stats()["fee_defaulters"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.patch(reverse('fee-payments-detail', args=[payment.id]),
+                                      {"amount": "400.00"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        bill.refresh_from_db()
+        self.assertEqual((bill.amount_paid, bill.status), (Decimal("400.00"), FeeInstallment.Status.OVERDUE))
+
+        stats = get_institute_stats()
+        self.assertEqual((stats["today_collection"], stats["fee_defaulters"]), (Decimal("400.00"), 1))
+        self.assertEqual(TenantSummary.objects.get(tenant=self.tenant).total_revenue, Decimal("400.00"))
+        daily = DailyRevenue.objects.get(tenant=self.tenant, date=today)
+        self.assertEqual((daily.amount, daily.payment_count), (Decimal("400.00"), 1))
+
+
+class BulkPaymentImportTests(FinanceTestCase):
+    def test_json_rows_are_posted_and_reported(self):
+        bill = self.make_installment()
+        rows = [
+            {"installment": bill.id, "amount": "300.00", "mode": "CASH"},
+            {"installment": bill.id, "amount": "200.00", "mode": "CHEQUE", "transaction_id": "CHQ-11"},
+            {"installment": 999999, "amount": "50.00"},
+            {"installment": bill.id, "amount": "900.00"},  # More than what is left
+        ]
+        response = self.api.post(reverse('fee-payments-bulk'), rows, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["created", "created", "error", "error"])
+        bill.refresh_from_db()
+        self.assertEqual(bill.amount_paid, Decimal("500.00"))
+        self.assertEqual(bill.status, FeeInstallment.Status.PARTIAL)
+
+    def test_csv_upload(self):
+        bill = self.make_installment()
+        csv_file = SimpleUploadedFile(
+            "payments.csv",
+            f"installment,amount,mode,transaction_id\n{bill.id},1000.00,,\n".encode(),
+            content_type="text/csv",
+        )
+        response = self.api.post(reverse('fee-payments-bulk'), {"file": csv_file}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(FeePayment.objects.get().mode, FeePayment.Mode.CASH)
+
+
+class InstallmentGeneratorTests(FinanceTestCase):
+    def test_bills_each_period_once(self):
+        first = generate_installments(date(2026, 11, 1))
+        again = generate_installments(date(2026, 11, 1))
+
+        self.assertEqual(first, {"created": 1, "skipped": 0})
+        self.assertEqual(again, {"created": 0, "skipped": 1})
+        bill = FeeInstallment.objects.get()
+        self.assertEqual(bill.period_start, date(2026, 11, 1))
+        self.assertEqual(bill.amount_due, Decimal("1000.00"))
+
+    def test_one_time_fee_is_billed_once(self):
+        admission = FeeStructure.objects.create(
+            name="Admission Fee", amount=Decimal("500.00"), interval=FeeStructure.Interval.ONE_TIME
+        )
+        StudentFeeAllocation.objects.create(student=self.student, fee_structure=admission)
+
+        generate_installments(date(2026, 11, 1))
+        generate_installments(date(2026, 12, 1))
+
+        self.assertEqual(FeeInstallment.objects.filter(allocation__fee_structure=admission).count(), 1)
+        self.assertEqual(FeeInstallment.objects.filter(allocation=self.allocation).count(), 2)
+
+    def test_racing_run_counts_only_rows_it_inserted(self):
+        admission = FeeStructure.objects.create(
+            name="Admission Fee", amount=Decimal("500.00"), interval=FeeStructure.Interval.ONE_TIME
+        )
+        StudentFeeAllocation.objects.create(student=self.student, fee_structure=admission)
+        self.assertEqual(generate_installments(date(2026, 11, 1)), {"created": 2, "skipped": 0})
+
+        # As if another run billed everything after this one looked
+        with mock.patch.object(FeeInstallment.objects, 'filter', return_value=FeeInstallment.objects.none()):
+            self.assertEqual(generate_installments(date(2026, 11, 1)), {"created": 0, "skipped": 2})
+        self.assertEqual(FeeInstallment.objects.count(), 2)
+
+    def test_due_day_is_clamped_to_short_months(self):
+        with self.settings(FEE_DUE_DAY=31):
+            generate_installments(date(2026, 2, 1))
+        self.assertEqual(FeeInstallment.objects.get().due_date, date(2026, 2, 28))
+
+
+class OverdueSweepTests(FinanceTestCase):
+    def test_only_unpaid_past_due_bills_change(self):
+        late = self.make_installment(due_date=date(2026, 1, 10))
+        partly_paid = self.make_installment(due_date=date(2026, 1, 10), amount_paid=Decimal("100.00"),
+                                            status=FeeInstallment.Status.PARTIAL)
+        paid = self.make_installment(due_date=date(2026, 1, 10), amount_paid=Decimal("1000.00"),
+                                     status=FeeInstallment.Status.PAID)
+        not_due = self.make_installment(due_date=date(2026, 3, 10))
+
+        changed = FeeInstallment.objects.mark_overdue(today=date(2026, 2, 1))
+
+        self.assertEqual(changed, 2)
+        statuses = dict(FeeInstallment.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[late.pk], FeeInstallment.Status.OVERDUE)
+        self.assertEqual(statuses[partly_paid.pk], FeeInstallment.Status.OVERDUE)
+        self.assertEqual(statuses[paid.pk], FeeInstallment.Status.PAID)
+        self.assertEqual(statuses[not_due.pk], FeeInstallment.Status.PENDING)
+
+
+class InstallmentListQueryTests(FinanceTestCase):
+    def list_installments(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(reverse('fee-installments-list'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Names and receipt ids come from joins/subqueries, not one query per bill."""
+        bill = self.make_installment()
+        FeePayment.objects.create(installment=bill, amount=Decimal("100.00"))
+        _, with_one = self.list_installments()
+
+        for _ in range(25):
+            bill = self.make_installment()
+            FeePayment.objects.create(installment=bill, amount=Decimal("100.00"))
+        response, with_many = self.list_installments()
+
+        self.assertEqual(with_many, with_one)
+        self.assertIsNotNone(response.data["results"][0]["receipt_id"])
+
+
+class FinanceListQueryTests(QueryCountMixin, FinanceTestCase):
+    def seed_bills(self, n):
+        return FeeInstallment.objects.bulk_create([
+            FeeInstallment(allocation=self.allocation, amount_due=Decimal("1000.00"), due_date=date(2026, 1, 10))
+            for _ in range(n)
+        ])
+
+    def test_structures(self):
+        self.assertConstantListQueries(self.api, 'fee-structures-list', lambda n: FeeStructure.objects.bulk_create(
+            [FeeStructure(name="Lab Fee", amount=Decimal("100.00")) for _ in range(n)]
+        ))
+
+    def test_allocations(self):
+        def seed(n):
+            structures = FeeStructure.objects.bulk_create(
+                [FeeStructure(name="Lab Fee", amount=Decimal("100.00")) for _ in range(n)]
+            )
+            StudentFeeAllocation.objects.bulk_create(
+                [StudentFeeAllocation(student=self.student, fee_structure=s) for s in structures]
+            )
+        self.assertConstantListQueries(self.api, 'fee-allocations-list', seed)
+
+    def test_installments(self):
+        self.assertConstantListQueries(self.api, 'fee-installments-list', self.seed_bills)
+
+    def test_payments(self):
+        self.assertConstantListQueries(self.api, 'fee-payments-list', lambda n: FeePayment.objects.bulk_create(
+            [FeePayment(installment=bill, amount=Decimal("10.00")) for bill in self.seed_bills(n)]
+        ))
+
+
+class ReceiptCacheTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        override = self.settings(RECEIPT_CACHE_DIR=cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.payment = FeePayment.objects.create(installment=self.make_installment(), amount=Decimal("1000.00"))
+        self.url = reverse('download-receipt', args=[self.payment.id])
+
+    def test_rendered_once_then_served_from_disk(self):
+        with mock.patch.object(receipts, 'generate_receipt_pdf', wraps=receipts.generate_receipt_pdf) as render:
+            first = self.api.get(self.url)
+            second = self.api.get(reverse('receipt-by-installment', args=[self.payment.installment_id]))
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(b''.join(first.streaming_content)[:4], b'%PDF')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertTrue(os.path.exists(receipts.receipt_path(self.payment.id)))
+
+    def test_other_students_bill_is_refused_before_the_payment_lookup(self):
+        other = User.objects.create_user(username="other_student", role=User.Roles.STUDENT)
+        self.api.force_authenticate(user=other)
+        unpaid = self.make_installment()
+        response = self.api.get(reverse('receipt-by-installment', args=[unpaid.id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_conditional_get_returns_304(self):
+        etag = self.api.get(self.url)['ETag']
+        response = self.api.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_receipt_data_loads_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.api.get(self.url)
+        finance_queries = [q for q in ctx.captured_queries if 'finance_' in q['sql']]
+        self.assertEqual(len(finance_queries), 1)
+
+    def test_deleting_the_payment_drops_the_file(self):
+        self.api.get(self.url)
+        path = receipts.receipt_path(self.payment.id)
+        self.payment.delete()
+        self.assertFalse(os.path.exists(path))
+
+
+class BatchReceiptTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        override = self.settings(RECEIPT_CACHE_DIR=self.cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.payments = [
+            FeePayment.objects.create(installment=self.make_installment(), amount=Decimal("1000.00"))
+            for _ in range(3)
+        ]
+
+    def download(self, query):
+        response = self.api.get(reverse('fee-payments-receipts') + query)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_zip_has_one_pdf_per_payment(self):
+        for processes in (1, 2):
+            with self.subTest(processes=processes), self.settings(RECEIPT_RENDER_PROCESSES=processes):
+                # Start cold each time, or the pool would only read what the first run cached
+                shutil.rmtree(os.path.join(self.cache_dir, connection.schema_name), ignore_errors=True)
+                with mock.patch.object(receipts.ProcessPoolExecutor, 'submit', autospec=True,
+                                       side_effect=receipts.ProcessPoolExecutor.submit) as submit:
+                    archive = zipfile.ZipFile(io.BytesIO(self.download('?output=zip')))
+                self.assertEqual(submit.call_count, 0 if processes == 1 else len(self.payments))
+                self.assertEqual(archive.namelist(), [f"receipt_{p.id}.pdf" for p in self.payments])
+                self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+                self.assertTrue(all(os.path.exists(receipts.receipt_path(p.id)) for p in self.payments))
+
+    def test_only_zip_and_empty_range(self):
+        self.assertEqual(self.api.get(reverse('fee-payments-receipts') + '?output=pdf').status_code, 400)
+        response = self.api.get(reverse('fee-payments-receipts') + '?date_to=2000-01-01')
+        self.assertEqual(response.status_code, 404)
+
+
+class FakeGateway(ThreadingHTTPServer):
+    """
+    A local stand-in for api.razorpay.com, serving POST /v1/orders/ and
+    GET /v1/orders/<id> (answers with `order`).
+    mode: 'ok', 'slow' (answers after `delay` seconds) or 'error' (HTTP 500).
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeGatewayHandler)
+        self.mode, self.delay = 'ok', 1.0
+        self.order = {"id": "order_fake", "amount": 100000, "currency": "INR", "notes": {}}
+        self.requests, self.connections = 0, set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+
+    def do_POST(self):
+        self.answer()
+
+    def do_GET(self):
+        self.answer()
+
+    def answer(self):
+        server = self.server
+        server.requests += 1
+        server.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if server.mode == 'slow':
+            time.sleep(server.delay)
+        status, body = (500, b'{"error": {"code": "SERVER_ERROR", "description": "down"}}') \
+            if server.mode == 'error' else (200, json.dumps(server.order).encode())
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_gateway(test, **overrides):
+    """Runs a FakeGateway for one test and points the shared client at it."""
+    server = FakeGateway()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+
+    override = test.settings(
+        RAZORPAY_BASE_URL=server.url, RAZORPAY_KEY_ID='rzp_test_fake', RAZORPAY_KEY_SECRET='secret', **overrides
+    )
+    override.enable()
+    test.addCleanup(override.disable)
+    gateway.reset()
+    test.addCleanup(gateway.reset)
+    return server
+
+
+class GatewayClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = start_fake_gateway(
+            self, RAZORPAY_READ_TIMEOUT=0.2, RAZORPAY_BREAKER_FAILURES=2, RAZORPAY_BREAKER_RESET=60
+        )
+
+    def test_client_and_connection_are_reused(self):
+        for _ in range(3):
+            self.assertEqual(gateway.create_order(100000, receipt="inst_1")['id'], 'order_fake')
+        self.assertIs(gateway.get_client(), gateway.get_client())
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_slow_gateway_times_out(self):
+        self.server.mode = 'slow'
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            gateway.create_order(100000, receipt="inst_1")
+        self.assertLess(time.monotonic() - started, self.server.delay)
+
+    def test_breaker_opens_then_recovers(self):
+        self.server.mode = 'error'
+        for _ in range(2):
+            with self.assertRaises(gateway.GATEWAY_FAILURES):
+                gateway.create_order(100000, receipt="inst_1")
+
+        # Open: fails fast without touching the gateway
+        with self.assertRaises(gateway.GatewayUnavailable):
+            gateway.create_order(100000, receipt="inst_1")
+        self.assertEqual(self.server.requests, 2)
+
+        # After the reset timeout one trial call goes through and closes the circuit
+        breaker = gateway.get_breaker()
+        breaker.opened_at -= breaker.reset_timeout
+        self.server.mode = 'ok'
+        self.assertEqual(gateway.create_order(100000, receipt="inst_1")['id'], 'order_fake')
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        breaker = gateway.CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now)
+        now = 0
+
+        def fail():
+            raise requests.ConnectionError()
+        with self.assertRaises(requests.ConnectionError):
+            breaker.call(fail)
+        now = 10
+        with self.assertRaises(requests.ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        with self.assertRaises(gateway.GatewayUnavailable):
+            breaker.call(fail)
+
+
+class InitiatePaymentGatewayTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = start_fake_gateway(self, RAZORPAY_BREAKER_FAILURES=1)
+        self.bill = self.make_installment()
+
+    def initiate(self):
+        return self.api.post(reverse('pay-initiate'), {'installment_id': self.bill.id}, format='json')
+
+    def test_order_created(self):
+        response = self.initiate()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order_id'], 'order_fake')
+        self.assertEqual(response.data['amount'], 100000)
+
+    def test_gateway_down_returns_502_then_503(self):
+        self.server.mode = 'error'
+        self.assertEqual(self.initiate().status_code, 502)
+        self.assertEqual(self.initiate().status_code, 503)
+        self.assertEqual(self.server.requests, 1)
+
+
+class SignatureTests(SimpleTestCase):
+    def test_payment_signature_matches_razorpay(self):
+        signature = signatures.sign("order_1|pay_1", "secret")
+        # Same check the SDK does (raises on mismatch)
+        gateway.PooledClient(auth=("rzp_test_fake", "secret")).utility.verify_payment_signature({
+            'razorpay_order_id': "order_1", 'razorpay_payment_id': "pay_1", 'razorpay_signature': signature,
+        })
+        self.assertTrue(signatures.verify_payment("order_1", "pay_1", signature, "secret"))
+        self.assertFalse(signatures.verify_payment("order_1", "pay_2", signature, "secret"))
+        self.assertFalse(signatures.verify_payment("order_1", "pay_1", signature, "other"))
+        self.assertFalse(signatures.verify_payment("order_1", "pay_1", None, "secret"))
+
+    def test_batch_webhooks(self):
+        bodies = [b'{"event": "payment.captured", "n": %d}' % i for i in range(3)]
+        payloads = [(body, signatures.sign(body, "hook")) for body in bodies]
+        payloads[1] = (bodies[1] + b' ', payloads[1][1])  # tampered body
+
+        self.assertEqual(signatures.verify_webhooks(payloads, "hook"), [True, False, True])
+        with self.settings(RAZORPAY_WEBHOOK_SECRET=''):
+            self.assertEqual(signatures.verify_webhooks(payloads), [False] * 3)
+
+
+class VerifyPaymentTests(FinanceTestCase):
+    def test_bad_signature_is_rejected(self):
+        bill = self.make_installment()
+        with self.settings(RAZORPAY_KEY_SECRET='secret'):
+            response = self.api.post(reverse('pay-verify'), {
+                'installment_id': bill.id, 'amount': 100000, 'razorpay_order_id': 'order_1',
+                'razorpay_payment_id': 'pay_1', 'razorpay_signature': signatures.sign('order_1|pay_1', 'wrong'),
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FeePayment.objects.filter(installment=bill).exists())
+
+
+class PaymentQueueTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = start_fake_gateway(self, RAZORPAY_WEBHOOK_SECRET='hook')
+        self.bill = self.make_installment()
+        self.server.order = {"id": "order_1", "amount": 40000, "currency": "INR",
+                             "notes": {"installment_id": str(self.bill.id)}}
+
+    def webhook(self, payment_id, amount=100000, signature=None):
+        body = json.dumps({"event": "payment.captured", "payload": {"payment": {"entity": {
+            "id": payment_id, "amount": amount, "currency": "INR",
+            "notes": {"installment_id": str(self.bill.id), "schema": self.tenant.schema_name},
+        }}}}).encode()
+        return self.api.post(reverse('pay-webhook'), body, content_type='application/json',
+                             HTTP_X_RAZORPAY_SIGNATURE=signature or signatures.sign(body, 'hook'))
+
+    def verify(self, payment_id, amount=40000):
+        # installment_id and amount in the body are ignored; the order decides
+        return self.api.post(reverse('pay-verify'), {
+            'installment_id': self.bill.id, 'amount': amount, 'razorpay_order_id': 'order_1',
+            'razorpay_payment_id': payment_id,
+            'razorpay_signature': signatures.sign(f'order_1|{payment_id}', 'secret'),
+        }, format='json')
+
+    def test_webhook_only_queues(self):
+        self.assertEqual(self.webhook('pay_1').status_code, 200)
+        self.assertEqual(self.webhook('pay_1').status_code, 200)  # gateway retry
+
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 1)
+        self.assertFalse(FeePayment.objects.exists())
+
+        self.assertEqual(webhooks.drain(), (1, 1))
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.amount_paid, Decimal("1000.00"))
+        self.assertEqual(self.bill.status, FeeInstallment.Status.PAID)
+        self.assertEqual(webhooks.drain(), (0, 0))
+
+    def test_bad_webhook_signature(self):
+        self.assertEqual(self.webhook('pay_1', signature='0' * 64).status_code, 400)
+        self.assertFalse(PaymentWebhookEvent.objects.exists())
+
+    def test_verify_and_webhook_post_once(self):
+        self.assertEqual(self.verify('pay_1').data, {"status": "success"})
+        self.assertEqual(self.verify('pay_1').status_code, 200)  # client retry
+        self.webhook('pay_1', amount=40000)
+        webhooks.drain()
+
+        self.assertEqual(FeePayment.objects.filter(transaction_id='pay_1').count(), 1)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.amount_paid, Decimal("400.00"))
+
+    def test_verify_posts_the_order_amount_not_the_request_amount(self):
+        self.assertEqual(self.verify('pay_1', amount=1).status_code, 200)
+        self.assertEqual(FeePayment.objects.get(transaction_id='pay_1').amount, Decimal("400.00"))
+
+    def test_verify_reports_the_queue_outcome(self):
+        FeePayment.objects.create(installment=self.bill, amount=Decimal("400.00"),
+                                  mode=FeePayment.Mode.ONLINE, transaction_id='pay_old')
+        self.assertEqual(self.verify('pay_old').data, {"status": "already_posted"})
+
+        self.server.order["notes"] = {}
+        response = self.verify('pay_2')
+        self.assertEqual((response.status_code, response.data['error']), (422, "Unknown installment"))
+
+    def test_already_posted_payment_is_a_duplicate(self):
+        FeePayment.objects.create(installment=self.bill, amount=Decimal("1000.00"),
+                                  mode=FeePayment.Mode.ONLINE, transaction_id='pay_old')
+        self.webhook('pay_old')
+        self.assertEqual(webhooks.drain(), (1, 0))
+        self.assertEqual(PaymentWebhookEvent.objects.get().state, PaymentWebhookEvent.State.DUPLICATE)
+
+    def test_batches_are_grouped(self):
+        for i in range(5):
+            webhooks.enqueue(f'pay_{i}', self.bill.id, 10000)
+        webhooks.enqueue('pay_orphan', None, 10000)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(webhooks.drain(batch_size=10), (6, 5))
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "finance_feeinstallment"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(PaymentWebhookEvent.objects.get(payment_id='pay_orphan').state,
+                         PaymentWebhookEvent.State.FAILED)
+
+    def test_one_bad_event_does_not_block_the_batch(self):
+        for payment_id in ('pay_1', 'pay_bad', 'pay_2'):
+            webhooks.enqueue(payment_id, self.bill.id, 10000)
+        real_post = FeePayment.objects.post
+
+        def post(payments):
+            if any(p.transaction_id == 'pay_bad' for p in payments):
+                raise ValueError("amount out of range")
+            return real_post(payments)
+
+        with mock.patch.object(FeePayment.objects, 'post', side_effect=post):
+            self.assertEqual(webhooks.drain(), (3, 2))
+        states = dict(PaymentWebhookEvent.objects.values_list('payment_id', 'state'))
+        self.assertEqual(states, {'pay_1': 'APPLIED', 'pay_bad': 'FAILED', 'pay_2': 'APPLIED'})
+        self.assertEqual(PaymentWebhookEvent.objects.get(payment_id='pay_bad').error, "amount out of range")
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.amount_paid, Decimal("200.00"))
+
+    def test_queue_stats(self):
+        webhooks.enqueue('pay_1', self.bill.id, 10000)
+        response = self.api.get(reverse('pay-queue'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['queued'], 1)
+        webhooks.drain()
+        stats = webhooks.queue_stats()
+        self.assertEqual((stats['queued'], stats['processed_recently']), (0, 1))
@@ -7,6 +7,8 @@ from .views import (
     FeePaymentViewSet,
     InitiatePaymentView,
     VerifyPaymentView,
+    PaymentWebhookView,
+    PaymentQueueView,
     DownloadReceiptView,
     DownloadReceiptByInstallmentView
 )
@@ -23,6 +25,8 @@ urlpatterns = [
     # Manual paths for Payment Gateway
     path('pay/initiate/', InitiatePaymentView.as_view(), name='pay-initiate'),
     path('pay/verify/', VerifyPaymentView.as_view(), name='pay-verify'),
+    path('pay/webhook/', PaymentWebhookView.as_view(), name='pay-webhook'),
+    path('pay/queue/', PaymentQueueView.as_view(), name='pay-queue'),
     path('receipt/<int:pk>/', DownloadReceiptView.as_view(), name='download-receipt'),
     path('installment/<int:installment_id>/receipt/', DownloadReceiptByInstallmentView.as_view(), name='receipt-by-installment'),
 ]
\ No newline at end of file
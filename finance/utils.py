@@ -1,69 +1,125 @@
 # finance/utils.py
 import io
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 
-def generate_receipt_pdf(payment):
+DEFAULT_INSTITUTE = "Tuition Center ERP"
+
+# (label, receipt_fields() key), top to bottom
+RECEIPT_ROWS = (
+    ("Receipt No:", "receipt_no"),
+    ("Student Name:", "student_name"),
+    ("Enrollment ID:", "enrollment"),
+    ("Fee Type:", "fee_type"),
+    ("Payment Date:", "date"),
+    ("Payment Mode:", "mode"),
+    ("Transaction Ref:", "txn_id"),
+)
+AMOUNT_LABEL = "Amount Paid:  "
+
+def receipt_fields(payment):
     """
-    Draws a PDF receipt for a given FeePayment object.
+    Everything a receipt prints, as plain strings (picklable, so pages can be
+    rendered in other processes). Load payment with finance.receipts.receipt_payments().
     """
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # 1. Header
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(50, height - 50, "FEE RECEIPT")
-    
-    # 2. Institute Info (We get this from the tenant schema context, usually just hardcode or fetch name)
-    p.setFont("Helvetica", 12)
-    p.drawString(50, height - 80, "Tuition Center ERP") 
-    p.drawString(50, height - 95, "Official Payment Record")
-
-    p.line(50, height - 110, width - 50, height - 110)
-
-    # 3. Payment Details
-    y = height - 150
-    p.setFont("Helvetica", 12)
-    
-    # Helper to draw rows
-    def draw_row(label, value, y_pos):
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y_pos, label)
+    allocation = payment.installment.allocation
+    return {
+        "receipt_no": f"RCPT-{payment.id}",
+        "student_name": allocation.student.user.get_full_name(),
+        "enrollment": allocation.student.enrollment_number,
+        "fee_type": allocation.fee_structure.name,
+        "amount": f"Rs. {payment.amount}",
+        "date": payment.payment_date.strftime("%Y-%m-%d"),
+        "mode": payment.mode,
+        "txn_id": payment.transaction_id or "N/A",
+    }
+
+class ReceiptTemplate:
+    """
+    The part of a receipt that is the same for every payment: header, rule,
+    row labels, amount box and footer.
+
+    In a multi-page document it is drawn once as a Form XObject; each page
+    then references the form and stamps only its values, in one text object.
+    A one-page document draws it inline, which skips the form's overhead.
+    """
+    form_name = "ReceiptStatic"
+
+    def __init__(self, institute=DEFAULT_INSTITUTE):
+        self.institute = institute
+        width, height = self.page_size = A4
+        self.rows = [(label, key, height - 150 - 30 * i) for i, (label, key) in enumerate(RECEIPT_ROWS)]
+        self.box_y = height - 150 - 30 * len(RECEIPT_ROWS)
+        self.amount_x = 60 + stringWidth(AMOUNT_LABEL, "Helvetica-Bold", 16)
+
+    def draw_static(self, p):
+        width, height = self.page_size
+
+        # 1. Header
+        p.setFont("Helvetica-Bold", 20)
+        p.drawString(50, height - 50, "FEE RECEIPT")
+
+        # 2. Institute Info
         p.setFont("Helvetica", 12)
-        p.drawString(200, y_pos, str(value))
-        return y_pos - 30
-
-    # Data Extraction
-    student_name = payment.installment.allocation.student.user.get_full_name()
-    enrollment = payment.installment.allocation.student.enrollment_number
-    fee_type = payment.installment.allocation.fee_structure.name
-    amount = f"Rs. {payment.amount}"
-    date = payment.payment_date.strftime("%Y-%m-%d")
-    mode = payment.mode
-    txn_id = payment.transaction_id or "N/A"
-
-    y = draw_row("Receipt No:", f"RCPT-{payment.id}", y)
-    y = draw_row("Student Name:", student_name, y)
-    y = draw_row("Enrollment ID:", enrollment, y)
-    y = draw_row("Fee Type:", fee_type, y)
-    y = draw_row("Payment Date:", date, y)
-    y = draw_row("Payment Mode:", mode, y)
-    y = draw_row("Transaction Ref:", txn_id, y)
-
-    # 4. Total Amount Box
-    p.setStrokeColor(colors.black)
-    p.rect(50, y - 20, 400, 40, fill=0)
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(60, y - 5, f"Amount Paid:  {amount}")
-
-    # 5. Footer
-    p.setFont("Helvetica-Oblique", 10)
-    p.drawString(50, 50, "This is a computer-generated receipt and does not require a signature.")
+        p.drawString(50, height - 80, self.institute)
+        p.drawString(50, height - 95, "Official Payment Record")
 
+        p.line(50, height - 110, width - 50, height - 110)
+
+        # 3. Row labels
+        p.setFont("Helvetica-Bold", 12)
+        for label, _, y in self.rows:
+            p.drawString(50, y, label)
+
+        # 4. Total Amount Box
+        p.setStrokeColor(colors.black)
+        p.rect(50, self.box_y - 20, 400, 40, fill=0)
+        p.setFont("Helvetica-Bold", 16)
+        p.drawString(60, self.box_y - 5, AMOUNT_LABEL)
+
+        # 5. Footer
+        p.setFont("Helvetica-Oblique", 10)
+        p.drawString(50, 50, "This is a computer-generated receipt and does not require a signature.")
+
+    def stamp(self, p, fields, as_form=True):
+        """Draws one receipt on the current page of canvas `p` (the caller calls showPage())."""
+        if not as_form:
+            self.draw_static(p)
+        else:
+            if not p.hasForm(self.form_name):
+                p.beginForm(self.form_name)
+                self.draw_static(p)
+                p.endForm()
+            p.doForm(self.form_name)
+
+        text = p.beginText()
+        text.setFont("Helvetica", 12)
+        for _, key, y in self.rows:
+            text.setTextOrigin(200, y)
+            text.textOut(str(fields[key]))
+        text.setFont("Helvetica-Bold", 16)
+        text.setTextOrigin(self.amount_x, self.box_y - 5)
+        text.textOut(fields["amount"])
+        p.drawText(text)
+
+RECEIPT_TEMPLATE = ReceiptTemplate()
+
+def draw_receipt(p, fields, as_form=True):
+    RECEIPT_TEMPLATE.stamp(p, fields, as_form)
+
+def render_receipt(fields):
+    """One receipt as PDF bytes. Needs no database, so it can run in a worker process."""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    draw_receipt(p, fields, as_form=False)
     p.showPage()
     p.save()
+    return buffer.getvalue()
 
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+def generate_receipt_pdf(payment):
+    """
+    Draws a PDF receipt for a given FeePayment object.
+    """
+    return io.BytesIO(render_receipt(receipt_fields(payment)))
@@ -0,0 +1,188 @@
+# finance/webhooks.py
+"""
+The gateway payment queue.
+
+Callbacks only append a PaymentWebhookEvent, one per gateway payment id,
+with INSERT ... ON CONFLICT DO NOTHING. drain() then posts queued events in
+batches. Each batch takes its rows with SKIP LOCKED (so several workers can
+drain at once) and goes through FeePayment.objects.post() in one
+transaction. Payment ids that already have a FeePayment (transaction_id)
+are marked DUPLICATE instead of posted again. If posting the batch fails,
+its events are retried one by one and only the failing ones are marked
+FAILED.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+from .models import FeeInstallment, FeePayment, PaymentWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+CAPTURED = 'payment.captured'
+
+
+def enqueue(payment_id, installment_id, amount_paise, event=CAPTURED, payload=None):
+    """Queues one payment. A payment id that is already queued (or done) is ignored."""
+    PaymentWebhookEvent.objects.bulk_create([PaymentWebhookEvent(
+        payment_id=payment_id,
+        event=event,
+        installment_id=installment_id,
+        amount=Decimal(int(amount_paise)) / 100,
+        payload=payload or {},
+    )], ignore_conflicts=True)
+
+
+def parse_webhook(body):
+    """
+    (payment_id, installment_id, amount_paise, schema_name) from a decoded
+    payment.captured webhook. The ids come from the notes set by
+    gateway.create_order().
+    """
+    entity = body['payload']['payment']['entity']
+    notes = entity.get('notes') or {}
+    installment_id = notes.get('installment_id')
+    return (
+        entity['id'],
+        int(installment_id) if str(installment_id or '').isdigit() else None,
+        int(entity['amount']),
+        notes.get('schema'),
+    )
+
+
+def parse_order(order):
+    """(installment_id, amount_paise) from an order made by gateway.create_order()."""
+    installment_id = (order.get('notes') or {}).get('installment_id')
+    return (
+        int(installment_id) if str(installment_id or '').isdigit() else None,
+        int(order['amount']),
+    )
+
+
+def post_now(payment_id, installment_id, amount_paise, event):
+    """
+    Queues one payment and drains it straight away (the checkout verify path).
+    Returns (state, error, FeePayment rows created). The state is QUEUED when
+    another worker holds the event; it posts it shortly.
+    """
+    enqueue(payment_id, installment_id, amount_paise, event=event)
+    _, created = drain_batch(payment_ids=[payment_id])
+    state, error = PaymentWebhookEvent.objects.filter(
+        payment_id=payment_id
+    ).values_list('state', 'error').get()
+    return state, error, created
+
+
+def drain_batch(batch_size=BATCH_SIZE, payment_ids=None):
+    """
+    Posts one batch of queued events in one transaction.
+    Returns (events handled, FeePayment rows created); (0, []) when nothing was left to take.
+    """
+    Event = PaymentWebhookEvent
+    with transaction.atomic():
+        events = Event.objects.select_for_update(skip_locked=True).filter(state=Event.State.QUEUED)
+        if payment_ids is not None:
+            events = events.filter(payment_id__in=payment_ids)
+        events = list(events.order_by('id')[:batch_size])
+        if not events:
+            return 0, []
+
+        posted = set(FeePayment.objects.filter(
+            transaction_id__in=[e.payment_id for e in events]
+        ).values_list('transaction_id', flat=True))
+        installments = set(FeeInstallment.objects.filter(
+            pk__in={e.installment_id for e in events if e.installment_id}
+        ).values_list('pk', flat=True))
+
+        to_post = []
+        now = timezone.now()
+        for event in events:
+            event.processed_at = now
+            if event.payment_id in posted:
+                event.state = Event.State.DUPLICATE
+            elif event.installment_id not in installments:
+                event.state, event.error = Event.State.FAILED, "Unknown installment"
+            else:
+                event.state = Event.State.APPLIED
+                to_post.append((event, FeePayment(
+                    installment_id=event.installment_id,
+                    amount=event.amount,
+                    mode=FeePayment.Mode.ONLINE,
+                    transaction_id=event.payment_id,
+                )))
+        created = _post(to_post)
+        Event.objects.bulk_update(events, ['state', 'error', 'processed_at'])
+    return len(events), created
+
+
+def _post(to_post):
+    """
+    Posts [(event, payment), ...] in one go. If that fails, posts them one by
+    one, each in its own savepoint, and marks the ones that still fail FAILED,
+    so a single bad event can't keep the whole batch queued.
+    """
+    if not to_post:
+        return []
+    try:
+        with transaction.atomic():
+            return FeePayment.objects.post([payment for _, payment in to_post])
+    except Exception:
+        logger.exception("Posting a batch of %d payments failed; retrying one by one", len(to_post))
+
+    created = []
+    for event, payment in to_post:
+        payment.pk = None  # may have been set by the rolled-back attempt
+        try:
+            with transaction.atomic():
+                created += FeePayment.objects.post([payment])
+        except Exception as e:
+            logger.exception("Posting payment %s failed", event.payment_id)
+            event.state = PaymentWebhookEvent.State.FAILED
+            event.error = (str(e) or e.__class__.__name__)[:255]
+    return created
+
+
+def drain(batch_size=BATCH_SIZE):
+    """
+    Drains until nothing is left that this worker can take (rows locked by
+    another worker are skipped). Returns (events handled, payments posted).
+    """
+    handled = posted = 0
+    while True:
+        count, created = drain_batch(batch_size)
+        if not count:
+            return handled, posted
+        handled += count
+        posted += len(created)
+
+
+def drain_for_schema(batch_size, schema_name):
+    """for_each_tenant() entry point for `manage.py drain_payment_events`."""
+    handled, posted = drain(batch_size)
+    return handled, posted, queue_stats()
+
+
+def queue_stats(window=timedelta(hours=1)):
+    """
+    Lag metrics for this schema: events still queued, age of the oldest one
+    (seconds), and events processed / average receive-to-post lag over `window`.
+    """
+    Event = PaymentWebhookEvent
+    now = timezone.now()
+    queued = Event.objects.filter(state=Event.State.QUEUED).aggregate(
+        oldest=Min('received_at'), count=Count('id')
+    )
+    recent = Event.objects.filter(processed_at__gte=now - window).aggregate(
+        lag=Avg(F('processed_at') - F('received_at')), count=Count('id')
+    )
+    return {
+        'queued': queued['count'],
+        'oldest_queued_seconds': (now - queued['oldest']).total_seconds() if queued['oldest'] else 0,
+        'processed_recently': recent['count'],
+        'avg_lag_seconds': recent['lag'].total_seconds() if recent['lag'] else 0,
+    }
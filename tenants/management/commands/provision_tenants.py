@@ -0,0 +1,44 @@
+# tenants/management/commands/provision_tenants.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tenants.models import ProvisioningJob
+from tenants.provisioning import provision, rollback
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs signup jobs still QUEUED (e.g. the web process restarted before its "
+        "provisioning thread got to them). --stale also fails and rolls back RUNNING "
+        "jobs older than that many minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', type=int, default=0,
+                            help='Minutes after which a RUNNING job is considered dead (0 = leave them).')
+
+    def handle(self, *args, **options):
+        Status = ProvisioningJob.Status
+        if options['stale']:
+            cutoff = timezone.now() - timedelta(minutes=options['stale'])
+            for job in ProvisioningJob.objects.filter(status=Status.RUNNING, created_at__lt=cutoff):
+                rollback(job)
+                job.status, job.error, job.password, job.finished_at = (
+                    Status.FAILED, "Provisioning did not finish.", '', timezone.now()
+                )
+                job.save()
+                self.stdout.write(f"{job.subdomain}: stale, rolled back")
+
+        done = failed = 0
+        for job_id in ProvisioningJob.objects.filter(status=Status.QUEUED).order_by('created_at').values_list('pk', flat=True):
+            job = provision(job_id)
+            if job is None:
+                continue  # another worker took it
+            if job.status == Status.DONE:
+                done += 1
+            else:
+                failed += 1
+            self.stdout.write(f"{job.subdomain}: {job.status} {job.error}".rstrip())
+        self.stdout.write(self.style.SUCCESS(f"{done} tenant(s) provisioned, {failed} failed."))
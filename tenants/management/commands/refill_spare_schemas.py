@@ -0,0 +1,32 @@
+# tenants/management/commands/refill_spare_schemas.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from tenants.spares import refill, spare_count
+
+
+class Command(BaseCommand):
+    help = (
+        "Tops up the pool of pre-migrated spare schemas that signups claim. "
+        "With --interval it keeps running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None,
+                            help='Spares to keep ready (default TENANT_SPARE_POOL_SIZE).')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Seconds to sleep between checks; 0 refills once and exits.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            created = refill(options['size'])
+            if created or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Created {created} spare schema(s) in {time.monotonic() - started:.1f}s; "
+                    f"{spare_count()} ready."
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# tenants/management/commands/rollup_revenue.py
+from django.core.management.base import BaseCommand
+
+from tenants.rollups import collect_tenant_totals, store_tenant_totals
+from tenants.utils import for_each_tenant
+
+
+class Command(BaseCommand):
+    help = "Rebuilds TenantSummary and DailyRevenue from every tenant schema."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', action='append', dest='schemas',
+                            help='Only rebuild these schemas (repeatable).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of schemas to scan in parallel.')
+
+    def handle(self, *args, **options):
+        done = 0
+        for schema_name, totals, seconds in for_each_tenant(
+            collect_tenant_totals, schema_names=options['schemas'], workers=options['workers']
+        ):
+            store_tenant_totals(schema_name, totals)
+            done += 1
+            self.stdout.write(
+                f"{schema_name}: {len(totals['daily'])} days, "
+                f"{totals['student_count']} students ({seconds:.2f}s)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {done} tenant(s)."))
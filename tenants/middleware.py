@@ -0,0 +1,103 @@
+# tenants/middleware.py
+"""
+Tenant resolution without a public-schema query per request.
+
+TenantMainMiddleware looks up Domain + Client for every request. This
+subclass keeps the answer in a bounded per-process LRU keyed by hostname.
+Unknown hosts are cached too, for a short time, so probes and typos don't
+hit the database. Domain/Client saves and deletes clear the affected
+entries in this process (see tenants/signals.py). Other processes pick the
+change up when their entry expires (TENANT_CACHE_TTL).
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django_tenants.middleware.main import TenantMainMiddleware
+
+_MISSING = object()
+
+
+class TenantCache:
+    def __init__(self, maxsize, ttl, negative_ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # hostname -> (tenant or None, expires)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.negative_hits = self.evictions = 0
+
+    def get(self, hostname):
+        """The cached tenant, None for a known-unknown host, or _MISSING."""
+        with self._lock:
+            entry = self._entries.get(hostname)
+            if entry is None or entry[1] <= self.clock():
+                self._entries.pop(hostname, None)
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(hostname)
+            if entry[0] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, hostname, tenant):
+        ttl = self.ttl if tenant is not None else self.negative_ttl
+        with self._lock:
+            self._entries[hostname] = (tenant, self.clock() + ttl)
+            self._entries.move_to_end(hostname)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, hostname=None, tenant_id=None):
+        """Drops one hostname, every hostname of one tenant, and all negative entries."""
+        with self._lock:
+            for key, (tenant, _) in list(self._entries.items()):
+                if key == hostname or tenant is None or (tenant_id is not None and tenant.pk == tenant_id):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.negative_hits = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits + self.negative_hits) / lookups if lookups else 0,
+            }
+
+
+tenant_cache = TenantCache(
+    maxsize=settings.TENANT_CACHE_SIZE,
+    ttl=settings.TENANT_CACHE_TTL,
+    negative_ttl=settings.TENANT_CACHE_NEGATIVE_TTL,
+)
+
+
+class CachedTenantMiddleware(TenantMainMiddleware):
+    def get_tenant(self, domain_model, hostname):
+        tenant = tenant_cache.get(hostname)
+        if tenant is _MISSING:
+            try:
+                tenant = super().get_tenant(domain_model, hostname)
+            except domain_model.DoesNotExist:
+                tenant_cache.set(hostname, None)
+                raise
+            tenant_cache.set(hostname, tenant)
+        elif tenant is None:
+            raise domain_model.DoesNotExist(f'No tenant for hostname "{hostname}" (cached)')
+        # The middleware sets attributes on the tenant; keep the cached one clean
+        return copy.copy(tenant)
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.12 on 2026-10-18 08:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_missing_summaries(apps, schema_editor):
+    # Existing centers start with empty rollups; `rollup_revenue` fills them in.
+    Client = apps.get_model('tenants', 'Client')
+    TenantSummary = apps.get_model('tenants', 'TenantSummary')
+    TenantSummary.objects.bulk_create(
+        [TenantSummary(tenant=client) for client in Client.objects.exclude(schema_name='public')]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='tenants.client')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenue', to='tenants.client')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('tenant', 'date')},
+            },
+        ),
+        migrations.RunPython(create_missing_summaries, migrations.RunPython.noop),
+    ]
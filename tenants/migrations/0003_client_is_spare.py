@@ -0,0 +1,18 @@
+# Generated by Django 4.2.12 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_tenantsummary_dailyrevenue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='is_spare',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.12 on 2026-10-18 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_client_is_spare'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProvisioningJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_name', models.CharField(max_length=100)),
+                ('subdomain', models.CharField(max_length=50)),
+                ('email', models.EmailField(max_length=254)),
+                ('password', models.CharField(blank=True, max_length=128)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=20)),
+                ('step', models.CharField(blank=True, choices=[('SCHEMA_CREATED', 'Schema created'), ('MIGRATIONS_APPLIED', 'Migrations applied'), ('ADMIN_CREATED', 'Admin user created'), ('DOMAIN_ACTIVE', 'Domain active')], max_length=30)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tenants.client')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='provisioningjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['QUEUED', 'RUNNING'])), fields=('subdomain',), name='unique_pending_subdomain'),
+        ),
+    ]
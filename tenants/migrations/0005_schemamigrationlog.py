@@ -0,0 +1,29 @@
+# Generated by Django 4.2.12 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0004_provisioningjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaMigrationLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_key', models.CharField(max_length=64)),
+                ('schema_name', models.CharField(max_length=63)),
+                ('status', models.CharField(choices=[('DONE', 'Done'), ('FAILED', 'Failed')], max_length=10)),
+                ('migrations', models.PositiveIntegerField(default=0)),
+                ('seconds', models.FloatField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('finished_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('run_key', 'schema_name')},
+            },
+        ),
+    ]
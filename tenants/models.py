@@ -1,4 +1,6 @@
 # tenants/models.py
+import uuid
+
 from django.db import models
 from django_tenants.models import TenantMixin, DomainMixin
 
@@ -9,6 +11,8 @@ class Client(TenantMixin):
     """
     name = models.CharField(max_length=100)
     created_on = models.DateField(auto_now_add=True)
+    # A pre-migrated schema waiting to be claimed by a signup (tenants/spares.py)
+    is_spare = models.BooleanField(default=False, db_index=True)
 
     # Auto-create schema when saved
     auto_create_schema = True
@@ -21,4 +25,102 @@ class Domain(DomainMixin):
     Represents the website address for the center.
     Example: 'wisdom-academy.localhost'
     """
-    pass
\ No newline at end of file
+    pass
+
+class TenantSummary(models.Model):
+    """
+    Rollup row kept in the public schema: one per Tuition Center.
+    Lets the SaaS owner read global numbers without entering every schema.
+    """
+    tenant = models.OneToOneField(Client, on_delete=models.CASCADE, related_name='summary')
+    student_count = models.PositiveIntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tenant} summary"
+
+
+class DailyRevenue(models.Model):
+    """
+    Rollup row kept in the public schema: money collected by one center on one day.
+    """
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='daily_revenue')
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('tenant', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.tenant} - {self.date}: {self.amount}"
+
+
+class ProvisioningJob(models.Model):
+    """
+    One signup, set up off the request (tenants/provisioning.py).
+    The signup form polls it by id until it is DONE or FAILED.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    class Step(models.TextChoices):
+        SCHEMA_CREATED = 'SCHEMA_CREATED', 'Schema created'
+        MIGRATIONS_APPLIED = 'MIGRATIONS_APPLIED', 'Migrations applied'
+        ADMIN_CREATED = 'ADMIN_CREATED', 'Admin user created'
+        DOMAIN_ACTIVE = 'DOMAIN_ACTIVE', 'Domain active'
+
+    # Not guessable: the status endpoint is public
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company_name = models.CharField(max_length=100)
+    subdomain = models.CharField(max_length=50)
+    email = models.EmailField()
+    # make_password() hash, cleared once the job finishes
+    password = models.CharField(max_length=128, blank=True)
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    step = models.CharField(max_length=30, choices=Step.choices, blank=True)
+    error = models.TextField(blank=True)
+    tenant = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Two signups can't race for one subdomain
+            models.UniqueConstraint(fields=['subdomain'], name='unique_pending_subdomain',
+                                    condition=models.Q(status__in=['QUEUED', 'RUNNING'])),
+        ]
+
+    def __str__(self):
+        return f"{self.subdomain} ({self.status})"
+
+
+class SchemaMigrationLog(models.Model):
+    """
+    One tenant schema migrated by `manage.py migrate_tenants`.
+    run_key identifies the migration state being deployed, so a crashed run
+    resumes where it stopped, and past timings feed the --dry-run estimate.
+    """
+    class Status(models.TextChoices):
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    run_key = models.CharField(max_length=64)
+    schema_name = models.CharField(max_length=63)
+    status = models.CharField(max_length=10, choices=Status.choices)
+    migrations = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0)
+    error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('run_key', 'schema_name')
+
+    def __str__(self):
+        return f"{self.schema_name} @ {self.run_key[:8]} ({self.status})"
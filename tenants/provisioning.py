@@ -0,0 +1,157 @@
+# tenants/provisioning.py
+"""
+Signup, done off the request.
+
+TenantSignupView only saves a ProvisioningJob and answers 202. provision()
+then runs on a background thread, or through `manage.py provision_tenants`
+for jobs a restart left queued. It records each step as it finishes, so
+the signup form can poll it:
+
+    schema created -> migrations applied -> admin user created -> domain active
+
+A claimed spare schema (tenants/spares.py) skips straight past the first
+two. The Domain is created last, so a half-built tenant is never
+reachable. If any step fails, everything made so far (domain, admin user,
+Client and its schema) is removed again and the job is marked FAILED.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.utils import timezone
+from django_tenants.utils import schema_context
+
+from core.models import User
+from .models import Client, Domain, ProvisioningJob
+from .spares import claim_spare, refill_in_background
+
+logger = logging.getLogger(__name__)
+
+Status, Step = ProvisioningJob.Status, ProvisioningJob.Step
+STEPS = list(Step)
+ACTIVE_JOB_STATUSES = (Status.QUEUED, Status.RUNNING)
+# What the (unauthenticated) status endpoint says about a failure; the real
+# error stays in job.error and the log.
+FAILED_MESSAGE = "We could not set up your center. Please try again or contact support."
+
+_provisioner = None
+
+
+def domain_for(subdomain):
+    # Note: In production, you'd append '.yourdomain.com'
+    return f"{subdomain}.localhost"
+
+
+def login_url(subdomain):
+    return f"http://{domain_for(subdomain)}:8000/dashboard.html"
+
+
+def progress(job):
+    """Status payload for the signup form."""
+    done = STEPS.index(job.step) + 1 if job.step else 0
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "steps": [{"step": step.value, "label": step.label, "done": i < done} for i, step in enumerate(STEPS)],
+        "error": FAILED_MESSAGE if job.status == Status.FAILED else "",
+        "login_url": login_url(job.subdomain) if job.status == Status.DONE else None,
+    }
+
+
+def _mark(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=list(fields))
+
+
+def _start(job_id):
+    """Moves a QUEUED job to RUNNING; None if another worker has it (or it isn't queued)."""
+    with transaction.atomic():
+        job = ProvisioningJob.objects.select_for_update(skip_locked=True).filter(
+            pk=job_id, status=Status.QUEUED
+        ).first()
+        if job:
+            _mark(job, status=Status.RUNNING)
+    return job
+
+
+def provision(job_id):
+    """Runs one queued job to DONE or FAILED. Returns the job (None if it wasn't ours to run)."""
+    job = _start(job_id)
+    if job is None:
+        return None
+    try:
+        _create_tenant(job)
+    except Exception as e:
+        logger.exception("Provisioning %s failed", job.subdomain)
+        rollback(job)
+        _mark(job, status=Status.FAILED, error=str(e) or e.__class__.__name__,
+              password='', finished_at=timezone.now())
+        return job
+    _mark(job, status=Status.DONE, password='', finished_at=timezone.now())
+    return job
+
+
+def _create_tenant(job):
+    with transaction.atomic():
+        tenant = claim_spare(job.subdomain, job.company_name)
+    if tenant:
+        _mark(job, tenant=tenant, step=Step.MIGRATIONS_APPLIED)
+        transaction.on_commit(refill_in_background)  # no transaction open: runs now
+    else:
+        tenant = Client(name=job.company_name, schema_name=job.subdomain)
+        tenant.auto_create_schema = False  # created here, so each step can be reported
+        tenant.save()
+        _mark(job, tenant=tenant)
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA {connection.ops.quote_name(tenant.schema_name)}')
+        _mark(job, step=Step.SCHEMA_CREATED)
+        call_command('migrate_schemas', tenant=True, schema_name=tenant.schema_name,
+                     interactive=False, verbosity=0)
+        connection.set_schema_to_public()
+        _mark(job, step=Step.MIGRATIONS_APPLIED)
+
+    # The admin user INSIDE the new schema
+    with schema_context(tenant.schema_name):
+        user = User(username='admin', email=job.email, role=User.Roles.INSTITUTE_ADMIN, is_staff=True)
+        user.password = job.password  # already hashed
+        user.save()
+    _mark(job, step=Step.ADMIN_CREATED)
+
+    Domain.objects.create(domain=domain_for(job.subdomain), tenant=tenant, is_primary=True)
+    _mark(job, step=Step.DOMAIN_ACTIVE)
+
+
+def rollback(job):
+    """Removes whatever a failed job created: domain, admin user, Client and schema."""
+    connection.set_schema_to_public()
+    tenant = job.tenant
+    if tenant is None:
+        return
+    if job.step in (Step.ADMIN_CREATED, Step.DOMAIN_ACTIVE):
+        with schema_context(tenant.schema_name):
+            User.objects.filter(username='admin', email=job.email).delete()
+    Domain.objects.filter(tenant=tenant).delete()
+    tenant.delete(force_drop=True)  # DROP SCHEMA ... CASCADE
+    _mark(job, tenant=None)
+
+
+def provision_in_background(job_id):
+    """Runs the job on a worker thread; the caller doesn't wait."""
+    global _provisioner
+    if _provisioner is None:
+        _provisioner = ThreadPoolExecutor(max_workers=settings.TENANT_PROVISIONING_THREADS,
+                                          thread_name_prefix='provisioning')
+    _provisioner.submit(_provision, job_id)
+
+
+def _provision(job_id):
+    try:
+        provision(job_id)
+    except Exception:
+        logger.exception("Provisioning job %s crashed", job_id)
+    finally:
+        # Each worker thread has its own connection; don't leave it open.
+        connection.close()
@@ -0,0 +1,132 @@
+# tenants/rollups.py
+"""
+Keeps the public-schema rollups (TenantSummary, DailyRevenue) in step with
+the data inside each tenant schema.
+
+Tenant code calls record_payment()/record_students() after its own commit.
+The rollup_revenue command rebuilds everything from scratch.
+"""
+import logging
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Count, F, Sum
+from psycopg2 import errorcodes
+
+from .models import Client, TenantSummary, DailyRevenue
+
+logger = logging.getLogger(__name__)
+
+
+def current_tenant_id():
+    """
+    Id of the Client whose schema is active.
+    Requests carry the real Client; schema_context() only gives a FakeTenant.
+    """
+    tenant_id = getattr(connection.tenant, 'pk', None)
+    if tenant_id is None:
+        tenant_id = Client.objects.filter(
+            schema_name=connection.schema_name
+        ).values_list('pk', flat=True).first()
+    return tenant_id
+
+
+def record_payment(amount, day, count=1):
+    """Adds a payment (or a reversal, with negative values) to the rollups."""
+    tenant_id = current_tenant_id()
+    if tenant_id is None:
+        return
+
+    with transaction.atomic():
+        TenantSummary.objects.filter(tenant_id=tenant_id).update(
+            total_revenue=F('total_revenue') + amount
+        )
+        updated = DailyRevenue.objects.filter(tenant_id=tenant_id, date=day).update(
+            amount=F('amount') + amount,
+            payment_count=F('payment_count') + count,
+        )
+        if updated:
+            return
+        if amount < 0 or count < 1:
+            # A refund or an edit on a day that has no row (e.g. it predates the
+            # rollups): the delta alone would be wrong or negative, so count the day again.
+            logger.warning("No revenue row for tenant %s on %s; recomputing the day", tenant_id, day)
+            recompute_day(tenant_id, day)
+            return
+        try:
+            with transaction.atomic():
+                DailyRevenue.objects.create(
+                    tenant_id=tenant_id, date=day, amount=amount, payment_count=count
+                )
+        except IntegrityError as e:
+            if getattr(e.__cause__, 'pgcode', None) != errorcodes.UNIQUE_VIOLATION:
+                raise
+            # Another worker created the row first; add on top of it.
+            DailyRevenue.objects.filter(tenant_id=tenant_id, date=day).update(
+                amount=F('amount') + amount,
+                payment_count=F('payment_count') + count,
+            )
+
+
+def recompute_day(tenant_id, day):
+    """
+    Rewrites one day's row from the payments in the current tenant schema
+    (drops it if that day has none).
+    """
+    from finance.models import FeePayment
+
+    totals = FeePayment.objects.filter(payment_date=day).aggregate(total=Sum('amount'), count=Count('id'))
+    if not totals['count']:
+        DailyRevenue.objects.filter(tenant_id=tenant_id, date=day).delete()
+        return
+    DailyRevenue.objects.update_or_create(
+        tenant_id=tenant_id, date=day,
+        defaults={'amount': totals['total'], 'payment_count': totals['count']},
+    )
+
+def record_students(delta):
+    tenant_id = current_tenant_id()
+    if tenant_id is None:
+        return
+    TenantSummary.objects.filter(tenant_id=tenant_id).update(
+        student_count=F('student_count') + delta
+    )
+
+
+# ------------------------------------------------------------------
+# FULL REBUILD
+# ------------------------------------------------------------------
+def collect_tenant_totals(schema_name):
+    """
+    Runs inside a tenant schema. Returns plain data so it can cross a process pool.
+    """
+    from academics.models import StudentProfile
+    from finance.models import FeePayment
+
+    daily = list(
+        FeePayment.objects.order_by()
+        .values_list('payment_date')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    return {
+        'student_count': StudentProfile.objects.count(),
+        'daily': daily,
+    }
+
+
+def store_tenant_totals(schema_name, totals):
+    """Replaces the rollup rows of one tenant with freshly collected totals."""
+    tenant = Client.objects.get(schema_name=schema_name)
+    rows = [
+        DailyRevenue(tenant=tenant, date=day, amount=total, payment_count=count)
+        for day, total, count in totals['daily']
+    ]
+    with transaction.atomic():
+        DailyRevenue.objects.filter(tenant=tenant).delete()
+        DailyRevenue.objects.bulk_create(rows, batch_size=1000)
+        TenantSummary.objects.update_or_create(
+            tenant=tenant,
+            defaults={
+                'student_count': totals['student_count'],
+                'total_revenue': sum((row.amount for row in rows), 0),
+            },
+        )
@@ -0,0 +1,105 @@
+# tenants/schema_migrations.py
+"""
+Helpers for `manage.py migrate_tenants`: migrating tenant schemas in a
+process pool, resuming after a crash, and estimating how long a run takes.
+
+A run is identified by run_key(), a hash of the migration graph's leaf
+nodes (the state being deployed). Every finished schema gets a
+SchemaMigrationLog row under that key. Re-running the same deploy skips
+schemas already DONE, and a new migration starts a new key.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Sum
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from .models import Client, SchemaMigrationLog
+
+TENANT_APP_LABELS = {app.rsplit('.', 1)[-1] for app in settings.TENANT_APPS}
+
+# Estimate when there is no history yet (seconds per migration per schema)
+DEFAULT_SECONDS_PER_MIGRATION = 2.0
+
+
+def run_key(loader=None):
+    loader = loader or MigrationLoader(None, ignore_no_migrations=True)
+    leaves = sorted(f"{app}.{name}" for app, name in loader.graph.leaf_nodes())
+    return hashlib.sha256('\n'.join(leaves).encode()).hexdigest()
+
+
+def migrated_schema_names():
+    """Every schema migrate_schemas --tenant touches: all Clients but public (spares included)."""
+    return list(
+        Client.objects.exclude(schema_name=get_public_schema_name())
+        .order_by('schema_name').values_list('schema_name', flat=True)
+    )
+
+
+def pending_migrations(schema_names, loader=None):
+    """
+    {schema_name: [(app_label, name), ...]} of tenant-app migrations not yet
+    applied in each schema. One small query per schema; the graph is built once.
+    """
+    loader = loader or MigrationLoader(None, ignore_no_migrations=True)
+    nodes = [key for key in loader.graph.nodes if key[0] in TENANT_APP_LABELS]
+    pending = {}
+    for schema_name in schema_names:
+        with schema_context(schema_name):
+            recorder = MigrationRecorder(connection)
+            applied = set(recorder.applied_migrations()) if recorder.has_table() else set()
+        pending[schema_name] = [key for key in nodes if key not in applied]
+    return pending
+
+
+def seconds_per_migration(schema_names):
+    """
+    {schema_name: seconds} from past runs, per migration. Schemas without
+    history get the overall average, or DEFAULT_SECONDS_PER_MIGRATION.
+    """
+    logged = SchemaMigrationLog.objects.filter(status=SchemaMigrationLog.Status.DONE, migrations__gt=0)
+    total = logged.aggregate(seconds=Sum('seconds'), migrations=Sum('migrations'))
+    default = total['seconds'] / total['migrations'] if total['migrations'] else DEFAULT_SECONDS_PER_MIGRATION
+
+    rates = {name: default for name in schema_names}
+    for row in logged.filter(schema_name__in=schema_names).values('schema_name').annotate(
+        seconds=Sum('seconds'), migrations=Sum('migrations')
+    ):
+        rates[row['schema_name']] = row['seconds'] / row['migrations']
+    return rates
+
+
+def makespan(estimates, workers):
+    """Wall-clock seconds if the jobs are handed out longest first to `workers` processes."""
+    lanes = [0.0] * max(workers, 1)
+    for seconds in sorted(estimates, reverse=True):
+        lanes[lanes.index(min(lanes))] += seconds
+    return max(lanes)
+
+
+def migrate_schema(key, pending_counts, schema_name):
+    """
+    for_each_tenant() entry point: migrates one schema and logs it under `key`.
+    Returns (migrations applied, error message or '').
+    """
+    count = pending_counts.get(schema_name, 0)
+    started = time.monotonic()
+    error = ''
+    try:
+        call_command('migrate_schemas', tenant=True, schema_name=schema_name,
+                     interactive=False, verbosity=0)
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"
+    with schema_context(get_public_schema_name()):
+        SchemaMigrationLog.objects.update_or_create(run_key=key, schema_name=schema_name, defaults={
+            'status': SchemaMigrationLog.Status.FAILED if error else SchemaMigrationLog.Status.DONE,
+            'migrations': count,
+            'seconds': time.monotonic() - started,
+            'error': error,
+        })
+    return count, error
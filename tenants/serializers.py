@@ -1,23 +1,31 @@
 # tenants/serializers.py
 from rest_framework import serializers
-from .models import Client, Domain
+from .models import Client, ProvisioningJob
+from django.contrib.auth.hashers import make_password
 from django.db import transaction
-from django_tenants.utils import schema_context
-from core.models import User
+from django_tenants.postgresql_backend.base import is_valid_schema_name
+from .provisioning import ACTIVE_JOB_STATUSES, provision_in_background
+from .spares import SPARE_PREFIX
 
 # tenants/serializers.py (Add this to the bottom)
 
 class TenantListSerializer(serializers.ModelSerializer):
+    """Reads the annotations TenantListView adds; no queries per row."""
     domain_url = serializers.SerializerMethodField()
+    student_count = serializers.IntegerField(read_only=True)
+    total_revenue = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    summary_refreshed_at = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Client
-        fields = ['id', 'name', 'schema_name', 'created_on', 'domain_url']
+        fields = ['id', 'name', 'schema_name', 'created_on', 'domain_url',
+                  'student_count', 'total_revenue', 'summary_refreshed_at']
 
     def get_domain_url(self, obj):
-        # Fetches the primary domain (e.g., "galaxy.localhost")
-        domain = obj.domains.filter(is_primary=True).first()
-        return domain.domain if domain else "No Domain"
+        # The primary domain (e.g., "galaxy.localhost")
+        return obj.primary_domain or "No Domain"
+
+
 class TenantSignupSerializer(serializers.Serializer):
     company_name = serializers.CharField(max_length=100)
     subdomain = serializers.CharField(max_length=50) # e.g., 'galaxy'
@@ -25,37 +33,22 @@ class TenantSignupSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate_subdomain(self, value):
+        if not is_valid_schema_name(value) or value.startswith(SPARE_PREFIX):
+            raise serializers.ValidationError("This subdomain is not allowed.")
         if Client.objects.filter(schema_name=value).exists():
             raise serializers.ValidationError("This subdomain is already taken.")
+        if ProvisioningJob.objects.filter(subdomain=value, status__in=ACTIVE_JOB_STATUSES).exists():
+            raise serializers.ValidationError("This subdomain is being set up.")
         return value
 
     def create(self, validated_data):
-        # 1. Create the Client (The Tenant)
-        # atomic() ensures if one step fails, everything is rolled back
+        # Only queue the work; tenants/provisioning.py builds the tenant off the request
         with transaction.atomic():
-            tenant = Client.objects.create(
-                name=validated_data['company_name'],
-                schema_name=validated_data['subdomain']
-            )
-
-            # 2. Create the Domain
-            # Note: In production, you'd append '.yourdomain.com'
-            domain_url = f"{validated_data['subdomain']}.localhost"
-            Domain.objects.create(
-                domain=domain_url,
-                tenant=tenant,
-                is_primary=True
+            job = ProvisioningJob.objects.create(
+                company_name=validated_data['company_name'],
+                subdomain=validated_data['subdomain'],
+                email=validated_data['email'],
+                password=make_password(validated_data['password']),
             )
-            
-            # 3. Create the Admin User INSIDE the new schema
-            # We switch context to the new "galaxy" folder
-            with schema_context(tenant.schema_name):
-                User.objects.create_user(
-                    username='admin',
-                    email=validated_data['email'],
-                    password=validated_data['password'],
-                    role='INSTITUTE_ADMIN',
-                    is_staff=True
-                )
-        
-        return tenant
\ No newline at end of file
+            transaction.on_commit(lambda: provision_in_background(job.id))
+        return job
@@ -0,0 +1,26 @@
+# tenants/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_tenants.utils import get_public_schema_name
+
+from .middleware import tenant_cache
+from .models import Client, Domain, TenantSummary
+
+
+@receiver(post_save, sender=Client)
+def create_tenant_summary(sender, instance, created, **kwargs):
+    # The public schema is the SaaS owner, not a tuition center. Spares get
+    # their summary when claimed.
+    if created and not instance.is_spare and instance.schema_name != get_public_schema_name():
+        TenantSummary.objects.get_or_create(tenant=instance)
+
+
+@receiver([post_save, post_delete], sender=Client)
+def forget_tenant(sender, instance, **kwargs):
+    tenant_cache.discard(tenant_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Domain)
+def forget_domain(sender, instance, **kwargs):
+    # Also covers a renamed domain: every hostname of the tenant goes
+    tenant_cache.discard(hostname=instance.domain, tenant_id=instance.tenant_id)
@@ -0,0 +1,86 @@
+# tenants/spares.py
+"""
+A pool of spare, already-migrated tenant schemas.
+
+Creating a Client runs every tenant migration (seconds). A spare is a Client
+with is_spare=True and a schema named spare_<hex>, made ahead of time.
+Signup claims one with SKIP LOCKED, renames its schema
+(ALTER SCHEMA ... RENAME) and fills in the name, which costs milliseconds.
+`manage.py migrate_schemas` migrates spares like any other tenant, so they
+never fall behind. When the pool is empty, signup falls back to creating
+the schema in the request.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django_tenants.utils import schema_rename
+
+from .models import Client, TenantSummary
+
+logger = logging.getLogger(__name__)
+
+SPARE_PREFIX = 'spare_'
+SPARE_NAME = 'Spare schema'
+
+_refiller = None
+
+
+def spare_count():
+    return Client.objects.filter(is_spare=True).count()
+
+
+def create_spare():
+    """Creates one spare (runs the tenant migrations)."""
+    return Client.objects.create(
+        name=SPARE_NAME,
+        schema_name=f"{SPARE_PREFIX}{uuid.uuid4().hex[:12]}",
+        is_spare=True,
+    )
+
+
+def refill(size=None):
+    """Tops the pool up to `size` (default TENANT_SPARE_POOL_SIZE). Returns the number created."""
+    size = settings.TENANT_SPARE_POOL_SIZE if size is None else size
+    missing = max(size - spare_count(), 0)
+    for _ in range(missing):
+        create_spare()
+    return missing
+
+
+def claim_spare(schema_name, name):
+    """
+    Turns a spare into the tenant `schema_name`. Must run inside a transaction,
+    which also covers the rename. Returns the Client, or None if the pool is empty.
+    """
+    tenant = Client.objects.select_for_update(skip_locked=True).filter(is_spare=True).order_by('id').first()
+    if tenant is None:
+        return None
+    schema_rename(tenant, schema_name, save=False)
+    tenant.name = name
+    tenant.is_spare = False
+    tenant.created_on = timezone.localdate()
+    tenant.save()
+    TenantSummary.objects.get_or_create(tenant=tenant)
+    return tenant
+
+
+def refill_in_background():
+    """Replaces claimed spares on a worker thread; the caller doesn't wait."""
+    global _refiller
+    if _refiller is None:
+        # One thread: two refills at once would both see the same shortfall
+        _refiller = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spare-schemas')
+    _refiller.submit(_refill)
+
+
+def _refill():
+    try:
+        refill()
+    except Exception:
+        logger.exception("Could not refill the spare schema pool")
+    finally:
+        connection.close()
@@ -1,3 +1,302 @@
-from django.test import TestCase
+import io
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import get_public_schema_name, schema_context, schema_exists
+from rest_framework.test import APIClient
+
+from academics.models import StudentProfile
+from core.models import User
+from finance.models import FeeInstallment, FeePayment, FeeStructure, StudentFeeAllocation
+from .middleware import CachedTenantMiddleware, TenantCache, tenant_cache
+from .models import Client, DailyRevenue, Domain, ProvisioningJob, SchemaMigrationLog, TenantSummary
+from .provisioning import FAILED_MESSAGE, progress, provision
+from .schema_migrations import makespan, pending_migrations, run_key, seconds_per_migration
+from .serializers import TenantSignupSerializer
+from .spares import refill, spare_count
+from .utils import tenant_schema_names
+
+
+class RevenueRollupTests(TenantTestCase):
+    """One student with a 1000 Rs. bill in the test tenant; rollups live in the public schema."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="rollup_student", role=User.Roles.STUDENT)
+        with self.captureOnCommitCallbacks(execute=True):
+            student = StudentProfile.objects.create(
+                user=user, parent_name="Parent", parent_phone="9999999999", enrollment_number="ROLL-001"
+            )
+        structure = FeeStructure.objects.create(name="Tuition Fee", amount=Decimal("1000.00"))
+        allocation = StudentFeeAllocation.objects.create(student=student, fee_structure=structure)
+        self.bill = FeeInstallment.objects.create(allocation=allocation, amount_due=Decimal("1000.00"),
+                                                  due_date=timezone.localdate())
+
+    def pay(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return FeePayment.objects.create(installment=self.bill, amount=Decimal(amount))
+
+    def rollups(self):
+        summary = TenantSummary.objects.get(tenant=self.tenant)
+        daily = list(DailyRevenue.objects.filter(tenant=self.tenant).values_list('date', 'amount', 'payment_count'))
+        return summary.student_count, summary.total_revenue, daily
+
+    def test_payments_update_the_rollups(self):
+        self.pay("300.00")
+        second = self.pay("200.00")
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), (1, Decimal("500.00"), [(today, Decimal("500.00"), 2)]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.rollups(), (1, Decimal("300.00"), [(today, Decimal("300.00"), 1)]))
+
+    def test_refund_on_a_day_without_a_row_recomputes_it(self):
+        self.pay("300.00")
+        second = self.pay("200.00")
+        DailyRevenue.objects.filter(tenant=self.tenant).delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), (1, Decimal("300.00"), [(today, Decimal("300.00"), 1)]))
+
+    def test_rebuild_matches_the_incremental_totals(self):
+        self.pay("300.00")
+        self.pay("200.00")
+        incremental = self.rollups()
+
+        TenantSummary.objects.filter(tenant=self.tenant).update(student_count=0, total_revenue=0)
+        DailyRevenue.objects.filter(tenant=self.tenant).delete()
+        call_command('rollup_revenue', '--schema', self.tenant.schema_name, stdout=io.StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+
+class TenantCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = TenantCache(maxsize=2, ttl=60, negative_ttl=5, clock=lambda: self.now)
+
+    def test_lru_eviction(self):
+        self.cache.set('a.example', 'A')
+        self.cache.set('b.example', 'B')
+        self.cache.get('a.example')  # a is now the most recent
+        self.cache.set('c.example', 'C')
+
+        self.assertEqual(self.cache.get('a.example'), 'A')
+        self.assertEqual(self.cache.get('c.example'), 'C')
+        self.assertIsNot(self.cache.get('b.example'), 'B')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        self.cache.set('a.example', 'A')
+        self.cache.set('nope.example', None)
+        self.now = 10
+        self.assertEqual(self.cache.get('a.example'), 'A')
+        self.assertIsNot(self.cache.get('nope.example'), None)  # negative entry gone after 5s
+        self.now = 61
+        self.assertIsNot(self.cache.get('a.example'), 'A')
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+
+class CachedTenantMiddlewareTests(TenantTestCase):
+    def setUp(self):
+        tenant_cache.clear()
+        self.addCleanup(tenant_cache.clear)
+        self.addCleanup(connection.set_tenant, self.tenant)
+        self.middleware = CachedTenantMiddleware(get_response=lambda request: None)
+
+    def resolve(self, hostname):
+        request = RequestFactory().get('/', HTTP_HOST=hostname)
+        with CaptureQueriesContext(connection) as ctx:
+            self.middleware.process_request(request)
+        return request, len(ctx.captured_queries)
+
+    def test_second_request_skips_the_lookup(self):
+        first, queries = self.resolve(self.domain.domain)
+        self.assertEqual(queries, 1)
+        second, queries = self.resolve(self.domain.domain)
+        self.assertEqual(queries, 0)
+        self.assertEqual(second.tenant.schema_name, self.tenant.schema_name)
+        self.assertIsNot(second.tenant, first.tenant)
+        self.assertEqual(tenant_cache.stats()['hits'], 1)
+
+    def test_unknown_host_is_negatively_cached(self):
+        for expected_queries in (1, 0):
+            with CaptureQueriesContext(connection) as ctx, self.assertRaises(Http404):
+                self.middleware.process_request(RequestFactory().get('/', HTTP_HOST='nowhere.example'))
+            self.assertEqual(len(ctx.captured_queries), expected_queries)
+        self.assertEqual(tenant_cache.stats()['negative_hits'], 1)
+
+    def test_saving_the_tenant_invalidates(self):
+        self.resolve(self.domain.domain)
+        self.tenant.name = "Renamed Academy"
+        self.tenant.save()
+
+        request, queries = self.resolve(self.domain.domain)
+        self.assertEqual(queries, 1)
+        self.assertEqual(request.tenant.name, "Renamed Academy")
+
+
+class SignupProvisioningTests(TenantTestCase):
+    def setUp(self):
+        # Tenants are created from the public schema
+        connection.set_schema_to_public()
+        self.addCleanup(connection.set_tenant, self.tenant)
+
+    def signup(self, subdomain):
+        """Queues the job the way the view does, then runs it here instead of on a thread."""
+        serializer = TenantSignupSerializer(data={
+            'company_name': "Galaxy Academy", 'subdomain': subdomain,
+            'email': "owner@galaxy.test", 'password': "password123",
+        })
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        self.assertEqual(job.status, ProvisioningJob.Status.QUEUED)
+        return provision(job.id)
+
+    def test_signup_claims_a_spare(self):
+        self.assertEqual(refill(1), 1)
+        spare = Client.objects.get(is_spare=True)
+        self.assertNotIn(spare.schema_name, tenant_schema_names())
+        self.assertFalse(TenantSummary.objects.filter(tenant=spare).exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            job = self.signup("galaxy")
+        self.assertFalse(any('CREATE TABLE' in q['sql'] for q in ctx.captured_queries))
+
+        tenant = job.tenant
+        self.assertEqual(tenant.pk, spare.pk)
+        self.assertEqual((tenant.schema_name, tenant.name, tenant.is_spare), ("galaxy", "Galaxy Academy", False))
+        self.assertFalse(schema_exists(spare.schema_name))
+        self.assertEqual(tenant.domains.get().domain, "galaxy.localhost")
+        self.assertTrue(TenantSummary.objects.filter(tenant=tenant).exists())
+        with schema_context("galaxy"):
+            admin = User.objects.get(username='admin', role=User.Roles.INSTITUTE_ADMIN)
+        self.assertTrue(admin.check_password("password123"))
+        self.assertEqual(spare_count(), 0)
+        self.assertEqual((job.status, job.password), (ProvisioningJob.Status.DONE, ''))
+
+    def test_empty_pool_migrates_in_the_job(self):
+        job = self.signup("nebula")
+        self.assertEqual(job.status, ProvisioningJob.Status.DONE)
+        self.assertTrue(schema_exists("nebula"))
+        self.assertFalse(job.tenant.is_spare)
+        self.assertTrue(all(step['done'] for step in progress(job)['steps']))
+
+    def test_failed_job_rolls_back(self):
+        with mock.patch.object(Domain.objects, 'create', side_effect=RuntimeError("DNS is down")):
+            job = self.signup("comet")
+
+        self.assertEqual(job.status, ProvisioningJob.Status.FAILED)
+        self.assertEqual(job.error, "DNS is down")
+        self.assertEqual(progress(job)['error'], FAILED_MESSAGE)
+        self.assertEqual(job.step, ProvisioningJob.Step.ADMIN_CREATED)
+        self.assertFalse(Client.objects.filter(schema_name="comet").exists())
+        self.assertFalse(schema_exists("comet"))
+        self.assertFalse(User.objects.filter(username='admin', email="owner@galaxy.test").exists())
+
+    def test_signup_returns_202_and_status(self):
+        public, _ = Client.objects.get_or_create(schema_name=get_public_schema_name(), defaults={'name': "Public"})
+        Domain.objects.create(domain='signup.test', tenant=public)
+        api = APIClient(HTTP_HOST='signup.test')
+        with mock.patch('tenants.serializers.provision_in_background'):
+            response = api.post('/api/register/', {
+                'company_name': "Comet Classes", 'subdomain': "comet", 'email': "o@comet.test", 'password': "pw123456",
+            }, format='json')
+        self.assertEqual(response.status_code, 202)
+        status = api.get(response.data['status_url']).data
+        self.assertEqual(status['status'], ProvisioningJob.Status.QUEUED)
+        self.assertFalse(any(step['done'] for step in status['steps']))
+
+        # A second signup for the same subdomain waits for the first
+        duplicate = TenantSignupSerializer(data={
+            'company_name': "X", 'subdomain': "comet", 'email': "x@x.test", 'password': "password123",
+        })
+        self.assertFalse(duplicate.is_valid())
+
+    def test_spare_prefix_is_reserved(self):
+        serializer = TenantSignupSerializer(data={
+            'company_name': "X", 'subdomain': "spare_abc", 'email': "x@x.test", 'password': "password123",
+        })
+        self.assertFalse(serializer.is_valid())
+
+
+class MigrateTenantsTests(TenantTestCase):
+    def migrate_tenants(self, *args):
+        out = io.StringIO()
+        call_command('migrate_tenants', *args, '--schema', self.tenant.schema_name, '--skip-shared', stdout=out)
+        return out.getvalue()
+
+    def test_test_tenant_is_up_to_date(self):
+        self.assertEqual(pending_migrations([self.tenant.schema_name]), {self.tenant.schema_name: []})
+        self.assertIn("1 up to date, 0 to migrate", self.migrate_tenants('--dry-run'))
+
+    def test_logged_schemas_are_skipped(self):
+        SchemaMigrationLog.objects.create(run_key=run_key(), schema_name=self.tenant.schema_name,
+                                          status=SchemaMigrationLog.Status.DONE)
+        self.assertIn("1 already done", self.migrate_tenants('--dry-run'))
+        self.assertIn("0 already done", self.migrate_tenants('--dry-run', '--restart'))
+
+    def test_estimates(self):
+        SchemaMigrationLog.objects.create(run_key='old', schema_name='big', status=SchemaMigrationLog.Status.DONE,
+                                          migrations=2, seconds=30)
+        rates = seconds_per_migration(['big', 'new'])
+        self.assertEqual(rates, {'big': 15, 'new': 15})
+        self.assertEqual(makespan([10, 6, 5, 4], workers=2), 14)  # [10, 4] and [6, 5]
+
+
+class TenantListTests(TenantTestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        self.addCleanup(connection.set_tenant, self.tenant)
+        public, _ = Client.objects.get_or_create(schema_name=get_public_schema_name(), defaults={'name': "Public"})
+        Domain.objects.create(domain='console.test', tenant=public)
+
+        owner = User.objects.create_superuser(username="owner", password="password123", email="owner@saas.test")
+        self.api = APIClient(HTTP_HOST='console.test')
+        self.api.force_authenticate(user=owner)
+
+    def add_centers(self, n, start=0, **kwargs):
+        for i in range(start, start + n):
+            center = Client(name=f"Center {i}", schema_name=f"center_{i}", **kwargs)
+            center.auto_create_schema = False  # the list doesn't look inside the schema
+            center.save()
+            Domain.objects.create(domain=f"center{i}.localhost", tenant=center, is_primary=True)
+
+    def list_tenants(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/tenants/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'], len(ctx.captured_queries)
+
+    def test_one_query_per_page(self):
+        self.add_centers(2)
+        _, few = self.list_tenants()
+        self.add_centers(20, start=2)
+        rows, many = self.list_tenants()
+        self.assertEqual(few, many)
+
+        names = {row['schema_name']: row for row in rows}
+        self.assertEqual(names['center_5']['domain_url'], "center5.localhost")
+        self.assertNotIn(get_public_schema_name(), names)
+
+    def test_counts_come_from_the_summary(self):
+        self.add_centers(1)
+        TenantSummary.objects.filter(tenant__schema_name="center_0").update(student_count=42, total_revenue=1500)
+        row = self.list_tenants('?search=center_0')[0][0]
+        self.assertEqual((row['student_count'], row['total_revenue']), (42, "1500.00"))
+
+    def test_search_and_spares(self):
+        self.add_centers(3)
+        self.add_centers(1, start=3, is_spare=True)
+        self.assertEqual([r['name'] for r in self.list_tenants('?search=Center 1')[0]], ["Center 1"])
+        self.assertNotIn("center_3", [r['schema_name'] for r in self.list_tenants()[0]])
@@ -0,0 +1,55 @@
+# tenants/utils.py
+import multiprocessing
+import time
+
+from django.db import connections
+from django_tenants.utils import schema_context, get_public_schema_name
+
+from .models import Client
+
+
+def tenant_schema_names():
+    """Schema names of every Tuition Center (the public schema and spares are skipped)."""
+    return list(
+        Client.objects.exclude(schema_name=get_public_schema_name()).exclude(is_spare=True)
+        .order_by('schema_name')
+        .values_list('schema_name', flat=True)
+    )
+
+
+def _run_in_schema(job):
+    func, schema_name = job
+    started = time.monotonic()
+    with schema_context(schema_name):
+        result = func(schema_name)
+    return schema_name, result, time.monotonic() - started
+
+
+def for_each_tenant(func, schema_names=None, workers=1):
+    """
+    Runs func(schema_name) inside every tenant schema.
+    Yields (schema_name, result, seconds) as each schema finishes.
+
+    With workers > 1 the schemas are spread over a process pool. func must then
+    be a module-level function and its result must be picklable.
+    """
+    if schema_names is None:
+        schema_names = tenant_schema_names()
+    jobs = [(func, name) for name in schema_names]
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _run_in_schema(job)
+        return
+
+    # Forked children must not share the parent's DB socket.
+    connections.close_all()
+    pool = multiprocessing.get_context('fork').Pool(
+        processes=min(workers, len(jobs)),
+        initializer=connections.close_all,
+    )
+    try:
+        yield from pool.imap_unordered(_run_in_schema, jobs)
+    finally:
+        pool.close()
+        pool.join()
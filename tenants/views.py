@@ -1,7 +1,19 @@
 # tenants/views.py
-from rest_framework import generics
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django_tenants.utils import get_public_schema_name
+from rest_framework import generics, status
+from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAdminUser
-from .models import Client
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .middleware import tenant_cache
+from .models import Client, Domain, ProvisioningJob
+from .provisioning import progress
 from .serializers import TenantSignupSerializer, TenantListSerializer
 
 
@@ -9,13 +21,33 @@ class TenantListView(generics.ListAPIView):
     """
     Returns a list of all Tuition Centers.
     Only the SaaS Owner (Superuser) can see this.
+    ?search= matches name or schema. One query per page: the primary domain
+    and the TenantSummary counts are joined in, never loaded per row.
     """
-    queryset = Client.objects.all().order_by('-created_on')
     serializer_class = TenantListSerializer
     permission_classes = [IsAdminUser] # STRICTLY SECURE
+    filter_backends = [SearchFilter]
+    search_fields = ['name', 'schema_name']
+    cursor_ordering = ('-created_on', '-id')
+
+    def get_queryset(self):
+        primary_domain = Domain.objects.filter(tenant=OuterRef('pk'), is_primary=True).values('domain')[:1]
+        return (
+            Client.objects.exclude(schema_name=get_public_schema_name()).exclude(is_spare=True)
+            .annotate(
+                primary_domain=Subquery(primary_domain),
+                # Centers whose summary hasn't been built yet show zeros
+                student_count=Coalesce(F('summary__student_count'), 0),
+                total_revenue=Coalesce(F('summary__total_revenue'), Value(Decimal(0)),
+                                       output_field=DecimalField(max_digits=14, decimal_places=2)),
+                summary_refreshed_at=F('summary__refreshed_at'),
+            )
+        )
+
 class TenantSignupView(generics.CreateAPIView):
     """
     Public Endpoint for new Tuition Centers to register.
+    Only queues a ProvisioningJob; poll the returned status_url until it is DONE.
     """
     serializer_class = TenantSignupSerializer
     authentication_classes = [] # Allow anyone to sign up
@@ -24,12 +56,30 @@ class TenantSignupView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        tenant = serializer.save()
-        
-        # Return the login URL for their new site
-        login_url = f"http://{tenant.schema_name}.localhost:8000/dashboard.html"
-        
+        job = serializer.save()
+
         return Response({
-            "message": "Tuition Center Created Successfully!",
-            "login_url": login_url
-        }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+            **progress(job),
+            "message": "Setting up your Tuition Center...",
+            "status_url": reverse('tenant-register-status', args=[job.id]),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ProvisioningStatusView(APIView):
+    """Progress of one signup. Public: the job id is a random UUID."""
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, job_id):
+        return Response(progress(get_object_or_404(ProvisioningJob, pk=job_id)))
+
+
+class TenantCacheStatsView(APIView):
+    """
+    Hit/miss counters of the hostname -> tenant cache (tenants/middleware.py).
+    The cache is per process, so this shows the worker that answered.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(tenant_cache.stats())